@@ -21,8 +21,10 @@
 # CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 import sys
+import os
 from base64 import b64encode
 from hashlib import md5
+import hashlib
 # As of Python 3.4.3, http.client.HTTPSconnection() will default to verify
 # presented certificates against the system's trusted CA chain. To enable
 # the previous behaviour, we switch it off.
@@ -36,7 +38,10 @@ import http.client
 from urllib.parse import urlencode, quote
 import logging
 import time
-from threading import Timer
+import weakref
+from threading import Timer, BoundedSemaphore, Lock
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 
 # noinspection PyProtectedMember
 from .version import _Version
@@ -50,16 +55,24 @@ except ImportError as e:
           file=sys.stderr)
 
 from . import httpclient
+from . import timeseries
 from . import namespace
 from . import mapi
+from . import replica
+from . import mqe
 from . import pathbuilder
+from . import emulator
+from . import bench
+from . import trace
+from . import transfer
 
 
-__all__ = ['Target', 'Connection', 'BaseAuthorization', 'DummyAuthorization',
+__all__ = ['Cluster', 'Target', 'Connection', 'ConnectionPool', 'BaseAuthorization', 'DummyAuthorization',
            'NativeAuthorization', 'NativeADAuthorization',
            'LocalSwiftAuthorization', 'HcpsdkError',
            'HcpsdkCantConnectError', 'HcpsdkTimeoutError',
-           'HcpsdkCertificateError', 'HcpsdkReplicaInitError']
+           'HcpsdkCertificateError', 'HcpsdkReplicaInitError',
+           'HcpsdkHashError']
 
 logging.getLogger('hcpsdk').addHandler(logging.NullHandler())
 
@@ -135,6 +148,17 @@ class HcpsdkPortError(HcpsdkError):
         """
         self.args = (reason,)
 
+class HcpsdkHashError(HcpsdkError):
+    """
+    Raised if the hash calculated while data was streamed doesn't match the
+    hash HCP reported in the *X-HCP-Hash* header.
+    """
+    def __init__(self, reason):
+        """
+        :param reason:  an error description
+        """
+        self.args = (reason,)
+
 # Port constants
 P_HTTP = 80
 P_HTTPS = 443
@@ -155,9 +179,205 @@ RS_READ_ON_FAILOVER = 2  # automatically read from replica when failed over
 RS_WRITE_ALLOWED = 4  # allow to write to replica (always, A/A links only)
 RS_WRITE_ON_FAILOVER = 8  # allow to write to replica when failed over
 
+# Hash scheme constants (as used by HCP)
+H_MD5 = 'MD5'
+H_SHA1 = 'SHA-1'
+H_SHA256 = 'SHA-256'
+H_SHA384 = 'SHA-384'
+H_SHA512 = 'SHA-512'
+H_RIPEMD160 = 'RIPEMD-160'
+H_ALL = [H_MD5, H_SHA1, H_SHA256, H_SHA384, H_SHA512, H_RIPEMD160]
+
 # The ports used for https
 SSL_PORTS = [443, 8000, 9090]
 
+# The chunk size used to feed a hashing body to http.client
+_HASHBLOCKSIZE = 2**16
+
+# The objects to reset in a child process after os.fork()
+_forked = weakref.WeakSet()
+
+# The Clusters unpickled in this process, keyed by (fqdn, port)
+_clusters = weakref.WeakValueDictionary()
+
+
+def _afterfork():
+    """
+    Called in a child process after *os.fork()*: drop the sessions shared
+    with the parent process and reset the locks, which might have been held
+    by another thread at the time of the fork.
+    """
+    objects = list(_forked)
+    # Clusters first, the pools of their Targets get their idle queues
+    for obj in sorted(objects, key=lambda o: not isinstance(o, Cluster)):
+        obj._afterfork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_afterfork)
+
+
+def _getsslstate(sslcontext):
+    """
+    Get the picklable representation of an SSL context.
+
+    :raises:    *TypeError* for a context other than *SSL_NOVERIFY*
+    """
+    if sslcontext is None:
+        return None
+    if sslcontext is SSL_NOVERIFY:
+        return 'SSL_NOVERIFY'
+    raise TypeError('objects using a custom sslcontext can\'t be pickled')
+
+
+def _getstate(obj, *drop):
+    """
+    Get the state of *obj* to be pickled: the logger is replaced by its
+    name, the SSL context by *_getsslstate()*, the attributes named in
+    *drop* are left out.
+    """
+    state = obj.__dict__.copy()
+    for name in drop:
+        state.pop(name, None)
+    if 'logger' in state:
+        state['logger'] = state['logger'].name
+    for name in state:
+        if name.endswith('__sslcontext'):
+            state[name] = _getsslstate(state[name])
+    return state
+
+
+def _setstate(obj, state):
+    """
+    Restore the state provided by *_getstate()*.
+    """
+    obj.__dict__.update(state)
+    if 'logger' in state:
+        obj.logger = logging.getLogger(state['logger'])
+    for name in state:
+        if name.endswith('__sslcontext') and state[name]:
+            setattr(obj, name, SSL_NOVERIFY)
+
+
+def _unpicklecluster(state):
+    """
+    Re-create a pickled *Cluster()*, or get the one already unpickled for
+    the same FQDN and port, so that *Target()*\\ s pickled one by one
+    share a single *Cluster()* in the receiving process.
+    """
+    key = (state['_Cluster__fqdn'], state['_Cluster__port'])
+    cluster = _clusters.get(key)
+    if cluster is None:
+        cluster = Cluster.__new__(Cluster)
+        cluster.__setstate__(state)
+        _clusters[key] = cluster
+    return cluster
+
+
+def _newhash(scheme):
+    """
+    Create a hash object for one of the HCP hash schemes.
+
+    :param scheme:  one of H_ALL
+    :return:        a *hashlib* hash object
+    :raises:        *ValueError* if the scheme isn't supported
+    """
+    try:
+        return hashlib.new(scheme.replace('-', '').lower())
+    except (ValueError, AttributeError):
+        raise ValueError('unsupported hash scheme: {}'.format(scheme))
+
+
+def _bodysize(body):
+    """
+    Get the size of a Request body.
+
+    :param body:    the body, as given to *Connection.request()*
+    :return:        the number of bytes, -1 if unknown (iterables)
+    """
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray, str)):
+        return len(body)
+    if isinstance(body, memoryview):
+        return body.nbytes
+    try:
+        return os.fstat(body.fileno()).st_size - body.tell()
+    except (AttributeError, OSError, ValueError):
+        return -1
+
+
+class _HashingReader(object):
+    """
+    Wraps a file-like object and updates a hash object with every chunk of
+    data read from it, so that the body of a Request gets hashed while
+    *http.client* sends it.
+    """
+    def __init__(self, fileobj, hashobj):
+        """
+        :param fileobj: an object having a *read()* method
+        :param hashobj: a *hashlib* hash object
+        """
+        self.fileobj = fileobj
+        self.hashobj = hashobj
+
+    def read(self, amt=-1):
+        data = self.fileobj.read(amt)
+        if isinstance(data, str):
+            # same encoding http.client uses for text bodies
+            data = data.encode('iso-8859-1')
+        self.hashobj.update(data)
+        return data
+
+
+class _IdleQueue(object):
+    """
+    A LIFO stack of idle *Connection()*\\ s (LIFO keeps recently used
+    sessions hot), guarded by a lock, so that it can be shared by several
+    *ConnectionPool()*\\ s.
+    """
+    def __init__(self, maxsize=0):
+        """
+        :param maxsize: the max. number of idle *Connection()*\\ s to hold,
+                        no limit if 0
+        """
+        self.maxsize = maxsize
+        self.__lock = Lock()
+        self.__cons = []
+
+    def get(self):
+        """
+        :return:    the most recently put *Connection()*, or *None* if empty
+        """
+        with self.__lock:
+            return self.__cons.pop() if self.__cons else None
+
+    def put(self, con):
+        """
+        :param con: a *Connection()*
+        :return:    *False* if the queue is full and *con* hasn't been added
+        """
+        with self.__lock:
+            if self.maxsize and len(self.__cons) >= self.maxsize:
+                return False
+            self.__cons.append(con)
+            return True
+
+    def take(self, pool=None):
+        """
+        Remove the *Connection()*\\ s last used by *pool* (all of them if
+        *None*); the others stay in place.
+
+        :param pool:    a *ConnectionPool()* object, or *None*
+        :return:        a list of the removed *Connection()*\\ s
+        """
+        with self.__lock:
+            taken = [c for c in self.__cons if pool is None or c._pool is pool]
+            self.__cons = [c for c in self.__cons
+                           if not (pool is None or c._pool is pool)]
+        return taken
+
+
 
 class BaseAuthorization(object):
     """
@@ -165,6 +385,12 @@ class BaseAuthorization(object):
 
     This is a base class for all other *Authorization* classes, not intended for
     direct usage, but to be sub-classed for specific protocols.
+
+    *Authorization* objects can be pickled (as the headers they calculated),
+    to be handed over to other processes.
+
+    ..  versionchanged:: 0.9.5.0
+        can be pickled
     """
     def __init__(self):
         """
@@ -210,6 +436,12 @@ class BaseAuthorization(object):
         else:
             raise HcpsdkError('Err: no authorization token available')
 
+    def __getstate__(self):
+        return _getstate(self)
+
+    def __setstate__(self, state):
+        _setstate(self, state)
+
 
 class DummyAuthorization(BaseAuthorization):
     """
@@ -312,16 +544,183 @@ class LocalSwiftAuthorization(BaseAuthorization):
         return {"X-Auth-Token": "HCP {}".format(token)}
 
 
+class Cluster(object):
+    """
+    Represents a single HCP cluster that is accessed through several
+    *Target()*\\ s (one per Tenant or Namespace, for example).
+
+    All the Namespace FQDNs of a cluster resolve to the same nodes, so the
+    *Target()*\\ s bound to a *Cluster()* share its IP address cache
+    instead of each running their own DNS queries. *ConnectionPool()*\\ s
+    for these *Target()*\\ s share their idle *Connection()*\\ s, too: a
+    session (and its TLS handshake) set up for one Namespace gets re-used
+    for Requests to any other Namespace of the cluster, as the *Host* and
+    authorization headers are set per Request from the *Target()*.
+
+    A *Cluster()* can be pickled (w/o its idle *Connection()*\\ s) and
+    drops the sessions shared with the parent in a child process after
+    *os.fork()*; this requires the default *sslcontext*. All *Cluster()*\\ s
+    pickled for the same FQDN and port are unpickled into a single object
+    per process.
+    """
+
+    def __init__(self, fqdn, port=443, dnscache=False,
+                 sslcontext=SSL_NOVERIFY, maxidle=32):
+        """
+        :param fqdn:        a name resolving to the cluster's nodes
+                            ([namespace.]tenant.hcp.loc or hcp.loc, for example)
+        :param port:        one of the port constants (*hcpsdk.P_**)
+        :param dnscache:    if True, use the system resolver (which **might** do
+                            local caching), else use an internal resolver,
+                            bypassing any cache available
+        :param sslcontext:  the context used to handle https requests; defaults to
+                            no certificate verification
+        :param maxidle:     the max. number of idle *Connection()*\\ s kept
+                            per set of *Connection()* arguments (0 for no
+                            limit); surplus ones are closed when released
+        :raises:            *ips.IpsError* if DNS query fails, *HcpsdkError* in all
+                            other fault cases
+
+        ..  versionadded:: 0.9.5.0
+        """
+        self.logger = logging.getLogger(__name__ + '.Cluster')
+        self.__fqdn = fqdn
+        self.__port = port
+        self.__dnscache = dnscache
+        self.__sslcontext = sslcontext
+        self.__ssl = self.__port in SSL_PORTS
+        self.__idle = {}  # idle Connections, keyed by the Connection kwargs
+        self.__maxidle = maxidle
+        self.__lock = Lock()
+
+        try:
+            self.ipaddrqry = ips.Circle(self.__fqdn, port=self.__port,
+                                        dnscache=self.__dnscache)
+        except ips.IpsError as e:
+            self.logger.debug(e, exc_info=True)
+            raise ips.IpsError(e)
+        except Exception as e:
+            raise HcpsdkError(e)
+
+        _forked.add(self)
+        self.logger.debug('Cluster initialized: {}:{} - SSL = {}'
+                          .format(self.__fqdn, self.__port, self.__ssl))
+
+    def target(self, fqdn, authorization, interface=I_NATIVE):
+        """
+        Convenience method to create a *Target()* bound to this cluster.
+
+        :param fqdn:            ([namespace.]tenant.hcp.loc)
+        :param authorization:   an instance of one of BaseAuthorization's
+                                subclasses
+        :param interface:       the HCP interface to use (I_NATIVE)
+        :return:                a *Target()* object
+        """
+        return Target(fqdn, authorization, interface=interface, cluster=self)
+
+    def _idlequeue(self, kwargs):
+        """
+        Get the queue of idle *Connection()*\\ s shared by all
+        *ConnectionPool()*\\ s created with the same *Connection()*
+        arguments.
+
+        :param kwargs:  the keyword arguments used to create *Connection()*\\ s
+        :return:        an *_IdleQueue* object, holding *maxidle*
+                        *Connection()*\\ s at most
+        """
+        key = tuple(sorted(kwargs.items()))
+        with self.__lock:
+            if key not in self.__idle:
+                self.__idle[key] = _IdleQueue(self.__maxidle)
+            return self.__idle[key]
+
+    def close(self):
+        """
+        Close all idle *Connection()*\\ s shared within the cluster. The
+        *Cluster()* stays usable, new sessions will be opened as needed.
+        """
+        with self.__lock:
+            idle = list(self.__idle.values())
+        for q in idle:
+            for con in q.take():
+                con.close()
+        self.logger.debug('Cluster {} closed'.format(self.__fqdn))
+
+    def _afterfork(self):
+        """
+        Drop the idle *Connection()*\\ s inherited from the parent process.
+        """
+        self.__idle = {}
+        self.__lock = Lock()
+
+    def __getstate__(self):
+        return _getstate(self, '_Cluster__idle', '_Cluster__lock')
+
+    def __setstate__(self, state):
+        _setstate(self, state)
+        self.__idle = {}
+        self.__lock = Lock()
+        _forked.add(self)
+
+    def __reduce__(self):
+        return _unpicklecluster, (self.__getstate__(),)
+
+    # properties for the read-only attributes
+    def __getfqdn(self):
+        return self.__fqdn
+    fqdn = property(__getfqdn, None, None,
+                    'The FQDN for which this object was initialized (r/o)')
+
+    def __getport(self):
+        return self.__port
+    port = property(__getport, None, None,
+                    'The target port in use (r/o)')
+
+    def __getdnscache(self):
+        return self.__dnscache
+    dnscache = property(__getdnscache, None, None,
+                        'Indicates if the system resolver is used (r/o)')
+
+    def __getssl(self):
+        return self.__ssl
+    ssl = property(__getssl, None, None,
+                    'Indicates if SSL is used (r/o)')
+
+    def __getsslcontext(self):
+        return self.__sslcontext
+    sslcontext = property(__getsslcontext, None, None,
+                    'The assigned SSL context (r/o)')
+
+    def __getaddresses(self):
+        return self.ipaddrqry._addresses
+    addresses = property(__getaddresses, None, None,
+                    'The list of resolved IP addresses for this cluster (r/o)')
+
+    def __repr__(self):
+        return "<{} class at {}>".format(Cluster.__name__, id(self))
+
+    def __str__(self):
+        return "<{} class initialized for {}>".format(Cluster.__name__,
+                                                      self.__fqdn)
+
+
 class Target(object):
     """
     This is the a central access point to an HCP target (and its replica,
     eventually). It caches the FQDN and the port and queries the provided
     *Authorization* object for the required authorization token.
+
+    A *Target()* can be pickled, to be handed over to another process; it
+    gets re-created there with the IP addresses cached, w/o a DNS query.
+    This requires the default *sslcontext*.
+
+    ..  versionchanged:: 0.9.5.0
+        can be pickled
     """
 
     def __init__(self, fqdn, authorization, port=443, dnscache=False,
                  sslcontext=SSL_NOVERIFY, interface=I_NATIVE,
-                 replica_fqdn=None, replica_strategy=None):
+                 replica_fqdn=None, replica_strategy=None, cluster=None):
         """
         :param fqdn:                ([namespace.]tenant.hcp.loc)
         :param authorization:       an instance of one of BaseAuthorization's subclasses
@@ -334,10 +733,22 @@ class Target(object):
         :param interface:           the HCP interface to use (I_NATIVE)
         :param replica_fqdn:        the replica HCP's FQDN
         :param replica_strategy:    OR'ed combination of the RS_* modes
+        :param cluster:             a *Cluster()* object this Target belongs to;
+                                    if given, *port*, *dnscache* and *sslcontext*
+                                    are taken from it, and its IP address cache
+                                    and idle *Connection()*\\ s are shared
         :raises:                    *ips.IpsError* if DNS query fails, *HcpsdkError* in all
                                     other fault cases
+
+        ..  versionchanged:: 0.9.5.0
+            added *cluster*
         """
         self.logger = logging.getLogger(__name__ + '.Target')
+        self.__cluster = cluster
+        if cluster:
+            port = cluster.port
+            dnscache = cluster.dnscache
+            sslcontext = cluster.sslcontext
         self.__fqdn = fqdn
         self.__authorization = authorization
         self.__dnscache = dnscache
@@ -350,15 +761,19 @@ class Target(object):
         self.__replica = None  # placeholder for a replica's *Target* object
         self.__replica_strategy = replica_strategy
 
-        # instantiate an IP address circler for this Target
-        try:
-            self.ipaddrqry = ips.Circle(self.__fqdn, port=self.__port,
-                                        dnscache=self.__dnscache)
-        except ips.IpsError as e:
-            self.logger.debug(e, exc_info=True)
-            raise ips.IpsError(e)
-        except Exception as e:
-            raise HcpsdkError(e)
+        # instantiate an IP address circler for this Target, or share the
+        # one of the cluster
+        if cluster:
+            self.ipaddrqry = cluster.ipaddrqry
+        else:
+            try:
+                self.ipaddrqry = ips.Circle(self.__fqdn, port=self.__port,
+                                            dnscache=self.__dnscache)
+            except ips.IpsError as e:
+                self.logger.debug(e, exc_info=True)
+                raise ips.IpsError(e)
+            except Exception as e:
+                raise HcpsdkError(e)
 
         # noinspection PyProtectedMember
         self.logger.debug('Target initialized: {}:{} - SSL = {}'
@@ -413,6 +828,12 @@ class Target(object):
     addresses = property(__getaddresses, None, None,
                     'The list of resolved IP addresses for this target (r/o)')
 
+    def __getcluster(self):
+        return self.__cluster
+    cluster = property(__getcluster, None, None,
+                       'The Cluster object this Target belongs to, if any '
+                       '(r/o)')
+
     def __getheaders(self):
         tmp = self.__headers.copy()
         tmp.update(self.__authorization._getheaders())
@@ -430,6 +851,16 @@ class Target(object):
     replica_strategy = property(__getreplica_strategy, None, None,
                     'The replica strategy selected (r/o)')
 
+    def __getstate__(self):
+        if self.__cluster:
+            return _getstate(self, 'ipaddrqry')
+        return _getstate(self)
+
+    def __setstate__(self, state):
+        _setstate(self, state)
+        if self.__cluster:
+            self.ipaddrqry = self.__cluster.ipaddrqry
+
     def __repr__(self):
         return "<{} class at {}>".format(Target.__name__, id(self))
 
@@ -447,7 +878,8 @@ class Connection(object):
     # noinspection PyShadowingNames
     def __init__(self, target, timeout=30, idletime=30, retries=0,
                  debuglevel=0, sock_keepalive=False,
-                 tcp_keepalive=60, tcp_keepintvl=60, tcp_keepcnt=3):
+                 tcp_keepalive=60, tcp_keepintvl=60, tcp_keepcnt=3,
+                 verifyhash=False, hashscheme=H_SHA256, recorder=None):
         """
         :param target:          an initialized Target object
         :param timeout:         the timeout for this Connection (secs)
@@ -461,6 +893,15 @@ class Connection(object):
         :param tcp_keepalive:   idle time used when SO_KEEPALIVE is enable
         :param tcp_keepintvl:   interval between keepalives
         :param tcp_keepcnt:     number of keepalives before close
+        :param verifyhash:      if True, calculate the hash of the data sent
+                                with a PUT and of the data read after a GET
+                                while it is streamed, and verify it against
+                                the *X-HCP-Hash* header returned by HCP
+        :param hashscheme:      the hash scheme (one of *H_ALL*) used for
+                                data sent; it needs to match the hash
+                                scheme of the namespace to be verifiable
+        :param recorder:        an *hcpsdk.trace.Recorder()* object the
+                                Requests get recorded to
 
         *Connection()* retries *request()s* if:
             a)  the underlying connection has been closed by HCP before
@@ -483,6 +924,21 @@ class Connection(object):
             end doesn't answer.  See ``man tcp`` for the details.
 
             ..  versionadded:: 0.9.4.3
+
+        With *verifyhash* set to *True*, the hash of the data is calculated
+        on the fly, while it is sent to or read from HCP - there is no extra
+        pass over the data. A mismatch with the *X-HCP-Hash* header raises
+        *HcpsdkHashError*; for a GET, this happens on the *read()* that
+        finishes the transfer.
+
+            ..  versionadded:: 0.9.5.0
+
+        With a *recorder*, each Request is written to a trace, with its
+        method, url, status, the bytes sent and read and the time it took
+        to connect, to get the *Response* and to *read()* it; the trace can
+        be re-issued by *hcpsdk.trace.Replayer()*.
+
+            ..  versionadded:: 0.9.5.0
         """
         self.logger = logging.getLogger(__name__ + '.Connection')
 
@@ -501,6 +957,18 @@ class Connection(object):
         self.tcp_keepalive = tcp_keepalive
         self.tcp_keepintvl = tcp_keepintvl
         self.tcp_keepcnt = tcp_keepcnt
+        self.__verifyhash = verifyhash  # calculate and verify hashes on the fly
+        self.__hashscheme = hashscheme  # the hash scheme used for uploads
+        if self.__verifyhash:
+            _newhash(self.__hashscheme)  # fail early on unknown schemes
+        self.__hash = None  # the hash object for the actual transfer
+        self.__hashexpected = None  # the hash value HCP reported
+        self.__hashdigest = None  # the hash calculated for the last transfer
+        self.__hashurl = None  # the url of the transfer to verify
+        self.__recorder = recorder  # an hcpsdk.trace.Recorder, or None
+        self.__stream = recorder.stream() if recorder else None
+        self.__pending = None  # the Request to be recorded
+        self._pool = None  # the ConnectionPool that used it last
 
         self.__sslcontext = self.__target.sslcontext
         self.__con = None  # http.client.HTTP[S]Connection object
@@ -511,6 +979,7 @@ class Connection(object):
         self.__service_time2 = 0.0  # the time a Request took incl. all reads, but w/o connect
 
         self.idletimer = None  # used to hold a threading.Timer() object
+        _forked.add(self)
 
         self.logger.log(logging.DEBUG,
                         'Connection object initialized: IP {} ({}) - timeout: '
@@ -591,6 +1060,86 @@ class Connection(object):
             con.set_debuglevel(self.__debuglevel)
         return con
 
+    def _settarget(self, target):
+        """
+        Bind the Connection to another *Target()* of the same *Cluster()*;
+        an open session is kept, as the *Host* and authorization headers are
+        set per Request.
+
+        :param target:  a *Target()* belonging to the same cluster
+        :raises:        *ValueError* if *target* belongs to another cluster
+        """
+        if target is self.__target:
+            return
+        if not target.cluster or target.cluster is not self.__target.cluster:
+            raise ValueError('{} is not in the cluster of {}'
+                             .format(target.fqdn, self.__target.fqdn))
+        self.__target = target
+
+    def _hashbody(self, body):
+        """
+        Setup a new hash object and prepare *body* to be hashed while it is
+        sent.
+
+        :param body:    the payload to be sent
+        :return:        the payload to hand over to *http.client*
+        """
+        self.__hash = _newhash(self.__hashscheme)
+        if body is None:
+            return body
+        elif hasattr(body, 'read'):
+            return _HashingReader(body, self.__hash)
+        elif isinstance(body, str):
+            self.__hash.update(body.encode('iso-8859-1'))
+            return body
+        try:
+            self.__hash.update(memoryview(body))
+            return body
+        except TypeError:
+            # an iterable, hashed chunk by chunk while it's sent
+            return self.__hashiter(body, self.__hash)
+
+    @staticmethod
+    def __hashiter(iterable, hashobj):
+        for chunk in iterable:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('iso-8859-1')
+            hashobj.update(chunk)
+            yield chunk
+
+    def _checkhash(self, hashobj, hcphash, url):
+        """
+        Compare the calculated hash with the value of an *X-HCP-Hash* header.
+
+        :param hashobj: the *hashlib* hash object
+        :param hcphash: the *X-HCP-Hash* header value ('<scheme> <hexvalue>')
+        :param url:     the url (used for messages, only)
+        :raises:        *HcpsdkHashError* on mismatch
+        """
+        self.__hashdigest = hashobj.hexdigest().upper()
+        try:
+            scheme, value = hcphash.split()
+        except (AttributeError, ValueError):
+            self.logger.log(logging.DEBUG, 'no usable X-HCP-Hash for {}: {}'
+                            .format(url, hcphash))
+            return
+        try:
+            hcpname = _newhash(scheme).name
+        except ValueError:
+            hcpname = None  # a scheme we can't calculate
+        if hcpname != hashobj.name:
+            self.logger.log(logging.DEBUG,
+                            'hash not verifiable for {}: HCP uses {}'
+                            .format(url, scheme))
+        elif value.upper() != self.__hashdigest:
+            raise HcpsdkHashError('hash mismatch for {}: {} {} (calculated) '
+                                  '!= {} (HCP)'.format(url, scheme,
+                                                       self.__hashdigest,
+                                                       value.upper()))
+        else:
+            self.logger.log(logging.DEBUG, 'hash verified for {}: {} {}'
+                            .format(url, scheme, self.__hashdigest))
+
     def request(self, method, url, body=None, params=None, headers=None):
         """
         Wraps the *http.client.HTTP[s]Connection.Request()* method to be able to
@@ -620,9 +1169,39 @@ class Connection(object):
         :return:        the original *Response* object received from
                         *http.client.HTTP[S]Connection.requests()*.
         :raises:        one of the *hcpsdk.Hcpsdk[..]Error*\ s or
-                        *hcpsdk.ips.IpsError* in case an IP address cache refresh failed
+                        *hcpsdk.ips.IpsError* in case an IP address cache refresh failed;
+                        *HcpsdkHashError* if hash verification is enabled and
+                        the hash of a PUT's body doesn't match
+        """
+        if not self.__recorder:
+            return self._request(method, url, body, params, headers)
+
+        self.__record()  # the previous Request, if not read to the end
+        con = self.__con
+        s_t = time.time()
+        pending = {'start': s_t, 'method': method, 'url': url,
+                   'query': urlencode(params) if params else '',
+                   'status': 0, 'sent': _bodysize(body), 'received': 0,
+                   'connect': 0.0, 'wait': 0.0, 'read': 0.0}
+        try:
+            response = self._request(method, url, body, params, headers)
+        finally:
+            pending['wait'] = time.time() - s_t
+            if self.__con and self.__con is not con:
+                pending['connect'] = self.__connect_time
+                pending['wait'] = max(0.0, pending['wait'] -
+                                      self.__connect_time)
+            self.__pending = pending
+        pending['status'] = response.status
+        return response
+
+    def _request(self, method, url, body=None, params=None, headers=None):
+        """
+        The work horse of *request()*: send the Request and get the Response
+        (recording it is left to *request()*).
         """
         self._cancel_idletimer()  # 1st, cancel the idletimer
+        self.__hash = self.__hashexpected = self.__hashdigest = None
         if not headers:
             headers = self.__target.headers
         else:
@@ -667,8 +1246,12 @@ class Connection(object):
 
                 self.logger.log(logging.DEBUG, '{}: About to request for {}'
                                 .format(method, url))
+                if self.__verifyhash and method == 'PUT':
+                    sendbody = self._hashbody(body)
+                else:
+                    sendbody = body
                 s_t = time.time()
-                self.__con.request(method, url, body=body, headers=headers)
+                self.__con.request(method, url, body=sendbody, headers=headers)
             except ips.IpsError as e:
                 # This is a trigger for the case that *hcpsdk.ips* isn't able
                 # to resolve IP addresses - we simple forward it, as we can't
@@ -892,10 +1475,39 @@ class Connection(object):
                                     '{} Request for {} - after getResponse(): '
                                     'service_time2 = {:0.17f}'
                                     .format(method, url, self.__service_time2))
+                    if self.__verifyhash:
+                        self.__prepare_hashcheck(method, url, params, headers)
 
             self._set_idletimer()
             return self._response
 
+    def __prepare_hashcheck(self, method, url, params, headers):
+        """
+        Verify the hash of an uploaded body or prepare the verification of the
+        data to be read after a GET.
+        """
+        hcphash = self._response.getheader('X-HCP-Hash')
+        if method == 'PUT' and self.__hash:
+            if self._response.status in [200, 201]:
+                try:
+                    self._checkhash(self.__hash, hcphash, url)
+                except HcpsdkHashError:
+                    self._response.read()  # clean up
+                    self._set_idletimer()
+                    raise
+            self.__hash = None
+        elif (method == 'GET' and self._response.status == 200 and hcphash
+              and 'type' not in dict(params or {})
+              and 'Range' not in headers):
+            try:
+                self.__hash = _newhash(hcphash.split()[0])
+            except ValueError as e:
+                self.logger.log(logging.DEBUG, 'hash not verifiable for {}: {}'
+                                .format(url, e))
+            else:
+                self.__hashexpected = hcphash
+                self.__hashurl = url
+
     def getheader(self, *args, **kwargs):
         """
         Used to get a single *Response* header. Wraps
@@ -970,6 +1582,8 @@ class Connection(object):
                     end of transfer, which means that the Connection is ready
                     for another Request.
         :raises:    *HcpsdkTimeoutError* in case a socket.timeout was catched,
+                    *HcpsdkHashError* if hash verification is enabled and the
+                    hash of the data read doesn't match,
                     *HcpsdkError* in all other cases.
         """
         s_t = time.time()
@@ -991,6 +1605,17 @@ class Connection(object):
         else:
             self.__service_time2 += self.__service_time1
             readsize = len(buf)
+            if self.__pending:
+                self.__pending['received'] += readsize
+                self.__pending['read'] += self.__service_time1
+                if not readsize or self._response.isclosed():
+                    self.__record()
+            if self.__hashexpected:
+                self.__hash.update(buf)
+                if not readsize or self._response.isclosed():
+                    hashobj, hcphash = self.__hash, self.__hashexpected
+                    self.__hash = self.__hashexpected = None
+                    self._checkhash(hashobj, hcphash, self.__hashurl)
             if readsize:
                 self.logger.log(logging.DEBUG,
                                 '(partial?) read {} bytes: service_time1/2 = '
@@ -1016,6 +1641,7 @@ class Connection(object):
            persistent runs in a separate thread, which will be canceled on
            *close()*.
         """
+        self.__record()
         # noinspection PyBroadException
         if self.__con:
             try:
@@ -1030,6 +1656,31 @@ class Connection(object):
                                       'IP {} ({})'
                                 .format(self.__address, self.__target.fqdn))
 
+    def _afterfork(self):
+        """
+        Drop the session inherited from the parent process; a new one gets
+        opened with the next Request.
+        """
+        self.idletimer = None
+        self.__con = None
+        self._response = None
+        self.__pending = None
+        # the recorder's lock and file belong to the parent process
+        self.__recorder = self.__stream = None
+
+    def __record(self):
+        """
+        Hand the pending Request over to the recorder.
+        """
+        pending, self.__pending = self.__pending, None
+        if pending:
+            self.__recorder.record(pending['start'], self.__stream,
+                                   pending['method'], pending['url'],
+                                   pending['query'], pending['status'],
+                                   pending['sent'], pending['received'],
+                                   pending['connect'], pending['wait'],
+                                   pending['read'])
+
     # properties for externally visible attributes
     def __getaddress(self):
         return self.__address
@@ -1093,6 +1744,15 @@ class Connection(object):
                              'to now. Sum of all ``service_time1`` during '
                              'handling a Request (r/o)')
 
+    def __gethash(self):
+        return self.__hashdigest
+    hash = property(__gethash, None, None,
+                    'The hash (hex, uppercase) calculated for the data sent '
+                    'with the last PUT or read after the last GET, if '
+                    '*verifyhash* is enabled; available after the transfer '
+                    'has finished, *None* otherwise (r/o)\n\n'
+                    '.. versionadded:: 0.9.5.0')
+
     def __getdebug_level(self):
         return self.__debuglevel
     def __setdebug_level(self, value):
@@ -1115,6 +1775,164 @@ class Connection(object):
                         self.__address))
 
 
+class ConnectionPool(object):
+    """
+    A thread-safe pool of *Connection* objects to a single *Target*.
+
+    *Connection()*\\ s are created on demand, up to *size*, and are
+    re-used after having been released to the pool, which saves the effort
+    to setup a new session (and the TLS handshake) for each Request.
+
+    If the *Target()* belongs to a *Cluster()*, the idle *Connection()*\\ s
+    are shared with the pools of all other *Target()*\\ s of that cluster
+    (created with the same *kwargs*), up to the cluster's *maxidle*; *size*
+    still limits the number of *Connection()*\\ s in use by this pool.
+
+    In a child process after *os.fork()*, the pool starts over empty, as
+    its sessions are shared with the parent process.
+    """
+
+    def __init__(self, target, size=4, **kwargs):
+        """
+        :param target:  an initialized Target object
+        :param size:    the max. number of *Connection()*\\ s in the pool
+        :param kwargs:  keyword arguments passed to *Connection()* (timeout,
+                        idletime, retries, debuglevel, ...)
+
+        ..  versionadded:: 0.9.5.0
+        """
+        self.logger = logging.getLogger(__name__ + '.ConnectionPool')
+        if size < 1:
+            raise ValueError('size needs to be 1 or more')
+        self.__target = target
+        self.__size = size
+        self.__kwargs = kwargs
+        if target.cluster:
+            self.__idle = target.cluster._idlequeue(kwargs)
+        else:
+            self.__idle = _IdleQueue()
+        self.__slots = BoundedSemaphore(size)
+        _forked.add(self)
+        self.logger.debug('ConnectionPool initialized for {} ({} Connections)'
+                          .format(self.__target.fqdn, self.__size))
+
+    def acquire(self, timeout=None):
+        """
+        Get a *Connection()* out of the pool; blocks until one is available.
+
+        :param timeout: max. seconds to wait for a *Connection()*, forever
+                        if *None*
+        :return:        a *Connection()* object, exclusive to the caller until
+                        it has been *release()*\\ d
+        :raises:        *HcpsdkTimeoutError* if *timeout* has passed
+        """
+        if not self.__slots.acquire(timeout=timeout):
+            raise HcpsdkTimeoutError('no Connection available within {} '
+                                     'seconds'.format(timeout))
+        con = self.__idle.get()
+        if con is None:
+            try:
+                con = Connection(self.__target, **self.__kwargs)
+            except Exception:
+                self.__slots.release()
+                raise
+        elif self.__target.cluster:
+            con._settarget(self.__target)
+        con._pool = self  # the pool that used it last closes it
+        return con
+
+    def release(self, con):
+        """
+        Return a *Connection()* to the pool. If the last *Response* hasn't been
+        read completely, the *Connection()* gets closed, to make sure that
+        the next user gets a clean one.
+
+        :param con: a *Connection()* acquired from this pool
+        """
+        if con.response and not con.response.isclosed():
+            con.close()
+        if not self.__idle.put(con):
+            con.close()
+        self.__slots.release()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """
+        Context manager to use a *Connection()* out of the pool::
+
+            with pool.connection() as con:
+                con.HEAD('/rest/object')
+
+        :param timeout: see *acquire()*
+        """
+        con = self.acquire(timeout=timeout)
+        try:
+            yield con
+        finally:
+            self.release(con)
+
+    def map(self, func, iterable):
+        """
+        Call *func(connection, item)* for each item in *iterable*,
+        concurrently using up to *size* *Connection()*\\ s.
+
+        :param func:        a callable taking a *Connection()* and an item
+        :param iterable:    the items to process
+        :return:            a list holding the results, in the order of
+                            *iterable*
+        :raises:            whatever *func* raised first
+        """
+        def _call(item):
+            with self.connection() as con:
+                return func(con, item)
+
+        with ThreadPoolExecutor(max_workers=self.__size) as executor:
+            return list(executor.map(_call, iterable))
+
+    def close(self):
+        """
+        Close all idle *Connection()*\\ s in the pool. The pool stays usable,
+        new sessions will be opened as needed.
+
+        For a *Target()* bound to a *Cluster()*, the idle *Connection()*\\ s
+        last used by this pool are closed; those of other pools stay in the
+        shared queue (*Cluster.close()* closes all of them).
+        """
+        for con in self.__idle.take(self):
+            con.close()
+        self.logger.debug('ConnectionPool for {} closed'
+                          .format(self.__target.fqdn))
+
+    def _afterfork(self):
+        """
+        Start over with an empty pool.
+        """
+        if self.__target.cluster:
+            self.__idle = self.__target.cluster._idlequeue(self.__kwargs)
+        else:
+            self.__idle = _IdleQueue()
+        self.__slots = BoundedSemaphore(self.__size)
+
+    # properties for the read-only attributes
+    def __gettarget(self):
+        return self.__target
+    target = property(__gettarget, None, None,
+                      'The Target object the pool is bound to (r/o)')
+
+    def __getsize(self):
+        return self.__size
+    size = property(__getsize, None, None,
+                    'The max. number of Connections in the pool (r/o)')
+
+    def __repr__(self):
+        return "<{} class at {}>".format(ConnectionPool.__name__, id(self))
+
+    def __str__(self):
+        return ("<{} class initialized for fqdn {} ({} Connections)>"
+                .format(ConnectionPool.__name__, self.__target.fqdn,
+                        self.__size))
+
+
 # helper functions
 def checkport(target, port):
     """
@@ -0,0 +1,611 @@
+# -*- coding: utf-8 -*-
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2016 Thorsten Simons (sw@snomis.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import hcpsdk
+from bisect import bisect_right
+from collections import OrderedDict
+from threading import Lock, Thread
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+import uuid
+
+__all__ = ['Workload', 'Bench', 'parsesize', 'main']
+
+logging.getLogger('hcpsdk.bench').addHandler(logging.NullHandler())
+
+# the percentiles reported
+PERCENTILES = OrderedDict([('p50', 50), ('p95', 95), ('p99', 99),
+                           ('p999', 99.9)])
+
+# the bucket bounds used to record latencies (10 us to about 3 hours)
+_BOUNDS = hcpsdk.timeseries.Histogram.exponential(start=0.00001, count=120)
+
+_UNITS = {'': 1, 'k': 2**10, 'm': 2**20, 'g': 2**30}
+
+
+def parsesize(size):
+    """
+    Convert a size given as number or string with an optional unit
+    (*k*, *m* or *g*, binary) into a number of bytes.
+
+    :param size:    an int or a string like *'64k'*
+    :return:        the number of bytes
+    :raises:        *ValueError* if *size* can't be parsed
+    """
+    if isinstance(size, int):
+        return size
+    m = re.match(r'^\s*(\d+)\s*([kmg]?)b?\s*$', str(size), re.IGNORECASE)
+    if not m:
+        raise ValueError('invalid size: {}'.format(size))
+    return int(m.group(1)) * _UNITS[m.group(2).lower()]
+
+
+class Workload(object):
+    """
+    The specification of a benchmark run.
+
+    ..  versionadded:: 0.9.5.0
+    """
+    OPS = ('PUT', 'GET', 'HEAD', 'DELETE')
+
+    def __init__(self, mix=None, sizes=4096, concurrency=4, duration=30,
+                 warmup=5, path='/rest/hcpsdk_bench', preload=100,
+                 seed=None):
+        """
+        :param mix:         a dict holding the relative weights of the
+                            operations (*OPS*), defaults to
+                            *{'PUT': 1, 'GET': 1}*
+        :param sizes:       the object size distribution; a size (*4096*,
+                            *'64k'*), a uniform range (*'4k-1m'* or
+                            *[4096, 1048576]*), weighted sizes (*'4k:9,1m:1'*
+                            or *[[4096, 9], [1048576, 1]]*) or a callable
+                            drawing a size from the *random.Random* object
+                            it gets passed
+        :param concurrency: the number of parallel workers
+        :param duration:    the time (secs) to measure
+        :param warmup:      the time (secs) to run before measuring
+        :param path:        the directory to work in; a sub-directory is
+                            created per run
+        :param preload:     the number of objects written before the run,
+                            for the GET, HEAD and DELETE operations to work
+                            on
+        :param seed:        the seed for the random decisions
+        :raises:            *ValueError* on invalid parameters
+        """
+        self.mix = OrderedDict(sorted((mix or {'PUT': 1, 'GET': 1}).items()))
+        for op, weight in self.mix.items():
+            if op not in Workload.OPS:
+                raise ValueError('invalid operation: {}'.format(op))
+            if weight < 0:
+                raise ValueError('invalid weight for {}: {}'
+                                 .format(op, weight))
+        if not sum(self.mix.values()):
+            raise ValueError('the mix needs at least one operation')
+        if concurrency < 1:
+            raise ValueError('concurrency needs to be 1 or more')
+        self.sizes = sizes
+        self.concurrency = concurrency
+        self.duration = duration
+        self.warmup = warmup
+        self.path = path.rstrip('/')
+        self.preload = preload
+        self.seed = seed
+
+        self.__ops = list(self.mix.keys())
+        self.__cumulative = []
+        total = 0
+        for weight in self.mix.values():
+            total += weight
+            self.__cumulative.append(total)
+        self.__sizer = self._sizer(sizes)
+
+    @staticmethod
+    def fromdict(spec):
+        """
+        Create a *Workload()* from a dict (read from a JSON file, for
+        example).
+
+        :param spec:    a dict holding (some of) the parameters of
+                        *Workload()*
+        :return:        a *Workload()* object
+        :raises:        *ValueError* on invalid parameters
+        """
+        try:
+            return Workload(**spec)
+        except TypeError as e:
+            raise ValueError('invalid workload: {}'.format(e))
+
+    def todict(self):
+        """
+        :return:    the parameters as dict
+        """
+        return OrderedDict([('mix', self.mix),
+                            ('sizes', self.sizes if not callable(self.sizes)
+                             else repr(self.sizes)),
+                            ('concurrency', self.concurrency),
+                            ('duration', self.duration),
+                            ('warmup', self.warmup),
+                            ('path', self.path),
+                            ('preload', self.preload),
+                            ('seed', self.seed)])
+
+    @staticmethod
+    def _sizer(sizes):
+        """
+        Build a callable that draws object sizes.
+
+        :param sizes:   see *Workload()*
+        :return:        a callable taking a *random.Random* object
+        """
+        if callable(sizes):
+            return lambda rnd: max(0, int(sizes(rnd)))
+        if isinstance(sizes, str):
+            if ':' in sizes:
+                sizes = [s.split(':') for s in sizes.split(',')]
+            elif '-' in sizes:
+                sizes = sizes.split('-')
+        if isinstance(sizes, (list, tuple)):
+            if sizes and isinstance(sizes[0], (list, tuple)):
+                values = [parsesize(s) for s, w in sizes]
+                cumulative = []
+                total = 0
+                for s, w in sizes:
+                    total += float(w)
+                    cumulative.append(total)
+                if not total:
+                    raise ValueError('invalid sizes: {}'.format(sizes))
+                return lambda rnd: values[
+                    bisect_right(cumulative, rnd.random() * total)]
+            elif len(sizes) == 2:
+                lo, hi = parsesize(sizes[0]), parsesize(sizes[1])
+                return lambda rnd: rnd.randint(lo, hi)
+            raise ValueError('invalid sizes: {}'.format(sizes))
+        size = parsesize(sizes)
+        return lambda rnd: size
+
+    def op(self, rnd):
+        """
+        Draw an operation.
+
+        :param rnd: a *random.Random* object
+        :return:    one of *OPS*
+        """
+        return self.__ops[bisect_right(self.__cumulative,
+                                       rnd.random() * self.__cumulative[-1])]
+
+    def size(self, rnd):
+        """
+        Draw an object size.
+
+        :param rnd: a *random.Random* object
+        :return:    the size in bytes
+        """
+        return self.__sizer(rnd)
+
+    def __repr__(self):
+        return "<{} class at {}>".format(Workload.__name__, id(self))
+
+    def __str__(self):
+        return "<{} class {}>".format(Workload.__name__,
+                                      json.dumps(self.todict()))
+
+
+class _Keys(object):
+    """
+    The names of the objects a worker can read or delete.
+    """
+
+    def __init__(self):
+        self.__keys = []
+        self.__lock = Lock()
+
+    def add(self, key):
+        with self.__lock:
+            self.__keys.append(key)
+
+    def choice(self, rnd):
+        with self.__lock:
+            if self.__keys:
+                return self.__keys[rnd.randrange(len(self.__keys))]
+
+    def pop(self, rnd):
+        with self.__lock:
+            if self.__keys:
+                i = rnd.randrange(len(self.__keys))
+                self.__keys[i], self.__keys[-1] = self.__keys[-1], \
+                    self.__keys[i]
+                return self.__keys.pop()
+
+    def drain(self):
+        with self.__lock:
+            keys, self.__keys = self.__keys, []
+            return keys
+
+
+class _Stats(object):
+    """
+    The results of a single worker, per operation.
+    """
+
+    def __init__(self):
+        self.latency = {op: hcpsdk.timeseries.Histogram(_BOUNDS)
+                        for op in Workload.OPS}
+        self.bytes = dict.fromkeys(Workload.OPS, 0)
+        self.errors = {op: {} for op in Workload.OPS}
+
+    def error(self, op, kind):
+        self.errors[op][kind] = self.errors[op].get(kind, 0) + 1
+
+
+class Bench(object):
+    """
+    Drive a *Workload()* against a *Target()* and measure throughput,
+    latency and errors.
+
+    Each worker uses a *Connection()* out of a *ConnectionPool()* and picks
+    the next operation and object size at random, according to the
+    workload; GET, HEAD and DELETE work on the worker's share of the
+    objects preloaded and the objects it wrote during the run (a PUT is
+    done instead if there are none), so workers never step on each other's
+    objects.
+    Latencies are recorded per worker in *hcpsdk.timeseries.Histogram()*\\ s
+    that get merged for the report, for operations started after the
+    warmup, only.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    def __init__(self, target, workload, cleanup=True, **kwargs):
+        """
+        :param target:      an *hcpsdk.Target()* object
+        :param workload:    a *Workload()* object
+        :param cleanup:     delete the objects written when finished
+        :param kwargs:      keyword arguments passed to *Connection()*
+                            (timeout, retries, verifyhash, ...)
+        """
+        self.logger = logging.getLogger(__name__ + '.Bench')
+        self.target = target
+        self.workload = workload
+        self.cleanup = cleanup
+        self.pool = hcpsdk.ConnectionPool(target, size=workload.concurrency,
+                                          **kwargs)
+        self.__payload = b''
+        self.__plock = Lock()
+
+    def _payload(self, size):
+        """
+        Get *size* bytes of random data, to be sent with a PUT.
+        """
+        if size > len(self.__payload):
+            with self.__plock:
+                if size > len(self.__payload):
+                    self.__payload += os.urandom(size - len(self.__payload))
+        return self.__payload[:size]
+
+    def _do(self, con, op, key, size):
+        """
+        Run a single operation.
+
+        :return:    a tuple *(error, bytes)*; *error* is *None* if the
+                    operation succeeded, the status or the name of the
+                    exception raised otherwise
+        """
+        nbytes = 0
+        try:
+            if op == 'PUT':
+                r = con.PUT(key, self._payload(size))
+                con.read()
+                nbytes = size
+                ok = r.status == 201
+            elif op == 'GET':
+                r = con.GET(key)
+                nbytes = len(con.read())
+                ok = r.status == 200
+            else:
+                r = con.request(op, key)
+                con.read()
+                ok = r.status == 200
+        except Exception as e:
+            con.close()
+            return type(e).__name__, 0
+        return (None, nbytes) if ok else (str(r.status), 0)
+
+    def _worker(self, no, keys, directory, start, end, stats):
+        """
+        Run operations until *end* is reached.
+        """
+        workload = self.workload
+        rnd = random.Random(workload.seed * 1000 + no
+                            if workload.seed is not None else None)
+        written = 0
+        with self.pool.connection() as con:
+            while True:
+                t1 = time.time()
+                if t1 >= end:
+                    break
+                op = workload.op(rnd)
+                key = None
+                if op in ('GET', 'HEAD'):
+                    key = keys.choice(rnd)
+                elif op == 'DELETE':
+                    key = keys.pop(rnd)
+                if not key:
+                    op = 'PUT'
+                    key = '{}/w{}-{}'.format(directory, no, written)
+                    written += 1
+                error, nbytes = self._do(con, op, key, workload.size(rnd)
+                                         if op == 'PUT' else 0)
+                t2 = time.time()
+                if not error and op == 'PUT':
+                    keys.add(key)
+                if t1 < start:
+                    # operations started during warmup are not reported
+                    continue
+                if error:
+                    stats.error(op, error)
+                else:
+                    stats.latency[op].add(t2 - t1)
+                    stats.bytes[op] += nbytes
+
+    def _preload(self, keys, directory):
+        """
+        Write the objects to work on, distributed to the workers' *keys*;
+        objects that fail to be written are left out.
+        """
+        rnd = random.Random(self.workload.seed)
+        sizes = [self.workload.size(rnd)
+                 for i in range(self.workload.preload)]
+
+        def _put(con, item):
+            key = '{}/p{}'.format(directory, item)
+            owner = keys[item % len(keys)]
+            try:
+                r = con.PUT(key, self._payload(sizes[item]))
+                con.read()
+            except Exception as e:
+                self.logger.debug('preload of {} failed: {}'.format(key, e))
+                con.close()
+                return
+            if r.status == 201:
+                owner.add(key)
+            else:
+                self.logger.debug('preload of {} failed: {} {}'
+                                  .format(key, r.status, r.reason))
+
+        self.pool.map(_put, range(self.workload.preload))
+
+    def _delete(self, keys):
+        """
+        Delete the objects written.
+        """
+        def _del(con, key):
+            try:
+                con.DELETE(key)
+                con.read()
+            except Exception as e:
+                self.logger.debug('cleanup of {} failed: {}'.format(key, e))
+
+        self.pool.map(_del, keys)
+
+    def run(self):
+        """
+        Run the benchmark.
+
+        :return:    the report, a dict ready to be dumped as JSON
+        """
+        workload = self.workload
+        directory = '{}/{}'.format(workload.path, uuid.uuid4().hex)
+        keys = [_Keys() for i in range(workload.concurrency)]
+        self._preload(keys, directory)
+
+        start = time.time() + workload.warmup
+        end = start + workload.duration
+        stats = [_Stats() for i in range(workload.concurrency)]
+        threads = [Thread(target=self._worker, name='hcpsdk.Bench',
+                          args=(i, keys[i], directory, start, end, stats[i]),
+                          daemon=True)
+                   for i in range(workload.concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = max(time.time() - start, 0.000001)
+
+        if self.cleanup:
+            self._delete([key for k in keys for key in k.drain()])
+        return self._report(stats, elapsed)
+
+    def _report(self, stats, elapsed):
+        """
+        Merge the workers' results into the report.
+        """
+        def _latency(histogram):
+            d = OrderedDict([('mean', histogram.mean())])
+            for name, q in PERCENTILES.items():
+                d[name] = histogram.percentile(q)
+            d['max'] = histogram.max
+            return d
+
+        def _section(count, errors, bytes, histogram):
+            return OrderedDict([
+                ('operations', count + sum(errors.values())),
+                ('errors', sum(errors.values())),
+                ('errorrate', sum(errors.values()) /
+                 (count + sum(errors.values())) if errors else 0.0),
+                ('throughput', OrderedDict([('ops', count / elapsed),
+                                            ('bytes', bytes / elapsed)])),
+                ('latency', _latency(histogram)),
+                ('errorcodes', errors)])
+
+        total = hcpsdk.timeseries.Histogram(_BOUNDS)
+        totalerrors = {}
+        totalbytes = 0
+        ops = OrderedDict()
+        for op in Workload.OPS:
+            histogram = hcpsdk.timeseries.Histogram(_BOUNDS)
+            errors = {}
+            nbytes = 0
+            for s in stats:
+                histogram.merge(s.latency[op])
+                nbytes += s.bytes[op]
+                for kind, n in s.errors[op].items():
+                    errors[kind] = errors.get(kind, 0) + n
+            if not histogram.count and not errors:
+                continue
+            ops[op] = _section(histogram.count, errors, nbytes, histogram)
+            total.merge(histogram)
+            totalbytes += nbytes
+            for kind, n in errors.items():
+                totalerrors[kind] = totalerrors.get(kind, 0) + n
+
+        report = OrderedDict([('target', self.target.fqdn),
+                              ('workload', self.workload.todict()),
+                              ('elapsed', elapsed)])
+        report.update(_section(total.count, totalerrors, totalbytes, total))
+        report['ops'] = ops
+        return report
+
+    def close(self):
+        """
+        Close the *Connection()*\\ s.
+        """
+        self.pool.close()
+
+    def __repr__(self):
+        return "<{} class at {}>".format(Bench.__name__, id(self))
+
+    def __str__(self):
+        return "<{} class for {}>".format(Bench.__name__, self.target.fqdn)
+
+
+def _parsemix(mix):
+    """
+    Parse a mix given as *PUT=1,GET=3*.
+    """
+    try:
+        return {op.strip().upper(): float(weight) for op, weight in
+                (m.split('=') for m in mix.split(','))}
+    except ValueError:
+        raise argparse.ArgumentTypeError('invalid mix: {}'.format(mix))
+
+
+def main(argv=None):
+    """
+    The command line interface::
+
+        hcpsdk-bench [-w workload.json] [--mix PUT=1,GET=3] [--sizes 4k-1m]
+                     [-c concurrency] [-d duration] [--warmup secs]
+                     [-u user -p password] [--port port] [-o report.json]
+                     [--record trace] (fqdn | --emulator)
+
+    Options given on the command line override the ones in the workload
+    file. The report is written as JSON.
+
+    :param argv:    the arguments, *sys.argv[1:]* if *None*
+    :return:        the exit code
+    """
+    parser = argparse.ArgumentParser(
+        prog='hcpsdk-bench',
+        description='Benchmark an HCP Namespace through hcpsdk.')
+    parser.add_argument('fqdn', nargs='?',
+                        help='the Namespace ([namespace.]tenant.hcp.loc)')
+    parser.add_argument('--emulator', action='store_true',
+                        help='run against an in-process hcpsdk.emulator')
+    parser.add_argument('-u', '--user', help='the data access user')
+    parser.add_argument('-p', '--password', default='',
+                        help='the password')
+    parser.add_argument('--port', type=int, default=hcpsdk.P_HTTPS,
+                        help='the port (default: %(default)s)')
+    parser.add_argument('--dnscache', action='store_true',
+                        help='use the system resolver')
+    parser.add_argument('-w', '--workload', type=argparse.FileType('r'),
+                        help='a JSON file holding the workload')
+    parser.add_argument('--mix', type=_parsemix,
+                        help='the operation mix, like PUT=1,GET=3')
+    parser.add_argument('--sizes',
+                        help='the object sizes, like 64k, 4k-1m or 4k:9,1m:1')
+    parser.add_argument('-c', '--concurrency', type=int)
+    parser.add_argument('-d', '--duration', type=float)
+    parser.add_argument('--warmup', type=float)
+    parser.add_argument('--path', help='the directory to work in')
+    parser.add_argument('--preload', type=int)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--retries', type=int, default=0,
+                        help='retries per Request (default: %(default)s)')
+    parser.add_argument('--no-cleanup', dest='cleanup', action='store_false',
+                        help='keep the objects written')
+    parser.add_argument('--record', metavar='TRACE',
+                        help='record the Requests to a trace file, to be '
+                             'replayed by hcpsdk-replay')
+    parser.add_argument('-o', '--output', type=argparse.FileType('w'),
+                        default=sys.stdout, help='the report file')
+    args = parser.parse_args(argv)
+    if bool(args.fqdn) == args.emulator:
+        parser.error('either fqdn or --emulator is required')
+
+    spec = json.load(args.workload) if args.workload else {}
+    for key in ('mix', 'sizes', 'concurrency', 'duration', 'warmup', 'path',
+                'preload', 'seed'):
+        if getattr(args, key) is not None:
+            spec[key] = getattr(args, key)
+
+    emulator = None
+    bench = None
+    recorder = None
+    try:
+        workload = Workload.fromdict(spec)
+        if args.emulator:
+            emulator = hcpsdk.emulator.Emulator(seed=workload.seed)
+            emulator.start()
+            target = emulator.target('bench.hcpsdk')
+        else:
+            auth = (hcpsdk.NativeAuthorization(args.user, args.password)
+                    if args.user else hcpsdk.DummyAuthorization())
+            target = hcpsdk.Target(args.fqdn, auth, port=args.port,
+                                   dnscache=args.dnscache)
+        if args.record:
+            recorder = hcpsdk.trace.Recorder(args.record)
+        bench = Bench(target, workload, cleanup=args.cleanup,
+                      retries=args.retries, recorder=recorder)
+        report = bench.run()
+    except (OSError, ValueError, hcpsdk.HcpsdkError, hcpsdk.ips.IpsError,
+            hcpsdk.emulator.EmulatorError) as e:
+        print('error: {}'.format(e), file=sys.stderr)
+        return 1
+    finally:
+        if bench:
+            bench.close()
+        if recorder:
+            recorder.close()
+        if emulator:
+            emulator.stop()
+
+    json.dump(report, args.output, indent=2)
+    args.output.write('\n')
+    return 0
@@ -0,0 +1,742 @@
+# -*- coding: utf-8 -*-
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2016 Thorsten Simons (sw@snomis.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import hcpsdk
+from hashlib import sha256
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from threading import Lock, Thread
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+from xml.sax.saxutils import quoteattr
+import copy
+import ipaddress
+import logging
+import random
+import socket
+import ssl
+import time
+
+__all__ = ['EmulatorError', 'Profile', 'Node', 'Emulator']
+
+logging.getLogger('hcpsdk.emulator').addHandler(logging.NullHandler())
+
+
+class EmulatorError(Exception):
+    """
+    Raised if an *Emulator()* can't be started.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    def __init__(self, reason):
+        """
+        :param reason:  an error description
+        """
+        self.args = (reason,)
+
+
+class Profile(object):
+    """
+    The behaviour of an emulated node. All attributes can be changed while
+    the *Emulator()* is running; changes take effect with the next Request
+    (*keepalive* with the next connection).
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    def __init__(self, latency=0.0, bandwidth=None, drop=0.0, busy=0.0,
+                 keepalive=None):
+        """
+        :param latency:     the time (secs) a Request is delayed before it
+                            gets served; a number, a tuple *(low, high)* for a
+                            uniform distribution, or a callable that draws a
+                            value from the *random.Random* object it gets
+                            passed (*lambda r: r.expovariate(50)*, for
+                            example)
+        :param bandwidth:   the max. bytes per second a connection
+                            sends or receives, unlimited if *None*
+        :param drop:        the probability (0..1) a Request gets answered
+                            by closing the connection
+        :param busy:        the probability (0..1) a Request gets answered
+                            with *503 Service Unavailable*
+        :param keepalive:   the time (secs) an idle connection is kept open,
+                            forever if *None*
+        """
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.drop = drop
+        self.busy = busy
+        self.keepalive = keepalive
+
+    def delay(self, rnd):
+        """
+        Draw the latency for a single Request.
+
+        :param rnd: a *random.Random* object
+        :return:    the latency (secs)
+        """
+        if callable(self.latency):
+            return max(0.0, self.latency(rnd))
+        elif isinstance(self.latency, tuple):
+            return rnd.uniform(*self.latency)
+        else:
+            return self.latency
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def handle_error(self, request, client_address):
+        self.node.logger.debug('connection from {} failed'
+                               .format(client_address), exc_info=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    Serves the Requests of a single connection to a *Node()*.
+    """
+    protocol_version = 'HTTP/1.1'
+    server_version = 'HCP'
+
+    def setup(self):
+        self.node = self.server.node
+        self.timeout = self.node.profile.keepalive
+        # headers and body are written separately; don't let Nagle's
+        # algorithm delay the body until the client's delayed ACK
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if isinstance(self.request, ssl.SSLSocket):
+            self.request.do_handshake()
+        super().setup()
+        self.node._opened(self.request)
+
+    def finish(self):
+        try:
+            super().finish()
+        finally:
+            self.node._closed(self.request)
+
+    def log_message(self, format, *args):
+        self.node.logger.debug('{} - {}'.format(self.address_string(),
+                                                format % args))
+
+    def do_GET(self):
+        node = self.node
+        emulator = node._emulator
+        profile = node.profile
+        node._count('requests')
+        body = self._readbody()
+
+        if emulator._chance(profile.drop):
+            node._count('drops')
+            self.close_connection = True
+            return
+        delay = emulator._delay(profile)
+        if delay:
+            time.sleep(delay)
+        if emulator._chance(profile.busy):
+            node._count('busy')
+            self._send(503)
+            return
+
+        url = urlsplit(self.path)
+        path = unquote(url.path)
+        params = parse_qs(url.query)
+        if path.startswith('/mapi'):
+            status, headers, content = emulator._mapi(self.command, path,
+                                                      params, body)
+        elif path.startswith('/proc'):
+            status, headers, content = emulator._proc(self.command,
+                                                      self.headers['Host'],
+                                                      path, params)
+        else:
+            status, headers, content = emulator._rest(self.command,
+                                                      self.headers['Host'],
+                                                      path, params, body)
+        self._send(status, headers, content)
+
+    do_HEAD = do_PUT = do_POST = do_DELETE = do_GET
+
+    def _readbody(self):
+        """
+        Read the body of a Request, if any.
+        """
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                if not size:
+                    while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                chunks.append(self._read(size))
+                self.rfile.readline()
+            return b''.join(chunks)
+        else:
+            return self._read(int(self.headers.get('Content-Length') or 0))
+
+    def _read(self, size):
+        """
+        Read *size* bytes from the connection, limited to the bandwidth.
+        """
+        bandwidth = self.node.profile.bandwidth
+        if not bandwidth:
+            data = self.rfile.read(size)
+        else:
+            chunks = []
+            start = time.time()
+            got = 0
+            while got < size:
+                chunk = self.rfile.read(min(size - got,
+                                            max(1, int(bandwidth) // 20)))
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                got += len(chunk)
+                time.sleep(max(0.0, start + got / bandwidth - time.time()))
+            data = b''.join(chunks)
+        self.node._count('received', len(data))
+        return data
+
+    def _write(self, data):
+        """
+        Write *data* to the connection, limited to the bandwidth.
+        """
+        bandwidth = self.node.profile.bandwidth
+        if not bandwidth:
+            self.wfile.write(data)
+        else:
+            start = time.time()
+            blocksize = max(1, int(bandwidth) // 20)
+            for i in range(0, len(data), blocksize):
+                self.wfile.write(data[i:i + blocksize])
+                time.sleep(max(0.0, start + (i + blocksize) / bandwidth -
+                               time.time()))
+        self.node._count('sent', len(data))
+
+    def _send(self, status, headers=None, content=b''):
+        """
+        Send a Response.
+        """
+        headers = headers or {}
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        if 'Content-Length' not in headers:
+            self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if content and self.command != 'HEAD':
+            self._write(content)
+
+
+class Node(object):
+    """
+    A single node of an *Emulator()*, serving at its own loopback address.
+
+    ..  versionadded:: 0.9.5.0
+    """
+    COUNTERS = ('connections', 'requests', 'drops', 'busy', 'received',
+                'sent')
+
+    def __init__(self, emulator, address, profile):
+        """
+        :param emulator:    the *Emulator()* this node belongs to
+        :param address:     the IP address to serve at
+        :param profile:     the node's *Profile()*
+        """
+        self.logger = logging.getLogger(__name__ + '.Node')
+        self.address = address
+        self.profile = profile
+        self.stats = dict.fromkeys(Node.COUNTERS, 0)
+        self._emulator = emulator
+        self.__server = None
+        self.__sockets = set()
+        self.__lock = Lock()
+
+    def _count(self, name, value=1):
+        with self.__lock:
+            self.stats[name] += value
+
+    def _opened(self, sock):
+        with self.__lock:
+            self.stats['connections'] += 1
+            self.__sockets.add(sock)
+
+    def _closed(self, sock):
+        with self.__lock:
+            self.__sockets.discard(sock)
+
+    def _bind(self, port):
+        """
+        Start serving at *port*.
+
+        :param port:    the port to serve at, an arbitrary free one if 0
+        :return:        the port in use
+        :raises:        *EmulatorError* if the address can't be bound
+        """
+        try:
+            server = _Server((self.address, port), _Handler)
+        except OSError as e:
+            raise EmulatorError('unable to serve at {}:{} - {}'
+                                .format(self.address, port, e))
+        server.node = self
+        if self._emulator._sslcontext:
+            server.socket = self._emulator._sslcontext.wrap_socket(
+                server.socket, server_side=True,
+                do_handshake_on_connect=False)
+        self.__server = server
+        Thread(target=server.serve_forever, kwargs={'poll_interval': 0.1},
+               name='hcpsdk.emulator.Node', daemon=True).start()
+        self.logger.debug('node {} serving at port {}'
+                          .format(self.address, server.server_address[1]))
+        return server.server_address[1]
+
+    def start(self):
+        """
+        (Re-) start a stopped node.
+        """
+        if not self.__server:
+            self._bind(self._emulator.port)
+
+    def stop(self):
+        """
+        Stop the node, like a node failing: the listening socket gets
+        closed, and so do all open connections.
+        """
+        server, self.__server = self.__server, None
+        if not server:
+            return
+        server.shutdown()
+        server.server_close()
+        with self.__lock:
+            sockets = list(self.__sockets)
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.logger.debug('node {} stopped'.format(self.address))
+
+    # properties for the read-only attributes
+    def __getup(self):
+        return self.__server is not None
+    up = property(__getup, None, None,
+                  'True if the node is serving (r/o)')
+
+    def __repr__(self):
+        return "<{} class at {}>".format(Node.__name__, id(self))
+
+    def __str__(self):
+        return "<{} class serving at {}>".format(Node.__name__, self.address)
+
+
+class Emulator(object):
+    """
+    An in-process emulation of an HCP system, to run tests and benchmarks
+    without a real HCP.
+
+    The emulated nodes serve the REST interface (objects and directories
+    per Namespace, with *X-HCP-** headers and directory listings, plus the
+    Namespace information read by *hcpsdk.namespace.Info()*) at
+    consecutive loopback addresses, all at the same port. Names within
+    *domain* get resolved to the addresses of the running nodes by a
+    resolver hooked into :ref:`hcpsdk.ips <hcpsdk_ips_circle>`, so that
+    *hcpsdk.Target()*\\ s work as with a real system. The *mapi* dict holds
+    responses for MAPI Requests, served at the same port.
+
+    Faults are injected per node through its *Profile()*: latency, limited
+    bandwidth, dropped connections, *503* responses and the expiry of idle
+    connections; *dnsdelay* slows down name resolution, and nodes can be
+    stopped and started again. The random decisions are made by a single
+    *random.Random(seed)* object, to allow reproducible runs.
+
+    ..  Note::
+
+        The nodes need to be able to bind 127.0.0.2 and higher, which is
+        the case on Linux, but not on all other platforms.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    def __init__(self, domain='hcp.emulator', nodes=4, port=0,
+                 address='127.0.0.1', certfile=None, keyfile=None,
+                 profile=None, dnsdelay=0.0, seed=None):
+        """
+        :param domain:      the domain name of the emulated system;
+                            Namespaces are addressed as
+                            *namespace.tenant.domain*
+        :param nodes:       the number of nodes
+        :param port:        the port the nodes serve at, an arbitrary free
+                            one if 0
+        :param address:     the address of the first node
+        :param certfile:    a PEM file holding the certificate to serve
+                            https with; if set, the port is added to
+                            *hcpsdk.SSL_PORTS* while the Emulator is running
+        :param keyfile:     a PEM file holding the private key, if not
+                            contained in *certfile*
+        :param profile:     the *Profile()* used for all nodes (each of them
+                            gets its own copy)
+        :param dnsdelay:    the time (secs) it takes to resolve a name
+        :param seed:        the seed for the random decisions
+        """
+        self.logger = logging.getLogger(__name__ + '.Emulator')
+        self.domain = domain.lower().rstrip('.')
+        self.dnsdelay = dnsdelay
+        self.mapi = {}
+        self.__port = port
+        self.__sslport = False
+        self.__random = random.Random(seed)
+        self.__rlock = Lock()
+        self.__objects = {}  # (namespace, path): (data, hash, changetime)
+        self.__dirs = {}  # (namespace, path): [changetime, set of names]
+        self.__olock = Lock()
+
+        if certfile:
+            self._sslcontext = ssl.create_default_context(
+                ssl.Purpose.CLIENT_AUTH)
+            self._sslcontext.load_cert_chain(certfile, keyfile)
+        else:
+            self._sslcontext = None
+
+        profile = profile or Profile()
+        first = ipaddress.IPv4Address(address)
+        self.nodes = [Node(self, str(first + i), copy.copy(profile))
+                      for i in range(nodes)]
+
+    def start(self):
+        """
+        Start the nodes and the name resolution.
+
+        :raises:    *EmulatorError* if a node can't be started
+        """
+        if self._sslcontext is None and self.__port in hcpsdk.SSL_PORTS:
+            raise EmulatorError('port {} requires a certfile'
+                                .format(self.__port))
+        try:
+            for node in self.nodes:
+                self.__port = node._bind(self.__port)
+        except EmulatorError:
+            for node in self.nodes:
+                node.stop()
+            raise
+        if self._sslcontext and self.__port not in hcpsdk.SSL_PORTS:
+            hcpsdk.SSL_PORTS.append(self.__port)
+            self.__sslport = True
+        hcpsdk.ips.addresolver(self._resolve)
+        self.logger.debug('Emulator for {} started ({} nodes, port {})'
+                          .format(self.domain, len(self.nodes), self.__port))
+
+    def stop(self):
+        """
+        Stop the nodes and the name resolution. The objects stored are kept.
+        """
+        hcpsdk.ips.removeresolver(self._resolve)
+        for node in self.nodes:
+            node.stop()
+        if self.__sslport:
+            hcpsdk.SSL_PORTS.remove(self.__port)
+            self.__sslport = False
+        self.logger.debug('Emulator for {} stopped'.format(self.domain))
+
+    def fqdn(self, name):
+        """
+        Get the FQDN of a Namespace (or Tenant).
+
+        :param name:    *namespace.tenant* (or *tenant*)
+        :return:        the FQDN within the emulated system
+        """
+        return '{}.{}'.format(name, self.domain)
+
+    def target(self, name, authorization=None, **kwargs):
+        """
+        Convenience method to create a *hcpsdk.Target()* for the emulated
+        system.
+
+        :param name:            *namespace.tenant*
+        :param authorization:   an *Authorization* object, defaults to
+                                *hcpsdk.DummyAuthorization()*
+        :param kwargs:          keyword arguments passed to
+                                *hcpsdk.Target()*
+        :return:                an *hcpsdk.Target()* object
+        """
+        return hcpsdk.Target(self.fqdn(name),
+                             authorization or hcpsdk.DummyAuthorization(),
+                             port=self.__port, **kwargs)
+
+    def cluster(self):
+        """
+        Convenience method to create a *hcpsdk.Cluster()* for the emulated
+        system.
+
+        :return:    an *hcpsdk.Cluster()* object
+        """
+        return hcpsdk.Cluster(self.domain, port=self.__port)
+
+    def stats(self):
+        """
+        Get the counters, summed up over all nodes.
+
+        :return:    a dict holding the counters (see *Node.COUNTERS*)
+        """
+        stats = dict.fromkeys(Node.COUNTERS, 0)
+        for node in self.nodes:
+            for key, value in node.stats.items():
+                stats[key] += value
+        return stats
+
+    def clear(self):
+        """
+        Remove all objects and directories.
+        """
+        with self.__olock:
+            self.__objects.clear()
+            self.__dirs.clear()
+
+    def _resolve(self, fqdn):
+        """
+        The resolver hooked into *hcpsdk.ips*.
+        """
+        name = fqdn.lower().rstrip('.')
+        if name != self.domain and not name.endswith('.' + self.domain):
+            return None
+        if self.dnsdelay:
+            time.sleep(self.dnsdelay)
+        return [node.address for node in self.nodes if node.up]
+
+    def _chance(self, probability):
+        if not probability:
+            return False
+        with self.__rlock:
+            return self.__random.random() < probability
+
+    def _delay(self, profile):
+        with self.__rlock:
+            return profile.delay(self.__random)
+
+    def _mkdir(self, ns, path, changetime):
+        """
+        Create a directory and its parents (the lock needs to be held).
+
+        :return:    False if *path* or a parent is an object
+        """
+        parent = path
+        while parent not in ('/rest', ''):
+            if (ns, parent) in self.__objects:
+                return False
+            parent = parent.rsplit('/', 1)[0]
+        while path not in ('/rest', ''):
+            parent, name = path.rsplit('/', 1)
+            if (ns, path) not in self.__dirs:
+                self.__dirs[(ns, path)] = [changetime, set()]
+            self.__dirs.setdefault((ns, parent), [changetime, set()])[1].add(name)
+            path = parent
+        return True
+
+    def _listing(self, ns, path, names):
+        """
+        Build the XML listing of a directory (the lock needs to be held).
+        """
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+                 '<directory path={0} utf8Path={0} parentDir={1} '
+                 'dirDeleted="false" showDeleted="false">'
+                 .format(quoteattr(quote(path)),
+                         quoteattr(quote(path.rsplit('/', 1)[0])))]
+        for name in sorted(names):
+            attrs = 'urlName={} utf8Name={}'.format(quoteattr(quote(name)),
+                                                    quoteattr(name))
+            obj = self.__objects.get((ns, path + '/' + name))
+            if obj:
+                lines.append('<entry {} type="object" size="{}" '
+                             'hashScheme="SHA-256" hash="{}" '
+                             'changeTimeMilliseconds="{}" state="created" '
+                             'version="1"/>'
+                             .format(attrs, len(obj[0]), obj[1], obj[2]))
+            else:
+                lines.append('<entry {} type="directory" '
+                             'changeTimeMilliseconds="{}" state="created"/>'
+                             .format(attrs,
+                                     self.__dirs[(ns, path + '/' + name)][0]))
+        lines.append('</directory>')
+        return '\n'.join(lines).encode()
+
+    def _rest(self, method, host, path, params, body):
+        """
+        Serve a REST Request.
+
+        :return:    a tuple (status, headers, content)
+        """
+        ns = (host or '').split(':')[0].lower()
+        path = '/' + path.strip('/')
+        if path != '/rest' and not path.startswith('/rest/'):
+            return 404, {}, b''
+        now = int(time.time() * 1000)
+
+        with self.__olock:
+            obj = self.__objects.get((ns, path))
+            directory = self.__dirs.get((ns, path))
+            if path == '/rest' and not directory:
+                directory = self.__dirs.setdefault((ns, path), [now, set()])
+
+            if method == 'PUT':
+                if obj or directory:
+                    return 409, {}, b''
+                parent = path.rsplit('/', 1)[0]
+                if params.get('type') == ['directory']:
+                    if not self._mkdir(ns, path, now):
+                        return 409, {}, b''
+                    return 201, {'Location': path}, b''
+                if not self._mkdir(ns, parent, now):
+                    return 409, {}, b''
+                digest = sha256(body).hexdigest().upper()
+                self.__objects[(ns, path)] = (body, digest, now)
+                self.__dirs.setdefault((ns, parent), [now, set()])[1].add(
+                    path.rsplit('/', 1)[1])
+                return 201, {'Location': path,
+                             'X-HCP-Hash': 'SHA-256 {}'.format(digest)}, b''
+
+            if obj:
+                headers = {'X-HCP-Type': 'object',
+                           'X-HCP-Size': str(len(obj[0])),
+                           'X-HCP-Hash': 'SHA-256 {}'.format(obj[1]),
+                           'X-HCP-ChangeTimeMilliseconds': str(obj[2]),
+                           'Content-Type': 'application/octet-stream'}
+                if method == 'GET':
+                    return 200, headers, obj[0]
+                elif method == 'HEAD':
+                    headers['Content-Length'] = str(len(obj[0]))
+                    return 200, headers, b''
+                elif method == 'DELETE':
+                    del self.__objects[(ns, path)]
+                    parent, name = path.rsplit('/', 1)
+                    self.__dirs[(ns, parent)][1].discard(name)
+                    return 200, {}, b''
+                else:
+                    return 200, {}, b''
+
+            if directory:
+                headers = {'X-HCP-Type': 'directory'}
+                if method == 'GET':
+                    headers['Content-Type'] = 'application/xml'
+                    return 200, headers, self._listing(ns, path, directory[1])
+                elif method == 'HEAD':
+                    return 200, headers, b''
+                elif method == 'DELETE':
+                    if directory[1] or path == '/rest':
+                        return 409, {}, b''
+                    del self.__dirs[(ns, path)]
+                    parent, name = path.rsplit('/', 1)
+                    self.__dirs[(ns, parent)][1].discard(name)
+                    return 200, {}, b''
+                else:
+                    return 200, {}, b''
+
+        return 404, {}, b''
+
+    def _proc(self, method, host, path, params):
+        """
+        Serve a Request for the Namespace information (*/proc*), as used by
+        *hcpsdk.namespace.Info()*; the statistics are calculated from the
+        objects stored.
+
+        :return:    a tuple (status, headers, content)
+        """
+        if method != 'GET':
+            return 405, {}, b''
+        ns = (host or '').split(':')[0].lower()
+        name = ns.split('.')[0]
+        path = path.rstrip('/')
+        if path == '/proc/statistics':
+            with self.__olock:
+                sizes = [len(obj[0]) for key, obj in self.__objects.items()
+                         if key[0] == ns]
+            xml = ('<statistics xmlns:xsi="{}" xsi:noNamespaceSchemaLocation='
+                   '"/static/xsd/proc-statistics.xsd" namespaceName={} '
+                   'totalCapacityBytes="{}" usedCapacityBytes="{}" '
+                   'softQuotaPercent="85" objectCount="{}" '
+                   'shredObjectCount="0" shredObjectBytes="0" '
+                   'customMetadataObjectCount="0" '
+                   'customMetadataObjectBytes="0"/>'
+                   .format('http://www.w3.org/2001/XMLSchema-instance',
+                           quoteattr(name), 2**40, sum(sizes), len(sizes)))
+        elif path == '/proc':
+            xml = ('<namespaces><namespace name={0} nameIDNA={0} '
+                   'versioningEnabled="false" searchEnabled="false" '
+                   'retentionMode="enterprise" defaultShredValue="false" '
+                   'defaultIndexValue="true" defaultRetentionValue="0" '
+                   'hashScheme="SHA-256" dpl="1"><description>emulated'
+                   '</description></namespace></namespaces>'
+                   .format(quoteattr(name)))
+        elif path == '/proc/retentionClasses':
+            xml = '<retentionClasses/>'
+        elif path == '/proc/permissions':
+            xml = ('<permissions>' +
+                   ''.join('<{} browse="true" read="true" write="true" '
+                           'delete="true" purge="false" search="false"/>'
+                           .format(tag)
+                           for tag in ('namespacePermissions',
+                                       'namespaceEffectivePermissions',
+                                       'userPermissions',
+                                       'userEffectivePermissions')) +
+                   '</permissions>')
+        else:
+            return 404, {}, b''
+        return 200, {'Content-Type': 'application/xml'}, xml.encode()
+
+    def _mapi(self, method, path, params, body):
+        """
+        Serve a MAPI Request from *mapi*: a str (or bytes) value answers GET
+        and HEAD Requests, a callable gets called with *(method, path,
+        params, body)* and returns a tuple *(status, headers, content)*.
+
+        :return:    a tuple (status, headers, content)
+        """
+        response = self.mapi.get(path.rstrip('/'))
+        if response is None:
+            return 404, {}, b''
+        elif callable(response):
+            return response(method, path, params, body)
+        elif method not in ('GET', 'HEAD'):
+            return 405, {}, b''
+        else:
+            if isinstance(response, str):
+                response = response.encode()
+            return 200, {'Content-Type': 'application/xml'}, response
+
+    # properties for the read-only attributes
+    def __getport(self):
+        return self.__port
+    port = property(__getport, None, None,
+                    'The port the nodes serve at (r/o)')
+
+    def __getaddresses(self):
+        return [node.address for node in self.nodes]
+    addresses = property(__getaddresses, None, None,
+                         'The addresses of the nodes (r/o)')
+
+    def __repr__(self):
+        return "<{} class at {}>".format(Emulator.__name__, id(self))
+
+    def __str__(self):
+        return "<{} class for {} ({} nodes)>".format(Emulator.__name__,
+                                                     self.domain,
+                                                     len(self.nodes))
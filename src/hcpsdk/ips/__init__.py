@@ -20,19 +20,28 @@
 # IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
 # CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
+import os
 import threading
 import socket
 import logging
+import weakref
 # noinspection PyPackageRequirements
 import dns
 # noinspection PyPackageRequirements
 import dns.resolver
 
 
-__all__ = ['IpsError', 'Circle', 'Request', 'Response', 'query']
+__all__ = ['IpsError', 'Circle', 'Request', 'Response', 'query',
+           'addresolver', 'removeresolver']
 
 logging.getLogger('hcpsdk.ips').addHandler(logging.NullHandler())
 
+# resolvers consulted by query() before DNS, see addresolver()
+_resolvers = []
+
+# the Circles to reset in a child process after os.fork()
+_circles = weakref.WeakSet()
+
 
 class IpsError(Exception):
     """
@@ -54,14 +63,22 @@ class Circle(object):
     """
     __EMPTY_ADDRLIST = []
 
-    def __init__(self, fqdn, port=443, dnscache=False):
+    def __init__(self, fqdn, port=443, dnscache=False, addresses=None):
         """
         :param fqdn:        the FQDN to be resolved
         :param port:        the port to be used by the **hcpsdk.Target** object
         :param dnscache:    if True, use the system resolver (which **might** do
                             local caching), else use an internal resolver,
                             bypassing any cache available
+        :param addresses:   a list of IP addresses to start with instead of
+                            querying DNS (until **refresh()** is called)
         :returns:           an *hcpsdk.ips.Response* object
+
+        A *Circle* can be pickled (as its FQDN, settings and the IP addresses
+        cached), and resets its lock in a child process after *os.fork()*.
+
+        ..  versionchanged:: 0.9.5.0
+            added *addresses*; can be pickled and is fork-safe
         """
         self.logger = logging.getLogger(__name__ + '.Circle')
         self.__authority = fqdn
@@ -73,9 +90,10 @@ class Circle(object):
         self.logger = logging.getLogger('hcpsdk.ips.Circle')
 
         # initial lookup, build the address cache
-        self._addr(fqdn=self.__authority)
+        self._addr(fqdn=self.__authority, addresses=addresses)
+        _circles.add(self)
 
-    def _addr(self, fqdn=None):
+    def _addr(self, fqdn=None, addresses=None):
         """
         If called with a dnsname (FQDN), query DNS for that name,
         cache the acquired IP addresses.
@@ -86,30 +104,34 @@ class Circle(object):
             This method is intended to be internal to **hcpsdk** and may be used
             from the outside *without* parameters, only.
 
-        :param fqdn:    the FQDN
-        :return:        an IP address (as string)
+        :param fqdn:        the FQDN
+        :param addresses:   IP addresses to use instead of querying DNS
+        :return:            an IP address (as string)
         """
 
-        def __addr(dnsname, dnscache=False):
+        def __addr(dnsname, dnscache=False, addresses=None):
             """
             resolve HCPs IP addresses and build a list with all IPs gathered
             """
-            self._addresses = Circle.__EMPTY_ADDRLIST.copy()
-            result = query(dnsname, cache=dnscache)
-            if result.raised:
-                raise IpsError(result.raised)
-            self._addresses = result.ips.copy()
+            if addresses:
+                self._addresses = [str(ip) for ip in addresses]
+            else:
+                self._addresses = Circle.__EMPTY_ADDRLIST.copy()
+                result = query(dnsname, cache=dnscache)
+                if result.raised:
+                    raise IpsError(result.raised)
+                self._addresses = result.ips.copy()
 
             while True:
                 for ipadr in self._addresses:
                     yield str(ipadr)
 
         # acquire a lock to make sure that one Request gets serviced at a time
-        self._cLock.acquire()
-        if fqdn:
-            self.__generator = __addr(fqdn, dnscache=self.__dnscache)
-        myaddr = next(self.__generator)
-        self._cLock.release()
+        with self._cLock:
+            if fqdn:
+                self.__generator = __addr(fqdn, dnscache=self.__dnscache,
+                                          addresses=addresses)
+            myaddr = next(self.__generator)
         if fqdn:
             self.logger.debug('(re-) loaded IP address cache: {}, dnscache = {}'
                               .format(self._addresses, self.__dnscache))
@@ -123,6 +145,19 @@ class Circle(object):
         self._addr(fqdn=self.__authority)
         self.logger.debug('IP address cache refreshed')
 
+    def _afterfork(self):
+        """
+        Reset the lock (which might have been held by another thread at the
+        time of the fork) and restart the round-robin on the cached IP
+        addresses.
+        """
+        self._cLock = threading.Lock()
+        self._addr(fqdn=self.__authority, addresses=self._addresses)
+
+    def __reduce__(self):
+        return (Circle, (self.__authority, self.__port, self.__dnscache,
+                         list(self._addresses)))
+
     def __getattr__(self, item):
         """
         Used to make _addresses a read-only attributes
@@ -136,6 +171,21 @@ class Circle(object):
         return self.answer.qname
 
 
+def _afterfork():
+    """
+    Called in a child process after *os.fork()*.
+    """
+    for circle in list(_circles):
+        try:
+            circle._afterfork()
+        except IpsError as e:
+            circle.logger.debug('reset after fork failed: {}'.format(e))
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_afterfork)
+
+
 class Request(object):
     """
     A DNS query Request object
@@ -164,6 +214,40 @@ class Response(object):
         self.raised = ''
 
 
+def addresolver(resolver):
+    """
+    Register a resolver that is asked by **query()** before DNS.
+
+    *resolver* is called with the FQDN to resolve; it returns a list of IP
+    addresses (as strings) if it is responsible for that FQDN, or *None* to
+    pass it on to the next resolver or DNS, finally. Resolvers are asked in
+    the order they have been registered.
+
+    This allows to run against emulated or otherwise not DNS-registered
+    systems (see :ref:`hcpsdk.emulator <hcpsdk_emulator>`).
+
+    :param resolver:    a callable taking a FQDN
+
+    ..  versionadded:: 0.9.5.0
+    """
+    if resolver not in _resolvers:
+        _resolvers.append(resolver)
+
+
+def removeresolver(resolver):
+    """
+    Unregister a resolver registered by **addresolver()**.
+
+    :param resolver:    the callable to remove
+
+    ..  versionadded:: 0.9.5.0
+    """
+    try:
+        _resolvers.remove(resolver)
+    except ValueError:
+        pass
+
+
 def query(fqdn, cache=False):
     """
     Submit a DNS query, using *socket.getaddrinfo()* if cache=True, or
@@ -175,12 +259,27 @@ def query(fqdn, cache=False):
     :return:        an **hcpsdk.ips.Response** object
     :raises:        should never raise, as Exceptions are signaled through
                     the **Response.raised** attribute
+
+    ..  versionchanged:: 0.9.5.0
+        resolvers registered by **addresolver()** are asked first
     """
     if isinstance(fqdn, Request):
         _response = Response(fqdn.fqdn, fqdn.cache)  # to collect the resolved IP addresses
     else:
         _response = Response(fqdn, cache)  # to collect the resolved IP addresses
 
+    for resolver in list(_resolvers):
+        try:
+            ips = resolver(_response.fqdn)
+        except Exception as e:
+            _response.raised = 'Err: ' + str(e)
+            return _response
+        if ips is not None:
+            _response.ips = [str(ip) for ip in ips]
+            if not _response.ips:
+                _response.raised = 'Err: no Response'
+            return _response
+
     if _response.cache:
         try:
             ips = socket.getaddrinfo(_response.fqdn, 443, family=socket.AF_INET, type=socket.SOCK_DGRAM)
@@ -0,0 +1,412 @@
+# -*- coding: utf-8 -*-
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2016 Thorsten Simons (sw@snomis.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from calendar import timegm
+import gzip
+import os.path
+import re
+import logging
+import hcpsdk
+from hcpsdk.mapi.logs import LogFilter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+__all__ = ['AccessLogError', 'AccessLog']
+
+logging.getLogger('hcpsdk.mapi.accesslog').addHandler(logging.NullHandler())
+
+
+class AccessLogError(Exception):
+    """
+    Base Exception used by the *hcpsdk.mapi.AccessLog()* class.
+    """
+    def __init__(self, reason):
+        """
+        :param reason: An error description
+        """
+        self.args = (reason,)
+
+
+# 10.0.0.1 - user [31/Jan/2016:13:45:00 +0100] "GET /rest/a/b HTTP/1.1" 200 1234 ns.tenant.hcp.domain.com 15
+_LINE = re.compile(r'(\S+) \S+ (\S+) \[(\d\d)/(\w{3})/(\d{4}):(\d\d):(\d\d):'
+                   r'(\d\d) ([+-])(\d\d)(\d\d)\] "(\S+) (\S+)[^"]*" (\d{3}) '
+                   r'(\d+|-) (\S+) (\d+)')
+_MONTHS = LogFilter.MONTHS
+
+
+class AccessLog(object):
+    """
+    HCP access log records (as found in *http_gateway_request.log.x*), stored
+    in columns (one *array.array* per field). Strings (nodes, namespaces,
+    operations and objects) are stored once, the columns hold indexes into
+    them.
+
+    Aggregations use NumPy if it is installed.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    # the columns: name, typecode
+    COLUMNS = [('time', 'd'),       # seconds since the epoch
+               ('node', 'H'),       # index into nodes
+               ('namespace', 'I'),  # index into namespaces
+               ('op', 'B'),         # index into ops
+               ('status', 'H'),     # the HTTP status code
+               ('bytes', 'q'),      # the number of bytes transferred
+               ('latency', 'I'),    # the latency (ms)
+               ('object', 'I')]     # index into objects
+
+    def __init__(self):
+        self.columns = OrderedDict((c, array(t)) for c, t in
+                                   AccessLog.COLUMNS)
+        self.nodes = []         # the string tables
+        self.namespaces = []
+        self.ops = []
+        self.objects = []
+        self.skipped = 0        # the number of lines that couldn't be parsed
+        self._index = {'node': {}, 'namespace': {}, 'op': {}, 'object': {}}
+        self._times = {}        # a cache for parsed timestamps
+
+    def __len__(self):
+        return len(self.columns['time'])
+
+    def _intern(self, column, value):
+        """
+        Get the index of a string in a table, adding it if necessary.
+        """
+        index = self._index[column]
+        try:
+            return index[value]
+        except KeyError:
+            table = getattr(self, column + 's')
+            index[value] = len(table)
+            table.append(value)
+            return index[value]
+
+    def parse(self, lines, node=''):
+        """
+        Parse access log lines and add them.
+
+        :param lines:   an iterable of lines (str)
+        :param node:    the node the lines have been logged on
+        :return:        the number of lines added
+        """
+        columns = list(self.columns.values())
+        nodeidx = self._intern('node', str(node))
+        times = self._times
+        added = 0
+        for line in lines:
+            m = _LINE.match(line)
+            if not m:
+                self.skipped += 1
+                continue
+            (client, user, d, mon, y, h, mi, s, sign, oh, om, op, path,
+             status, size, namespace, latency) = m.groups()
+            stamp = line[m.start(3):m.end(11)]
+            try:
+                t = times[stamp]
+            except KeyError:
+                offset = (int(oh) * 3600 + int(om) * 60) * \
+                         (-1 if sign == '-' else 1)
+                t = times[stamp] = timegm((int(y), _MONTHS.get(mon, 1),
+                                           int(d), int(h), int(mi),
+                                           int(s))) - offset
+                if len(times) > 100000:
+                    times.clear()
+            for column, value in zip(columns,
+                                     (t, nodeidx,
+                                      self._intern('namespace', namespace),
+                                      self._intern('op', op), int(status),
+                                      0 if size == '-' else int(size),
+                                      int(latency),
+                                      self._intern('object',
+                                                   path.split('?', 1)[0]))):
+                column.append(value)
+            added += 1
+        return added
+
+    def extend(self, other):
+        """
+        Add the records of another *AccessLog()*.
+
+        :param other:   an *AccessLog()* object
+        """
+        remap = {}
+        for column in ['node', 'namespace', 'op', 'object']:
+            remap[column] = [self._intern(column, v)
+                             for v in getattr(other, column + 's')]
+        for name, column in self.columns.items():
+            if name in remap:
+                r = remap[name]
+                column.extend(r[i] for i in other.columns[name])
+            else:
+                column.extend(other.columns[name])
+        self.skipped += other.skipped
+
+    def column(self, name):
+        """
+        Get a column.
+
+        :param name:    the column's name (see *COLUMNS*)
+        :return:        a NumPy array if NumPy is installed, an *array.array*
+                        otherwise (a copy, in both cases)
+        """
+        if numpy:
+            return numpy.array(self.columns[name],
+                               dtype=self.columns[name].typecode)
+        return array(self.columns[name].typecode, self.columns[name])
+
+    def _groups(self, by, field):
+        """
+        Split a column into groups.
+        """
+        keys = self.column(by)
+        values = self.column(field)
+        table = getattr(self, by + 's')
+        if numpy:
+            # sort once, then cut at the first index of each key
+            order = numpy.argsort(keys, kind='stable')
+            uniques, starts = numpy.unique(keys[order], return_index=True)
+            groups = numpy.split(values[order], starts[1:])
+            return OrderedDict(sorted(((table[k], g) for k, g in
+                                       zip(uniques, groups)),
+                                      key=lambda i: i[0]))
+        groups = {}
+        for k, v in zip(keys, values):
+            groups.setdefault(k, []).append(v)
+        return OrderedDict((table[k], groups[k])
+                           for k in sorted(groups, key=lambda k: table[k]))
+
+    def percentiles(self, by='op', field='latency', q=(50, 90, 95, 99)):
+        """
+        Calculate percentiles per group.
+
+        :param by:      the column to group by (*'node'*, *'namespace'*,
+                        *'op'* or *'object'*)
+        :param field:   the column to calculate percentiles for
+        :param q:       the percentiles to calculate (0..100)
+        :return:        an OrderedDict *{group: (count, [percentile, ...])}*,
+                        ordered by group; percentiles are interpolated
+                        linearly between the closest values
+        """
+        result = OrderedDict()
+        for key, values in self._groups(by, field).items():
+            if numpy:
+                result[key] = (len(values),
+                               [float(p) for p in numpy.percentile(values, q)])
+            else:
+                values = sorted(values)
+                pcts = []
+                for p in q:
+                    rank = (len(values) - 1) * p / 100
+                    lo = int(rank)
+                    hi = min(lo + 1, len(values) - 1)
+                    pcts.append(float(values[lo] +
+                                      (values[hi] - values[lo]) * (rank - lo)))
+                result[key] = (len(values), pcts)
+        return result
+
+    def throughput(self, by='node', interval=None):
+        """
+        Calculate the throughput per group.
+
+        :param by:          the column to group by (*'node'*, *'namespace'*,
+                            *'op'* or *'object'*)
+        :param interval:    if *None*, the average over the time covered by
+                            all records is calculated; else, the records are
+                            split into intervals of that many seconds
+        :return:            an OrderedDict *{group: (requests/s, bytes/s)}*;
+                            with *interval*, *{group: [(interval start,
+                            requests/s, bytes/s), ...]}*
+        """
+        if not len(self):
+            return OrderedDict()
+        times = self._groups(by, 'time')
+        sizes = self._groups(by, 'bytes')
+        result = OrderedDict()
+        if interval is None:
+            t = self.column('time')
+            if numpy:
+                span, total = t.max() - t.min(), numpy.sum
+            else:
+                span, total = max(t) - min(t), sum
+            span = float(max(span, 1))
+            for key in times:
+                result[key] = (len(times[key]) / span,
+                               float(total(sizes[key])) / span)
+            return result
+
+        for key in times:
+            if numpy:
+                buckets = (times[key] // interval).astype('int64')
+                first = int(buckets.min())
+                reqs = numpy.bincount(buckets - first)
+                byts = numpy.bincount(buckets - first, weights=sizes[key])
+                result[key] = [((first + i) * interval, int(r) / interval,
+                                float(b) / interval)
+                               for i, (r, b) in enumerate(zip(reqs, byts))
+                               if r]
+            else:
+                buckets = OrderedDict()
+                for t, b in sorted(zip(times[key], sizes[key])):
+                    r = buckets.setdefault(int(t // interval), [0, 0])
+                    r[0] += 1
+                    r[1] += b
+                result[key] = [(i * interval, r / interval,
+                                float(b) / interval)
+                               for i, (r, b) in buckets.items()]
+        return result
+
+    def top(self, n=10, by='requests'):
+        """
+        Find the objects requested most.
+
+        :param n:   the number of objects to return
+        :param by:  *'requests'*, *'bytes'* or *'latency'* (the sum of)
+        :return:    a list of *(object, value)* tuples, highest first
+        """
+        if by not in ('requests', 'bytes', 'latency'):
+            raise ValueError('by not in [\'requests\', \'bytes\', \'latency\']')
+        objects = self.column('object')
+        if numpy:
+            weights = None if by == 'requests' else self.column(by)
+            sums = numpy.bincount(objects, weights=weights,
+                                  minlength=len(self.objects))
+            # stable sort, ties are ordered by first appearance
+            idx = numpy.argsort(-sums, kind='mergesort')[:n]
+            return [(self.objects[i], int(sums[i])) for i in idx]
+        sums = [0] * len(self.objects)
+        if by == 'requests':
+            for o in objects:
+                sums[o] += 1
+        else:
+            for o, v in zip(objects, self.columns[by]):
+                sums[o] += v
+        idx = sorted(range(len(sums)), key=lambda i: -sums[i])[:n]
+        return [(self.objects[i], sums[i]) for i in idx]
+
+    @staticmethod
+    def nodeof(name):
+        """
+        Guess the node a log file belongs to out of its path: the last
+        directory named by a number (a node-ID) or an IP address.
+
+        :param name:    the path
+        :return:        the node (str), *''* if unknown
+        """
+        for part in reversed(name.replace('\\', '/').split('/')[:-1]):
+            if re.match(r'^\d+(\.\d+){0,3}$', part):
+                return part
+        return ''
+
+    @classmethod
+    def fromfiles(cls, paths, processes=None, nodes=None):
+        """
+        Parse access log files in parallel, one file per worker process.
+
+        :param paths:       a list of file names (*.gz* files are
+                            decompressed)
+        :param processes:   the number of worker processes; defaults to the
+                            number of CPUs, 0 parses in the calling process
+        :param nodes:       a list of node names, one per file; guessed out
+                            of the paths by *nodeof()* if *None*
+        :return:            an *AccessLog()* object, holding the records in
+                            the order of *paths*
+        """
+        nodes = nodes or [cls.nodeof(p) for p in paths]
+        result = cls()
+        if processes == 0:
+            for path, node in zip(paths, nodes):
+                result.extend(_parsefile(path, node))
+            return result
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            for part in executor.map(_parsefile, paths, nodes):
+                result.extend(part)
+        return result
+
+    @classmethod
+    def fromarchive(cls, fp, processes=None, blocksize=2**22,
+                    select=lambda name: 'request.log' in name):
+        """
+        Parse the access logs within a log archive while it is read from a
+        stream (see *hcpsdk.mapi.iterarchive()*), in parallel.
+
+        :param fp:          a file-like object in binary mode, for example
+                            an *hcpsdk.Connection()* with a pending download
+        :param processes:   the number of worker processes; defaults to the
+                            number of CPUs, 0 parses in the calling process
+        :param blocksize:   the number of bytes handed over to a worker at
+                            once
+        :param select:      a function taking a member name, returning
+                            *True* if it is to be parsed
+        :return:            an *AccessLog()* object, holding the records in
+                            the order of the archive
+        """
+        blocks = hcpsdk.mapi.iterblocks(fp, select, blocksize)
+        result = cls()
+        if processes == 0:
+            for name, lineno, data in blocks:
+                result.extend(_parseblock(data, cls.nodeof(name)))
+            return result
+        processes = processes or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            pending = []
+            for name, lineno, data in blocks:
+                pending.append(executor.submit(_parseblock, data,
+                                               cls.nodeof(name)))
+                # keep the workers busy, but don't read ahead too far
+                while len(pending) >= 2 * processes:
+                    result.extend(pending.pop(0).result())
+            for future in pending:
+                result.extend(future.result())
+        return result
+
+
+def _parseblock(data, node):
+    """
+    Parse a block of lines (run in a worker process).
+    """
+    log = AccessLog()
+    log.parse(hcpsdk.mapi.splitblock(data), node)
+    return log
+
+
+def _parsefile(path, node):
+    """
+    Parse a file (run in a worker process).
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    log = AccessLog()
+    try:
+        with opener(path, 'rt', encoding='utf-8', errors='replace') as hdl:
+            log.parse(hdl, node)
+    except OSError as e:
+        raise AccessLogError('{}: {}'.format(path, e))
+    return log
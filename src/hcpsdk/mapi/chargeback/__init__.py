@@ -21,13 +21,30 @@
 # CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 from datetime import datetime, timedelta
-from time import strftime
+from time import strftime, sleep, time
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+import queue
 from io import StringIO
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+import xml.etree.ElementTree as Et
+import codecs
+import csv
+import json
+import sqlite3
 import logging
 import hcpsdk
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
-__all__ = ['ChargebackError', 'Chargeback']
+
+__all__ = ['ChargebackError', 'Chargeback', 'Collector', 'Report', 'Store',
+           'iterrecords']
 
 logging.getLogger('hcpsdk.mapi.chargeback').addHandler(logging.NullHandler())
 
@@ -42,6 +59,136 @@ class ChargebackError(Exception):
         self.args = (reason,)
 
 
+# the numeric fields of a chargeback record
+COUNTERS = ['objectCount', 'ingestedVolume', 'storageCapacityUsed',
+            'bytesIn', 'bytesOut', 'reads', 'writes', 'deletes',
+            'tieredObjects', 'tieredBytes', 'metadataOnlyObjects',
+            'metadataOnlyBytes']
+
+
+def iterrecords(fp, fmt, chunksize=2**16):
+    """
+    Parse a chargeback report while it is read, record by record.
+
+    :param fp:          a file-like object in binary mode (an
+                        *hcpsdk.Connection()* with a pending *Response* will
+                        do), to be read in chunks
+    :param fmt:         the format of the report, one out of
+                        *Chargeback.CBM_ALL*
+    :param chunksize:   the number of bytes read at once
+    :return:            a generator yielding a dict per record; the counters
+                        are converted to int, *valid* to bool
+    :raises:            *ChargebackError* if the report is malformed
+
+    ..  versionadded:: 0.9.5.0
+    """
+    if fmt == Chargeback.CBM_CSV:
+        parser = _csvrecords
+    elif fmt == Chargeback.CBM_JSON:
+        parser = _jsonrecords
+    elif fmt == Chargeback.CBM_XML:
+        parser = _xmlrecords
+    else:
+        raise ValueError('fmt not in {}'.format(Chargeback.CBM_ALL))
+
+    for record in parser(fp, chunksize):
+        for f in COUNTERS:
+            if record.get(f) not in (None, ''):
+                record[f] = int(record[f])
+        if 'valid' in record:
+            record['valid'] = record['valid'] in (True, 'true')
+        yield record
+
+
+def _chunks(fp, chunksize):
+    """
+    Read *fp* chunk by chunk, decoding from utf-8.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    while True:
+        chunk = fp.read(chunksize)
+        if not chunk:
+            break
+        yield decoder.decode(chunk)
+    yield decoder.decode(b'', final=True)
+
+
+def _csvrecords(fp, chunksize):
+    """
+    Parse CSV, line by line.
+    """
+    def lines():
+        rest = ''
+        for chunk in _chunks(fp, chunksize):
+            rest += chunk
+            *complete, rest = rest.split('\n')
+            for line in complete:
+                yield line + '\n'
+        if rest:
+            yield rest
+
+    for record in csv.DictReader(lines()):
+        yield {k: v for k, v in record.items() if k}
+
+
+def _jsonrecords(fp, chunksize):
+    """
+    Parse JSON (*{"chargebackData": [{...}, ...]}*), decoding one record at
+    a time out of a buffer that holds not much more than one chunk.
+    """
+    decoder = json.JSONDecoder()
+    chunks = _chunks(fp, chunksize)
+    buf = ''
+    inlist = False
+    while True:
+        pos = 0
+        if not inlist:
+            pos = buf.find('[')
+            if pos < 0:
+                pos = len(buf)
+            else:
+                inlist = True
+                pos += 1
+        while inlist:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos == len(buf):
+                break
+            if buf[pos] == ']':
+                return
+            try:
+                record, pos = decoder.raw_decode(buf, pos)
+            except ValueError:
+                break  # an incomplete record, get more data
+            yield record
+        try:
+            buf = buf[pos:] + next(chunks)
+        except StopIteration:
+            if inlist or buf.strip():
+                raise ChargebackError('incomplete or malformed JSON report')
+            return
+
+
+def _xmlrecords(fp, chunksize):
+    """
+    Parse XML, dropping the elements as soon as a record is complete.
+    """
+    parser = Et.XMLPullParser(events=('start', 'end'))
+    root = None
+    for chunk in _chunks(fp, chunksize):
+        try:
+            parser.feed(chunk)
+            for event, elem in parser.read_events():
+                if event == 'start':
+                    if root is None:
+                        root = elem
+                elif elem.tag == 'chargebackData':
+                    yield {child.tag: child.text for child in elem}
+                    root.clear()
+        except Et.ParseError as e:
+            raise ChargebackError('malformed XML report: {}'.format(e))
+
+
 class Chargeback(object):
     '''
     Access to HCP chargeback reports
@@ -84,7 +231,7 @@ class Chargeback(object):
 
 
     def request(self, tenant=None, start=None, end=None,
-                granularity=CBG_TOTAL, fmt=CBM_JSON):
+                granularity=CBG_TOTAL, fmt=CBM_JSON, prettyprint=True):
         '''
         Request a chargeback report for a Tenant.
 
@@ -93,8 +240,95 @@ class Chargeback(object):
         :param end:         endtime (a datetime object)
         :param granularity: one out of CBG_ALL
         :param fmt:         output format, one out of CBM_ALL
+        :param prettyprint: request a human-readable report
         :return:            a file-like object in text-mode containing the
                             report
+
+        ..  versionchanged:: 0.9.5.0
+            added *prettyprint*
+        '''
+        self._get(tenant, start, end, granularity, fmt, prettyprint)
+        ret = StringIO(initial_value=self.con.read().decode())
+        ret.seek(0)
+        return ret
+
+    def records(self, tenant=None, start=None, end=None,
+                granularity=CBG_HOUR, fmt=CBM_CSV):
+        '''
+        Request a chargeback report for a Tenant and parse it while it is
+        received, without keeping more than a single record in memory.
+
+        :param tenant:      the *Tenant* to collect from
+        :param start:       starttime (a datetime object)
+        :param end:         endtime (a datetime object)
+        :param granularity: one out of CBG_ALL
+        :param fmt:         the format to transfer, one out of CBM_ALL
+        :return:            a generator yielding a dict per record (see
+                            *iterrecords()*)
+
+        ..  versionadded:: 0.9.5.0
+        '''
+        self._get(tenant, start, end, granularity, fmt, False)
+        complete = False
+        try:
+            for record in iterrecords(self.con, fmt):
+                yield record
+            complete = True
+        finally:
+            if not complete:
+                # the Response hasn't been read completely
+                self.con.close()
+
+    def report(self, tenant=None, start=None, end=None,
+               granularity=CBG_HOUR, fmt=CBM_CSV, report=None):
+        '''
+        Request a chargeback report for a Tenant and collect it into
+        columns.
+
+        :param tenant:      the *Tenant* to collect from
+        :param start:       starttime (a datetime object)
+        :param end:         endtime (a datetime object)
+        :param granularity: one out of CBG_ALL
+        :param fmt:         the format to transfer, one out of CBM_ALL
+        :param report:      a *Report()* object to add the records to; if
+                            *None*, a new one is created
+        :return:            the *Report()* object
+
+        ..  versionadded:: 0.9.5.0
+        '''
+        report = report if report is not None else Report()
+        report.update(self.records(tenant=tenant, start=start, end=end,
+                                   granularity=granularity, fmt=fmt))
+        return report
+
+    def sync(self, store, tenant, start=None, end=None, fmt=CBM_CSV):
+        '''
+        Bring a *Store()* up to date for a Tenant: request the hourly
+        reports of the windows missing or unfinished in *store*, only.
+
+        :param store:       a *Store()* object
+        :param tenant:      the *Tenant* to collect from
+        :param start:       starttime (a datetime object), defaults to 180
+                            days ago
+        :param end:         endtime (a datetime object), defaults to now
+        :param fmt:         the format to transfer, one out of CBM_ALL
+        :return:            the number of windows requested
+
+        ..  versionadded:: 0.9.5.0
+        '''
+        end = end or datetime.now()
+        start = start or end - timedelta(days=180)
+        windows = store.missing(tenant, start, end)
+        for ws, we in windows:
+            store.add(self.report(tenant=tenant, start=ws, end=we,
+                                  granularity=Chargeback.CBG_HOUR, fmt=fmt),
+                      tenant, ws, we)
+        return len(windows)
+
+    def _get(self, tenant, start, end, granularity, fmt, prettyprint):
+        '''
+        Check the arguments and request the report; returns with the
+        *Response* ready to be read.
         '''
         if not tenant:
             raise ValueError('no tenant given')
@@ -129,7 +363,7 @@ class Chargeback(object):
                          params={'start': self.start.strftime('%Y-%m-%dT%H:%M:%S')+strftime('%z'),
                                  'end': self.end.strftime('%Y-%m-%dT%H:%M:%S')+strftime('%z'),
                                  'granularity': self.granularity,
-                                 'prettyprint': 'true'},
+                                 'prettyprint': 'true' if prettyprint else 'false'},
                          headers={'Accept': self.fmt})
         except Exception as e:
             self.logger.error(e)
@@ -139,11 +373,7 @@ class Chargeback(object):
                                                        self.con.response_reason))
             self.logger.debug('returned headers: {}'.format(self.con.getheaders()))
 
-            if self.con.response_status == 200:
-                ret = StringIO(initial_value=self.con.read().decode())
-                ret.seek(0)
-                return ret
-            else:
+            if self.con.response_status != 200:
                 # session cleanup!
                 self.con.read()
                 raise ChargebackError('{} - {} ({})'
@@ -157,3 +387,539 @@ class Chargeback(object):
         Close the underlying *hcpsdk.Connection* object.
         '''
         self.con.close()
+
+
+class Collector(object):
+    """
+    Collect chargeback reports for many Tenants at once: the time range is
+    split into slices, and all *(Tenant, slice)* pairs are requested in
+    parallel, through a bounded number of MAPI *Connection()*\\ s.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    def __init__(self, target, size=4, slicesize=timedelta(days=7),
+                 retries=3, backoff=5, timeout=600, debuglevel=0):
+        """
+        :param target:      an hcpsdk.Target object (see *Chargeback()*)
+        :param size:        the max. number of requests in flight
+        :param slicesize:   the length of a time slice (a timedelta object)
+        :param retries:     the number of retries of a failed slice
+        :param backoff:     the seconds to wait before the 1st retry,
+                            doubled with every retry
+        :param timeout:     the connection timeout
+        :param debuglevel:  0..9 (used in *http.client*)
+        """
+        self.logger = logging.getLogger(__name__ + '.Collector')
+        hcpsdk.checkport(target, hcpsdk.P_MAPI)
+        self.target = target
+        self.size = size
+        self.slicesize = slicesize
+        self.retries = retries
+        self.backoff = backoff
+        self.failed = []  # (tenant, start, end, exception) of the last run
+        self.__cbs = queue.Queue()
+        for i in range(size):
+            self.__cbs.put(Chargeback(target, timeout=timeout,
+                                      debuglevel=debuglevel))
+
+    def slices(self, start, end, granularity=Chargeback.CBG_HOUR):
+        """
+        Split a time range into slices aligned to *granularity*; a
+        *CBG_TOTAL* range isn't split.
+
+        :param start:       starttime (a datetime object)
+        :param end:         endtime (a datetime object)
+        :param granularity: one out of CBG_ALL
+        :return:            a list of *(start, end)* tuples
+        """
+        if granularity == Chargeback.CBG_TOTAL:
+            return [(start, end)]
+        start = start.replace(minute=0, second=0, microsecond=0)
+        step = self.slicesize
+        if granularity == Chargeback.CBG_DAY:
+            start = start.replace(hour=0)
+            step = max(timedelta(days=step.days), timedelta(days=1))
+        else:
+            step = max(timedelta(hours=step // timedelta(hours=1)),
+                       timedelta(hours=1))
+        slices = []
+        while start < end:
+            slices.append((start, min(start + step, end)))
+            start += step
+        return slices
+
+    def collect(self, tenants, start=None, end=None,
+                granularity=Chargeback.CBG_HOUR, fmt=Chargeback.CBM_CSV,
+                report=None):
+        """
+        Collect the chargeback reports.
+
+        :param tenants:     a list of Tenant names (or
+                            *hcpsdk.mapi.Tenant()* objects)
+        :param start:       starttime (a datetime object), defaults to 180
+                            days ago
+        :param end:         endtime (a datetime object), defaults to now
+        :param granularity: one out of CBG_ALL
+        :param fmt:         the format to transfer, one out of CBM_ALL
+        :param report:      a *Report()* object to add the records to; if
+                            *None*, a new one is created
+        :return:            the *Report()* object; slices that failed even
+                            after *retries* are listed in *failed*
+        """
+        end = end or datetime.now()
+        start = start or end - timedelta(days=180)
+        report = report if report is not None else Report()
+        jobs = [(getattr(t, 'name', t), s, e)
+                for t in tenants for s, e in self.slices(start, end,
+                                                         granularity)]
+        self._run(jobs, granularity, fmt, lambda job, part: report.merge(part))
+        return report
+
+    def sync(self, store, tenants, start=None, end=None,
+             fmt=Chargeback.CBM_CSV):
+        """
+        Bring a *Store()* up to date: request the hourly reports of the
+        windows missing or unfinished in *store*, only.
+
+        :param store:       a *Store()* object
+        :param tenants:     a list of Tenant names (or
+                            *hcpsdk.mapi.Tenant()* objects)
+        :param start:       starttime (a datetime object), defaults to 180
+                            days ago
+        :param end:         endtime (a datetime object), defaults to now
+        :param fmt:         the format to transfer, one out of CBM_ALL
+        :return:            the number of slices requested; slices that
+                            failed even after *retries* are listed in
+                            *failed*
+        """
+        end = end or datetime.now()
+        start = start or end - timedelta(days=180)
+        jobs = []
+        for t in tenants:
+            t = getattr(t, 'name', t)
+            for ws, we in store.missing(t, start, end):
+                jobs.extend((t, s, e) for s, e in self.slices(ws, we))
+        self._run(jobs, Chargeback.CBG_HOUR, fmt,
+                  lambda job, part: store.add(part, *job))
+        return len(jobs)
+
+    def _run(self, jobs, granularity, fmt, done):
+        """
+        Request all *jobs* in parallel, calling *done(job, Report)* for the
+        successful ones, in the order of *jobs*.
+        """
+        self.logger.debug('collecting {} slices'.format(len(jobs)))
+        self.failed = []
+
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            futures = [executor.submit(self._collect, job, granularity, fmt)
+                       for job in jobs]
+            # merge in the order of the jobs, no matter which one came first
+            for job, future in zip(jobs, futures):
+                try:
+                    done(job, future.result())
+                except Exception as e:
+                    self.failed.append(job + (e,))
+        if self.failed:
+            self.logger.debug('{} slices failed'.format(len(self.failed)))
+
+    def _collect(self, job, granularity, fmt):
+        """
+        Request a single slice, retrying if it fails.
+        """
+        tenant, start, end = job
+        cb = self.__cbs.get()
+        try:
+            attempt = 0
+            while True:
+                try:
+                    return cb.report(tenant=tenant, start=start, end=end,
+                                     granularity=granularity, fmt=fmt)
+                except (ChargebackError, hcpsdk.HcpsdkError) as e:
+                    if attempt >= self.retries:
+                        raise
+                    self.logger.debug('{} ({} - {}) failed, retrying: {}'
+                                      .format(tenant, start, end, e))
+                    cb.close()
+                    sleep(self.backoff * 2 ** attempt)
+                    attempt += 1
+        finally:
+            self.__cbs.put(cb)
+
+    def close(self):
+        """
+        Close the underlying *hcpsdk.Connection* objects.
+        """
+        for i in range(self.size):
+            cb = self.__cbs.get()
+            cb.close()
+            self.__cbs.put(cb)
+
+
+class Report(object):
+    """
+    Chargeback records, stored in columns (one *array.array* per field),
+    grouped by *(tenantName, namespaceName)* and ordered by the start time
+    of the records (the time bucket). A record takes about 100 bytes, no
+    matter if it was received as CSV, JSON or XML.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__ + '.Report')
+        self.fields = ['startTime', 'endTime', 'valid'] + COUNTERS
+        self._groups = {}     # key: OrderedDict of columns
+        self._times = {}      # a cache for parsed timestamps
+        self.__len = 0
+
+    def __len__(self):
+        return self.__len
+
+    def _epoch(self, timestamp):
+        """
+        Convert a timestamp as used by HCP (2015-11-04T15:27:29+0100) to
+        seconds since the epoch (which are returned as they are).
+        """
+        if isinstance(timestamp, int):
+            return timestamp
+        try:
+            return self._times[timestamp]
+        except KeyError:
+            if len(self._times) > 10000:
+                self._times.clear()
+            t = int(datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%S%z')
+                    .timestamp())
+            self._times[timestamp] = t
+            return t
+
+    def add(self, record):
+        """
+        Add a record; a record for a time bucket already stored replaces it.
+
+        :param record:  a dict as yielded by *Chargeback.records()* or
+                        *Report.records()*
+        """
+        key = (record.get('tenantName'), record.get('namespaceName') or None)
+        try:
+            group = self._groups[key]
+        except KeyError:
+            group = self._groups[key] = OrderedDict()
+            group['startTime'] = array('q')
+            group['endTime'] = array('q')
+            group['valid'] = array('b')
+            for f in COUNTERS:
+                group[f] = array('q')
+
+        values = [self._epoch(record['startTime']),
+                  self._epoch(record['endTime']),
+                  1 if record.get('valid') else 0]
+        values.extend(record.get(f) or 0 for f in COUNTERS)
+
+        starts = group['startTime']
+        if not starts or values[0] > starts[-1]:
+            for column, value in zip(group.values(), values):
+                column.append(value)
+            self.__len += 1
+        else:
+            i = bisect_left(starts, values[0])
+            if i < len(starts) and starts[i] == values[0]:
+                for column, value in zip(group.values(), values):
+                    column[i] = value
+            else:
+                for column, value in zip(group.values(), values):
+                    column.insert(i, value)
+                self.__len += 1
+
+    def update(self, records):
+        """
+        Add many records.
+
+        :param records: an iterable of records
+        """
+        for record in records:
+            self.add(record)
+
+    def merge(self, other):
+        """
+        Add all records of another *Report()*.
+
+        :param other:   a *Report()* object
+        """
+        self.update(other.records())
+
+    def keys(self):
+        """
+        :return:    a sorted list of the *(tenantName, namespaceName)* keys
+                    stored; *namespaceName* is *None* for the records holding
+                    the Tenant totals
+        """
+        return sorted(self._groups.keys(), key=lambda k: (k[0] or '',
+                                                          k[1] or ''))
+
+    def columns(self, key):
+        """
+        Get the columns of a group.
+
+        :param key:     a *(tenantName, namespaceName)* tuple
+        :return:        an OrderedDict of columns (*startTime* and *endTime*
+                        as seconds since the epoch); NumPy arrays if NumPy is
+                        installed, copies of the *array.array*\\ s otherwise
+        """
+        if numpy:
+            return OrderedDict((f, numpy.array(c, dtype=c.typecode))
+                               for f, c in self._groups[key].items())
+        return OrderedDict((f, array(c.typecode, c))
+                           for f, c in self._groups[key].items())
+
+    def get(self, key, start):
+        """
+        Get the record of a time bucket.
+
+        :param key:     a *(tenantName, namespaceName)* tuple
+        :param start:   the bucket's start time (seconds since the epoch or
+                        a timezone-aware datetime object)
+        :return:        a dict, or *None* if not available
+        """
+        if isinstance(start, datetime):
+            start = int(start.timestamp())
+        group = self._groups.get(key)
+        if not group:
+            return None
+        i = bisect_left(group['startTime'], start)
+        if i == len(group['startTime']) or group['startTime'][i] != start:
+            return None
+        return self._record(key, group, i)
+
+    def records(self):
+        """
+        Get all records, ordered by tenant, namespace and time.
+
+        :return:    a generator yielding dicts with the keys *tenantName*,
+                    *namespaceName* and *fields*
+        """
+        for key in self.keys():
+            group = self._groups[key]
+            for i in range(len(group['startTime'])):
+                yield self._record(key, group, i)
+
+    @staticmethod
+    def _record(key, group, i):
+        record = OrderedDict([('tenantName', key[0]),
+                              ('namespaceName', key[1])])
+        for f, column in group.items():
+            record[f] = column[i]
+        record['valid'] = bool(record['valid'])
+        return record
+
+
+class Store(object):
+    """
+    A local store of hourly chargeback records, kept in a SQLite database
+    file. It remembers which hours have been fetched per Tenant, so that
+    *Chargeback.sync()* and *Collector.sync()* request the missing and
+    unfinished hours, only. Range queries and aggregations are served from
+    the local database.
+
+    An hour counts as finished if it has ended *grace* seconds ago and all
+    of its records are *valid*; unfinished hours are requested again on
+    the next sync.
+
+    The fetched hours are tracked per (Tenant, hour), not per (Tenant,
+    Namespace, hour): HCP reports the records of all Namespaces of a Tenant
+    in one request, so an hour is fetched (and re-fetched) for all of them
+    at once.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    # counters summed up by aggregate(); the max. is used for all others
+    TRAFFIC = ['bytesIn', 'bytesOut', 'reads', 'writes', 'deletes']
+
+    def __init__(self, path, grace=3600):
+        """
+        :param path:    the database file (created if it doesn't exist)
+        :param grace:   the number of seconds after its end an hour is
+                        considered to be finished
+        """
+        self.logger = logging.getLogger(__name__ + '.Store')
+        self.path = path
+        self.grace = grace
+        self.__lock = Lock()
+        self.__db = sqlite3.connect(path, check_same_thread=False)
+        with self.__db:
+            self.__db.execute(
+                'CREATE TABLE IF NOT EXISTS records ('
+                'tenant TEXT NOT NULL, namespace TEXT NOT NULL, '
+                'start INTEGER NOT NULL, end INTEGER NOT NULL, '
+                'valid INTEGER NOT NULL, {}, '
+                'PRIMARY KEY (tenant, namespace, start))'
+                .format(', '.join('{} INTEGER'.format(f) for f in COUNTERS)))
+            self.__db.execute(
+                'CREATE TABLE IF NOT EXISTS fetched ('
+                'tenant TEXT NOT NULL, hour INTEGER NOT NULL, '
+                'complete INTEGER NOT NULL, PRIMARY KEY (tenant, hour))')
+
+    @staticmethod
+    def _hours(start, end):
+        """
+        The hours (seconds since the epoch) touched by *start* - *end*.
+        """
+        first = int(start.timestamp()) // 3600 * 3600
+        return range(first, int(end.timestamp()), 3600)
+
+    def missing(self, tenant, start, end):
+        """
+        Find the windows that haven't been fetched completely, yet.
+
+        :param tenant:  the Tenant's name
+        :param start:   starttime (a datetime object)
+        :param end:     endtime (a datetime object)
+        :return:        a list of *(start, end)* tuples of datetime objects,
+                        each spanning a row of missing or unfinished hours
+        """
+        hours = self._hours(start, end)
+        if not hours:
+            return []
+        with self.__lock:
+            complete = set(h for h, in self.__db.execute(
+                'SELECT hour FROM fetched WHERE tenant = ? AND complete = 1 '
+                'AND hour >= ? AND hour <= ?',
+                (tenant, hours[0], hours[-1])))
+        windows = []
+        for h in hours:
+            if h in complete:
+                continue
+            if windows and windows[-1][1] == h:
+                windows[-1][1] = h + 3600
+            else:
+                windows.append([h, h + 3600])
+        return [(datetime.fromtimestamp(s), datetime.fromtimestamp(e))
+                for s, e in windows]
+
+    def add(self, report, tenant, start, end):
+        """
+        Store the records of a *Report()* that has been requested for a
+        Tenant and a time window, and mark the hours of that window as
+        fetched.
+
+        :param report:  a *Report()* object (hourly granularity)
+        :param tenant:  the Tenant's name
+        :param start:   the window's starttime (a datetime object)
+        :param end:     the window's endtime (a datetime object)
+        """
+        invalid = set()
+        rows = []
+        for r in report.records():
+            if not r['valid']:
+                invalid.add(r['startTime'] // 3600 * 3600)
+            rows.append([r['tenantName'] or tenant, r['namespaceName'] or '',
+                         r['startTime'], r['endTime'], int(r['valid'])] +
+                        [r[f] for f in COUNTERS])
+        finished = time() - self.grace
+        with self.__lock, self.__db:
+            self.__db.executemany(
+                'INSERT OR REPLACE INTO records VALUES ({})'
+                .format(', '.join('?' * (5 + len(COUNTERS)))), rows)
+            self.__db.executemany(
+                'INSERT OR REPLACE INTO fetched VALUES (?, ?, ?)',
+                [(tenant, h,
+                  int(h not in invalid and h + 3600 <= finished))
+                 for h in self._hours(start, end)])
+        self.logger.debug('stored {} records of {} ({} - {})'
+                          .format(len(rows), tenant, start, end))
+
+    def query(self, tenant=None, namespace=None, start=None, end=None):
+        """
+        Get stored records.
+
+        :param tenant:      a Tenant's name; all Tenants if *None*
+        :param namespace:   a Namespace's name (*''* for the Tenant totals);
+                            all if *None*
+        :param start:       records starting at or after (a datetime object)
+        :param end:         records starting before (a datetime object)
+        :return:            a *Report()* object
+        """
+        where, args = self._where(tenant, namespace, start, end)
+        report = Report()
+        with self.__lock:
+            cursor = self.__db.execute(
+                'SELECT tenant, namespace, start, end, valid, {} FROM records'
+                '{}'.format(', '.join(COUNTERS), where), args)
+            for row in cursor:
+                record = {'tenantName': row[0], 'namespaceName': row[1],
+                          'startTime': row[2], 'endTime': row[3],
+                          'valid': bool(row[4])}
+                record.update(zip(COUNTERS, row[5:]))
+                report.add(record)
+        return report
+
+    def aggregate(self, groupby=('tenant',), tenant=None, namespace=None,
+                  start=None, end=None):
+        """
+        Aggregate stored records; the *TRAFFIC* counters are summed up, the
+        max. value is used for all other counters.
+
+        :param groupby:     a sequence out of *'tenant'*, *'namespace'* and
+                            *'day'*
+        :param tenant:      a Tenant's name; all Tenants if *None*
+        :param namespace:   a Namespace's name (*''* for the Tenant totals);
+                            if *None*, the Tenant totals are used, unless
+                            grouped by *'namespace'*
+        :param start:       records starting at or after (a datetime object)
+        :param end:         records starting before (a datetime object)
+        :return:            a list of OrderedDicts, holding the *groupby*
+                            columns followed by the counters; days are
+                            given as seconds since the epoch (UTC)
+        """
+        columns = {'tenant': 'tenant', 'namespace': 'namespace',
+                   'day': 'start - start % 86400'}
+        for g in groupby:
+            if g not in columns:
+                raise ValueError('groupby: {} not in {}'
+                                 .format(g, sorted(columns)))
+        if namespace is None and 'namespace' not in groupby:
+            namespace = ''
+        where, args = self._where(tenant, namespace, start, end)
+        if 'namespace' in groupby and namespace is None:
+            where += ' AND' if where else ' WHERE'
+            where += " namespace != ''"
+        group = ', '.join(columns[g] for g in groupby)
+        counters = ', '.join('{}({})'.format('SUM' if f in Store.TRAFFIC
+                                             else 'MAX', f)
+                             for f in COUNTERS)
+        with self.__lock:
+            rows = self.__db.execute(
+                'SELECT {0}{1}{2} FROM records{3}{4}'
+                .format(group, ', ' if group else '', counters, where,
+                        ' GROUP BY {0} ORDER BY {0}'.format(group)
+                        if group else ''), args).fetchall()
+        return [OrderedDict(zip(list(groupby) + COUNTERS, row))
+                for row in rows]
+
+    @staticmethod
+    def _where(tenant, namespace, start, end):
+        """
+        Build a WHERE clause.
+        """
+        conditions = []
+        args = []
+        for column, op, value in [('tenant', '=', tenant),
+                                  ('namespace', '=', namespace),
+                                  ('start', '>=', start),
+                                  ('start', '<', end)]:
+            if value is not None:
+                conditions.append('{} {} ?'.format(column, op))
+                args.append(int(value.timestamp())
+                            if isinstance(value, datetime) else value)
+        return (' WHERE ' + ' AND '.join(conditions)
+                if conditions else ''), args
+
+    def close(self):
+        """
+        Close the database.
+        """
+        with self.__lock:
+            self.__db.close()
+
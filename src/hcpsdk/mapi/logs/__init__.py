@@ -22,15 +22,32 @@
 
 import time
 
-from datetime import date
+from datetime import date, timedelta
 import xml.etree.ElementTree as Et
 from collections import OrderedDict
-from tempfile import TemporaryFile, NamedTemporaryFile
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from tempfile import TemporaryFile, NamedTemporaryFile, TemporaryDirectory
+from threading import Lock
+from calendar import timegm
+import os
+import os.path
+import re
+import json
+import shutil
+import struct
+import tarfile
+import gzip
+import zlib
+from hashlib import blake2b
+import zipfile
 import logging
 import hcpsdk
 
 
-__all__ = ['LogsError', 'LogsNotReadyError', 'LogsInProgessError', 'Logs']
+__all__ = ['LogsError', 'LogsNotReadyError', 'LogsInProgessError', 'Logs',
+           'LogFilter', 'LogLine', 'LogStore', 'iterarchive', 'iterblocks',
+           'splitblock', 'filterarchive']
 
 logging.getLogger('hcpsdk.mapi.logs').addHandler(logging.NullHandler())
 
@@ -95,6 +112,7 @@ class Logs(object):
         self.service_time = 0.0
         self.prepare_xml = None
         self.suggestedfilename = '' # the filename suggested by HCP
+        self._executor = None  # runs wait_ready_async()
 
         try:
             self.con = hcpsdk.Connection(self.target, debuglevel=self.debuglevel)
@@ -203,6 +221,10 @@ class Logs(object):
         """
         Query HCP for the status of the request log download.
 
+        ..  versionchanged:: 0.9.5.0
+            doesn't sleep for half a second any longer (use *wait_ready()*
+            to wait for the logs being prepared)
+
         :returns:   a *collection.OrderedDict*:
                     ::
 
@@ -216,19 +238,24 @@ class Logs(object):
                         }
         :raises:    re-raises whatever is raised below
         """
+        return self._status(self.con)
+
+    def _status(self, con):
+        """
+        Query the status through *con*.
+        """
         self.logger.debug('status query issued')
 
         try:
-            self.con.GET('/mapi/logs')
+            con.GET('/mapi/logs')
         except Exception as e:
             self.logger.error(e)
             raise
         else:
-            self.logger.debug('response headers: {}'.format(self.con.getheaders()))
-            xml = self.con.read().decode()
-            time.sleep(.5)
+            self.logger.debug('response headers: {}'.format(con.getheaders()))
+            xml = con.read().decode()
 
-            if self.con.response_status != 200:
+            if con.response_status != 200:
                 return None
             else:
                 stat = OrderedDict()
@@ -241,6 +268,103 @@ class Logs(object):
                         stat[child.tag] = child.text.split(',')
                 return stat
 
+    def wait_ready(self, timeout=600, callback=None, interval=0.5,
+                   maxinterval=15):
+        """
+        Wait until the logs requested by *prepare()* are ready for
+        streaming. The status is queried right away, then with an interval
+        that starts at *interval* and grows up to *maxinterval* seconds.
+
+        :param timeout:     the max. number of seconds to wait
+        :param callback:    a function taking a single argument (the status,
+                            as returned by *status()*) that will be called
+                            after each status query
+        :param interval:    the initial number of seconds between two
+                            status queries
+        :param maxinterval: the max. number of seconds between two status
+                            queries
+        :returns:           the last status (see *status()*)
+        :raises:            *LogsNotReadyError* if *timeout* has passed,
+                            *LogsError* if HCP reports an error
+
+        ..  versionadded:: 0.9.5.0
+        """
+        return self._wait_ready(self.con, timeout, callback, interval,
+                                maxinterval)
+
+    def wait_ready_async(self, timeout=600, callback=None, interval=0.5,
+                         maxinterval=15):
+        """
+        Same as *wait_ready()*, but returns immediately. The status queries
+        are issued through a *Connection()* of their own, in a background
+        thread.
+
+        :returns:   a *concurrent.futures.Future* object; its *result()* is
+                    the last status (or the exception raised)
+
+        ..  versionadded:: 0.9.5.0
+        """
+        if not self._executor:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+
+        def wait():
+            con = hcpsdk.Connection(self.target, debuglevel=self.debuglevel)
+            try:
+                return self._wait_ready(con, timeout, callback, interval,
+                                        maxinterval)
+            finally:
+                con.close()
+
+        return self._executor.submit(wait)
+
+    def _wait_ready(self, con, timeout, callback, interval, maxinterval):
+        """
+        Poll the status through *con* until ready for streaming.
+        """
+        deadline = time.time() + timeout
+        while True:
+            stat = self._status(con)
+            if callback:
+                callback(stat)
+            if stat:
+                if stat.get('error'):
+                    raise LogsError('HCP failed to prepare the logs')
+                if stat.get('readyForStreaming'):
+                    return stat
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise LogsNotReadyError('logs not ready after {} seconds'
+                                        .format(timeout))
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 1.5, maxinterval)
+
+    def collect(self, hdl=None, startdate=None, enddate=None, nodes=[],
+                snodes=[], logs=[], timeout=600, callback=None,
+                progresshook=None, hidden=True):
+        """
+        Prepare, wait for and download logs in a single call; the download
+        starts as soon as HCP reports the logs to be ready for streaming.
+
+        :param hdl:         see *download()*
+        :param startdate:   see *prepare()*
+        :param enddate:     see *prepare()*
+        :param nodes:       see *download()*
+        :param snodes:      see *prepare()* and *download()*
+        :param logs:        see *download()*
+        :param timeout:     see *wait_ready()*
+        :param callback:    see *wait_ready()*
+        :param progresshook:    see *download()*
+        :param hidden:      see *download()*
+        :returns:           see *download()*
+        :raises:            *ValueError* or one of the *LogsError*\\ s
+
+        ..  versionadded:: 0.9.5.0
+        """
+        self.prepare(startdate=startdate, enddate=enddate, snodes=snodes)
+        self.wait_ready(timeout=timeout, callback=callback)
+        return self.download(hdl=hdl, nodes=nodes, snodes=snodes, logs=logs,
+                             progresshook=progresshook, hidden=hidden)
+
     def download(self, hdl=None, nodes=[], snodes=[], logs=[],
                  progresshook=None, hidden=True):
         """
@@ -273,68 +397,319 @@ class Logs(object):
         else:
             self.hdl = hdl
 
-        # create the XML command structire
-        str_nodes = str_snodes = str_logs = ''
-        if nodes:
-            str_nodes = '<nodes>' + ','.join(nodes) + '</nodes>'
+        xml = self._downloadxml(nodes, snodes, logs)
+        try:
+            suggestedfilename = self._stream(self.con, xml, self.hdl,
+                                             progresshook)
+        except LogsError:
+            raise
+        except Exception as e:
+            raise LogsError(e)
+        self.hdl.seek(0)
+        return (self.hdl, suggestedfilename)
+
+    def downloadparallel(self, directory=None, nodes=[], snodes=[], logs=[],
+                         combined=None, size=4, retries=3, backoff=5,
+                         progresshook=None):
+        """
+        Download the requested logs in pieces, one per node (or S-node) and
+        log type, *size* of them in parallel. Each piece is written into a
+        file of its own, named *<node>-<log>.zip* (or
+        *all-<log>.zip* for the general nodes if no nodes are given); pieces
+        that failed are retried independently of the others.
+
+        :param directory:   the directory to write the files to; a temporary
+                            directory is used if *None* (which makes sense
+                            with *combined*, only)
+        :param nodes:       list of node-IDs (int), all if empty, none if
+                            *None* (to download S-node logs, only)
+        :param snodes:      list of S-node names (str), none if empty
+        :param logs:        list of logs (*L_**), all if empty
+        :param combined:    the name of a zip file that will receive the
+                            pieces as members (instead of leaving them in
+                            *directory*)
+        :param size:        the max. number of pieces downloaded in
+                            parallel
+        :param retries:     the number of retries per piece
+        :param backoff:     the seconds to wait before the 1st retry,
+                            doubled with every retry
+        :param progresshook:    a function taking a single argument (the #
+                                of bytes received for all pieces together)
+                                that will be called after each chunk of bytes
+                                downloaded
+        :returns:           an OrderedDict *{(node, log): filename}* for the
+                            pieces downloaded (*filename* is the member name
+                            if *combined* was given); pieces that failed even
+                            after *retries* are listed in *failed*
+        :raises:            *ValueError* if there's nothing to download,
+                            *LogsError* if all pieces failed
+
+        ..  versionadded:: 0.9.5.0
+        """
+        if nodes is None:
+            pieces = []
+        elif nodes:
+            pieces = [(str(n), None) for n in nodes]
         else:
-            str_nodes = ''
-        if snodes:
-            str_snodes = ','.join(snodes)
-        if logs:
-            str_logs = ','.join(logs)
+            pieces = [(None, None)]  # all general nodes in one piece
+        pieces += [(None, s) for s in snodes]
+        if not pieces:
+            raise ValueError('nodes or snodes required')
+        jobs = [(n, s, l) for n, s in pieces for l in logs or Logs.L_ALL]
+        tmpdir = TemporaryDirectory() if not directory else None
+        directory = directory or tmpdir.name
+        pool = hcpsdk.ConnectionPool(self.target, size=size,
+                                     debuglevel=self.debuglevel)
+        lock = Lock()
+        received = {}  # job: bytes received by the current attempt
+
+        def progress(job, numbytes):
+            with lock:
+                received[job] = numbytes
+                total = sum(received.values())
+            if progresshook:
+                progresshook(total)
+
+        def piece(job):
+            node, snode, log = job
+            if snode:
+                xml = self._downloadxml(None, [snode], [log])
+            else:
+                xml = self._downloadxml([node] if node else [], [], [log])
+            fname = os.path.join(directory, '{}-{}.zip'
+                                 .format(node or snode or 'all', log))
+            attempt = 0
+            while True:
+                try:
+                    with pool.connection() as con, open(fname, 'wb') as hdl:
+                        self._stream(con, xml, hdl,
+                                     lambda n: progress(job, n))
+                    return fname
+                except Exception as e:
+                    progress(job, 0)
+                    if attempt >= retries:
+                        if os.path.exists(fname):
+                            os.remove(fname)
+                        raise
+                    self.logger.debug('downloading {} failed, retrying: {}'
+                                      .format(job, e))
+                    time.sleep(backoff * 2 ** attempt)
+                    attempt += 1
+
+        self.failed = []  # (node, log, exception)
+        files = OrderedDict()
+        try:
+            with ThreadPoolExecutor(max_workers=size) as executor:
+                futures = [executor.submit(piece, job) for job in jobs]
+                for job, future in zip(jobs, futures):
+                    try:
+                        files[(job[0] or job[1], job[2])] = future.result()
+                    except Exception as e:
+                        self.failed.append((job[0] or job[1], job[2], e))
+            if not files:
+                raise LogsError('all {} pieces failed ({})'
+                                .format(len(jobs), self.failed[0][2]))
+
+            if combined:
+                with zipfile.ZipFile(combined, 'w',
+                                     compression=zipfile.ZIP_STORED,
+                                     allowZip64=True) as zf:
+                    for key, fname in files.items():
+                        zf.write(fname, arcname=os.path.basename(fname))
+                        if tmpdir:
+                            os.remove(fname)
+                        files[key] = os.path.basename(fname)
+        finally:
+            pool.close()
+            if tmpdir:
+                tmpdir.cleanup()
+        return files
+
+    def filter(self, logfilter, nodes=[], snodes=[], logs=[], processes=None):
+        """
+        Download the requested logs and filter them while they are
+        received, without storing the downloaded archive.
+
+        :param logfilter:   a *LogFilter()* object
+        :param nodes:       list of node-IDs (int), all if empty
+        :param snodes:      list of S-node names (str), none if empty
+        :param logs:        list of logs (*L_**), all if empty
+        :param processes:   see *filterarchive()*
+        :returns:           a generator yielding *LogLine*\\ s
+        :raises:            *LogsError*
+
+        ..  versionadded:: 0.9.5.0
+        """
+        self.suggestedfilename = self._open(self.con,
+                                            self._downloadxml(nodes, snodes,
+                                                              logs))
+        complete = False
+        try:
+            for line in filterarchive(self.con, logfilter,
+                                      processes=processes):
+                yield line
+            complete = True
+        finally:
+            if not complete:
+                # the Response hasn't been read completely
+                self.con.close()
+
+    def sync(self, store, nodes=[], snodes=[], logs=[], startdate=None,
+             enddate=None, size=4, retries=3, timeout=600, callback=None):
+        """
+        Bring a *LogStore()* up to date: prepare and download the days
+        missing or unfinished in *store*, only. Each row of consecutive
+        missing days is prepared once and downloaded per node (or S-node)
+        and log type, in parallel (see *downloadparallel()*).
+
+        :param store:       a *LogStore()* object
+        :param nodes:       list of node-IDs (int)
+        :param snodes:      list of S-node names (str)
+        :param logs:        list of logs (*L_**), all if empty
+        :param startdate:   1st day to collect (a *datetime.date* object),
+                            defaults to *enddate*
+        :param enddate:     last day to collect (a *datetime.date* object),
+                            defaults to today
+        :param size:        see *downloadparallel()*
+        :param retries:     see *downloadparallel()*
+        :param timeout:     see *wait_ready()*
+        :param callback:    see *wait_ready()*
+        :returns:           an OrderedDict *{(node, log): [days]}* of the days
+                            stored; pieces that failed are listed in *failed*
+                            and will be requested on the next call
+        :raises:            *ValueError* or one of the *LogsError*\\ s
+
+        ..  versionadded:: 0.9.5.0
+        """
+        if not nodes and not snodes:
+            raise ValueError('nodes or snodes required')
+        enddate = enddate or date.today()
+        startdate = startdate or enddate
+        keys = [(str(n), l) for n in list(nodes) + list(snodes)
+                for l in logs or Logs.L_ALL]
+        missing = {key: store.missing(key[0], key[1], startdate, enddate)
+                   for key in keys}
+
+        # rows of consecutive days missing for any of the pieces
+        rows = []
+        for day in sorted(set(d for days in missing.values() for d in days)):
+            if rows and (day - rows[-1][1]).days == 1:
+                rows[-1][1] = day
+            else:
+                rows.append([day, day])
+
+        added = OrderedDict()
+        failed = []
+        for first, last in rows:
+            need = [key for key in keys
+                    if any(first <= d <= last for d in missing[key])]
+            self.logger.debug('syncing {} pieces for {} to {}'
+                              .format(len(need), first, last))
+            fetched = time.time()
+            xsnodes = [s for s in snodes if any(k[0] == s for k in need)]
+            self.prepare(startdate=first, enddate=last, snodes=xsnodes)
+            self.wait_ready(timeout=timeout, callback=callback)
+            with TemporaryDirectory() as tmpdir:
+                files = self.downloadparallel(
+                    directory=tmpdir,
+                    nodes=[n for n in nodes
+                           if any(k[0] == str(n) for k in need)] or None,
+                    snodes=xsnodes,
+                    logs=[l for l in logs or Logs.L_ALL
+                          if any(k[1] == l for k in need)],
+                    size=size, retries=retries)
+                failed.extend(self.failed)
+                for key, fname in files.items():
+                    days = [d for d in missing.get(key, [])
+                            if first <= d <= last]
+                    if not days:
+                        continue
+                    with open(fname, 'rb') as hdl:
+                        store.add(key[0], key[1], hdl, days, fetched=fetched)
+                    added.setdefault(key, []).extend(days)
+        self.failed = failed
+        return added
+
+    @staticmethod
+    def _downloadxml(nodes, snodes, logs):
+        """
+        Create the XML command structure for a download.
+        """
+        if nodes is None:
+            # S-nodes only, exclude the general nodes
+            str_nodes = '<nodes></nodes>'
+        elif nodes:
+            str_nodes = '<nodes>' + ','.join(str(n) for n in nodes) + \
+                        '</nodes>'
         else:
-            str_logs = ','.join(Logs.L_ALL)
+            str_nodes = ''
+        str_snodes = ','.join(snodes)
+        str_logs = ','.join(logs or Logs.L_ALL)
 
-        xml = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n' \
-              '<logDownload>\n' \
-              '    {}\n' \
-              '    <snodes>{}</snodes>\n' \
-              '    <content>{}</content>\n' \
-              '</logDownload>'.format(str_nodes, str_snodes, str_logs).encode()
+        return '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n' \
+               '<logDownload>\n' \
+               '    {}\n' \
+               '    <snodes>{}</snodes>\n' \
+               '    <content>{}</content>\n' \
+               '</logDownload>'.format(str_nodes, str_snodes,
+                                       str_logs).encode()
 
+    def _open(self, con, xml):
+        """
+        Request a download; returns with the *Response* ready to be read.
+
+        :returns:   the filename suggested by HCP
+        :raises:    *LogsError*
+        """
         self.logger.debug('dl_xml: {}'.format(xml))
 
-        # download the logs
         try:
-            self.con.POST('/mapi/logs/download', body=xml,
-                          headers={'Accept': '*/*',
-                                   'Content-Type': 'application/xml'})
+            con.POST('/mapi/logs/download', body=xml,
+                     headers={'Accept': '*/*',
+                              'Content-Type': 'application/xml'})
         except Exception as e:
             self.logger.error(e)
             raise LogsError(e)
         else:
-            self.logger.debug('result: {} - {}'.format(self.con.response_status,
-                                                       self.con.response_reason))
-            self.logger.debug('returned headers: {}'.format(self.con.getheaders()))
-            suggestedfilename = self.con.getheader('Content-Disposition',
-                                                   'name=no-name').split('=')[1]
+            self.logger.debug('result: {} - {}'.format(con.response_status,
+                                                       con.response_reason))
+            self.logger.debug('returned headers: {}'.format(con.getheaders()))
+            suggestedfilename = con.getheader('Content-Disposition',
+                                              'name=no-name').split('=')[1]
 
-        if self.con.response_status == 200:
-            numbytes = 0
+        if con.response_status != 200:
             try:
-                while True:
-                    d = self.con.read(amt=2**18)
-                    numbytes += len(d)
-                    if progresshook:
-                        progresshook(numbytes)
-                    if d:
-                        self.hdl.write(d)
-                    else:
-                        break
+                con.read()
             except Exception as e:
                 raise LogsError(e)
-        else:
-            try:
-                self.con.read()
-            except Exception as e:
-                raise LogsError(e)
-            raise LogsError('{} - {} ({})'.format(self.con.response_status,
-                                                  self.con.response_reason,
-                                                  self.con.getheader('X-HCP-ErrorMessage',
-                                                                     './.')))
-        self.hdl.seek(0)
-        return (self.hdl, suggestedfilename)
+            raise LogsError('{} - {} ({})'.format(con.response_status,
+                                                  con.response_reason,
+                                                  con.getheader('X-HCP-ErrorMessage',
+                                                                './.')))
+        return suggestedfilename
+
+    def _stream(self, con, xml, hdl, progresshook=None):
+        """
+        Request a download and write it to *hdl*.
+
+        :returns:   the filename suggested by HCP
+        :raises:    *LogsError*
+        """
+        suggestedfilename = self._open(con, xml)
+        numbytes = 0
+        try:
+            while True:
+                d = con.read(amt=2**18)
+                numbytes += len(d)
+                if progresshook:
+                    progresshook(numbytes)
+                if d:
+                    hdl.write(d)
+                else:
+                    break
+        except Exception as e:
+            raise LogsError(e)
+        return suggestedfilename
 
     def cancel(self):
         """
@@ -370,6 +745,658 @@ class Logs(object):
         """
         self.logger.debug('close Logs()')
         self.suggestedfilename = ''
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
         self.con.close()
 
 
+LogLine = namedtuple('LogLine', ['member', 'lineno', 'line'])
+LogLine.__doc__ = """
+A line out of a log file within a log archive
+
+..  versionadded:: 0.9.5.0
+"""
+LogLine.member.__doc__ = 'the name of the archive member (nested members ' \
+                         'are joined with */*)'
+LogLine.lineno.__doc__ = 'the line number within the member (starting at 1)'
+LogLine.line.__doc__ = 'the line (str), without the line ending'
+
+
+class LogFilter(object):
+    """
+    The criteria to select lines out of log archives. Archive members are
+    selected by their path, lines by their timestamp and content.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    # timestamps found at the start of a line (2016-01-31 13:45:00) or in
+    # access log format ([31/Jan/2016:13:45:00 +0100])
+    _ISO = re.compile(r'(\d{4})-(\d\d)-(\d\d)[ T](\d\d):(\d\d):(\d\d)')
+    _CLF = re.compile(r'\[(\d\d)/(\w{3})/(\d{4}):(\d\d):(\d\d):(\d\d)'
+                      r' ([+-])(\d\d)(\d\d)\]')
+    MONTHS = {m: i + 1 for i, m in enumerate(['Jan', 'Feb', 'Mar', 'Apr',
+                                               'May', 'Jun', 'Jul', 'Aug',
+                                               'Sep', 'Oct', 'Nov', 'Dec'])}
+
+    def __init__(self, nodes=None, logs=None, start=None, end=None,
+                 pattern=None):
+        """
+        :param nodes:   a list of node-IDs (or S-node names); a member is
+                        selected if one of the directories in its path is
+                        named like one of them
+        :param logs:    a list of log types (*Logs.L_**) or other strings; a
+                        member is selected if its path contains one of them
+                        (case insensitive)
+        :param start:   select lines with a timestamp at or after (a
+                        datetime object; naive ones are local time)
+        :param end:     select lines with a timestamp before (a datetime
+                        object)
+        :param pattern: a regular expression a line needs to match (a str
+                        or a compiled regular expression)
+        """
+        self.nodes = set(str(n) for n in nodes) if nodes else None
+        self.logs = [l.lower() for l in logs] if logs else None
+        self.start = start.timestamp() if start else None
+        self.end = end.timestamp() if end else None
+        self.pattern = re.compile(pattern) if isinstance(pattern, str) \
+            else pattern
+
+    def member(self, name):
+        """
+        Check if an archive member is to be searched.
+
+        :param name:    the name (path) of the member
+        :return:        a bool
+        """
+        if self.nodes and not self.nodes.intersection(name.split('/')[:-1]):
+            return False
+        if self.logs and not any(l in name.lower() for l in self.logs):
+            return False
+        return True
+
+    def timestamp(self, line):
+        """
+        Find the timestamp of a line.
+
+        :param line:    the line (str)
+        :return:        seconds since the epoch, or *None* if the line
+                        doesn't have a timestamp
+        """
+        m = self._CLF.search(line, 0, 80)
+        if m:
+            d, mon, y, h, mi, sec, sign, oh, om = m.groups()
+            offset = (int(oh) * 3600 + int(om) * 60) * (-1 if sign == '-'
+                                                        else 1)
+            return timegm((int(y), self.MONTHS.get(mon, 1), int(d), int(h),
+                           int(mi), int(sec))) - offset
+        m = self._ISO.match(line)
+        if m:
+            return time.mktime(tuple(int(x) for x in m.groups()) +
+                               (0, 0, -1))
+        return None
+
+    def lines(self, lines, firstline=1):
+        """
+        Filter lines.
+
+        :param lines:       an iterable of lines (str)
+        :param firstline:   the line number of the first line
+        :return:            a generator yielding *(lineno, line)* tuples;
+                            lines without a timestamp share the one of the
+                            line before (if they are the first lines, they
+                            aren't filtered by time)
+        """
+        timed = self.start is not None or self.end is not None
+        t = None
+        for lineno, line in enumerate(lines, firstline):
+            if timed:
+                t = self.timestamp(line) or t
+                if t is not None and \
+                        ((self.start is not None and t < self.start) or
+                         (self.end is not None and t >= self.end)):
+                    continue
+            if self.pattern and not self.pattern.search(line):
+                continue
+            yield lineno, line
+
+
+class LogStore(object):
+    """
+    A local store of log files, split into one directory per node (or
+    S-node), log type and day (*<directory>/<node>/<log>/<YYYY-MM-DD>/*).
+    A manifest (*manifest.json*) remembers which days have been stored, so
+    that *Logs.sync()* prepares and downloads the missing and unfinished
+    days, only.
+
+    Lines are assigned to a day by their timestamp; lines out of the
+    downloaded archive that belong to other days than the requested ones
+    (the edges of the prepared range) are dropped. Records (a line with a
+    timestamp plus the lines without one following it) found in more than
+    one log file (rotated files overlapping in time) are stored once; as
+    rotated files overlap at their edges, only the first and the last *EDGE*
+    records of each file and day are compared.
+
+    A day counts as finished if it has ended *grace* seconds before it was
+    prepared; unfinished days are replaced on the next sync.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    MANIFEST = 'manifest.json'
+
+    # the rotation suffix of a log file name (messages.1, request.log.12)
+    _ROTATED = re.compile(r'\.\d+$')
+
+    # the number of records at the start and the end of a log file (per day)
+    # checked for duplicates
+    EDGE = 1000
+
+    def __init__(self, directory, grace=3600):
+        """
+        :param directory:   the directory holding the store (created if it
+                            doesn't exist)
+        :param grace:       the number of seconds after its end a day is
+                            considered to be finished
+        """
+        self.logger = logging.getLogger(__name__ + '.LogStore')
+        self.directory = directory
+        self.grace = grace
+        self.skipped = 0  # lines without a timestamp found in a log file
+        self.duplicates = 0  # records dropped as duplicates
+        self.__lock = Lock()
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(os.path.join(directory, self.MANIFEST)) as hdl:
+                self.manifest = json.load(hdl)
+        except FileNotFoundError:
+            self.manifest = {}
+
+    @staticmethod
+    def _key(node, log, day):
+        return '{}/{}/{}'.format(node, log, day.isoformat())
+
+    def path(self, node, log, day):
+        """
+        The directory holding the log files of a day.
+
+        :param node:    the node-ID (or S-node name)
+        :param log:     the log type (*Logs.L_**)
+        :param day:     the day (a *datetime.date* object)
+        :return:        the path (str)
+        """
+        return os.path.join(self.directory, str(node), log, day.isoformat())
+
+    def missing(self, node, log, startdate, enddate):
+        """
+        Find the days that haven't been stored completely, yet.
+
+        :param node:        the node-ID (or S-node name)
+        :param log:         the log type (*Logs.L_**)
+        :param startdate:   the 1st day (a *datetime.date* object)
+        :param enddate:     the last day (a *datetime.date* object)
+        :return:            a list of *datetime.date* objects
+        """
+        days = []
+        day = startdate
+        with self.__lock:
+            while day <= enddate:
+                entry = self.manifest.get(self._key(node, log, day))
+                if not entry or not entry['complete']:
+                    days.append(day)
+                day += timedelta(days=1)
+        return days
+
+    def add(self, node, log, fp, days, fetched=None):
+        """
+        Split the log files in an archive by day and store the given days,
+        replacing what has been stored for them before.
+
+        :param node:    the node-ID (or S-node name) the archive is from
+        :param log:     the log type (*Logs.L_**) the archive holds
+        :param fp:      the archive, see *iterarchive()*
+        :param days:    the days (*datetime.date* objects) to store; lines
+                        of other days are dropped
+        :param fetched: the time (seconds since the epoch) the logs have
+                        been prepared, defaults to now
+        :return:        a dict *{day: number of lines stored}*
+        :raises:        *LogsError* if the archive can't be read
+        """
+        node = str(node)
+        days = set(days)
+        fetched = fetched or time.time()
+        counts = {day: 0 for day in days}
+        files = {}  # (day, file name): gzip file object
+        edges = {}  # (day, file name): {member: (head, tail) digests}
+        timestamp = LogFilter().timestamp
+        base = os.path.join(self.directory, node, log)
+        os.makedirs(base, exist_ok=True)
+
+        def flush(member, fname, day, record):
+            if day not in days:
+                return
+            text = '\n'.join(record) + '\n'
+            digest = blake2b(text.encode('utf-8'), digest_size=16).digest()
+            members = edges.setdefault((day, fname), {})
+            for other, (head, tail) in members.items():
+                if other != member and (digest in head or digest in tail):
+                    self.duplicates += 1
+                    return
+            head, tail = members.setdefault(member, (set(), OrderedDict()))
+            if len(head) < self.EDGE:
+                head.add(digest)
+            else:
+                tail[digest] = None
+                tail.move_to_end(digest)
+                if len(tail) > self.EDGE:
+                    tail.popitem(last=False)
+            hdl = files.get((day, fname))
+            if not hdl:
+                os.makedirs(os.path.join(tmpdir, day.isoformat()),
+                            exist_ok=True)
+                hdl = files[(day, fname)] = gzip.open(
+                    os.path.join(tmpdir, day.isoformat(), fname + '.gz'),
+                    'wt', encoding='utf-8')
+            hdl.write(text)
+            counts[day] += len(record)
+
+        with TemporaryDirectory(dir=base) as tmpdir:
+            try:
+                member = fname = day = None
+                record = []
+                for name, lineno, data in iterblocks(fp, lambda n: True,
+                                                     2**20):
+                    if name != member:
+                        if record:
+                            if day:
+                                flush(member, fname, day, record)
+                            else:
+                                self.skipped += len(record)
+                        member, day, record = name, None, []
+                        fname = self._ROTATED.sub('', name.split('/')[-1])
+                    for line in splitblock(data):
+                        t = timestamp(line)
+                        if t is None:
+                            record.append(line)
+                            continue
+                        if day:
+                            flush(member, fname, day, record)
+                            record = []
+                        # leading lines without a timestamp go with the 1st
+                        # record of a file
+                        record.append(line)
+                        day = date.fromtimestamp(t)
+                if record:
+                    if day:
+                        flush(member, fname, day, record)
+                    else:
+                        self.skipped += len(record)
+            finally:
+                for hdl in files.values():
+                    hdl.close()
+
+            for day in days:
+                path = self.path(node, log, day)
+                if os.path.exists(path):
+                    shutil.rmtree(path)
+                if os.path.exists(os.path.join(tmpdir, day.isoformat())):
+                    os.replace(os.path.join(tmpdir, day.isoformat()), path)
+                else:
+                    os.makedirs(path)
+
+        with self.__lock:
+            for day in days:
+                end = time.mktime((day + timedelta(days=1)).timetuple())
+                self.manifest[self._key(node, log, day)] = {
+                    'complete': fetched >= end + self.grace,
+                    'lines': counts[day], 'fetched': fetched}
+            self._save()
+        self.logger.debug('stored {} days of {} logs from node {}'
+                          .format(len(days), log, node))
+        return counts
+
+    def _save(self):
+        """
+        Write the manifest (replacing the old one in a single step).
+        """
+        fname = os.path.join(self.directory, self.MANIFEST)
+        with open(fname + '.tmp', 'w') as hdl:
+            json.dump(self.manifest, hdl, indent=1, sort_keys=True)
+        os.replace(fname + '.tmp', fname)
+
+    def lines(self, node, log, startdate, enddate):
+        """
+        Read the stored lines.
+
+        :param node:        the node-ID (or S-node name)
+        :param log:         the log type (*Logs.L_**)
+        :param startdate:   the 1st day (a *datetime.date* object)
+        :param enddate:     the last day (a *datetime.date* object)
+        :return:            a generator yielding *LogLine*\\ s, with the
+                            member named *<YYYY-MM-DD>/<file name>*
+        """
+        day = startdate
+        while day <= enddate:
+            path = self.path(node, log, day)
+            if os.path.isdir(path):
+                for fname in sorted(os.listdir(path)):
+                    with gzip.open(os.path.join(path, fname), 'rt',
+                                   encoding='utf-8') as hdl:
+                        for lineno, line in enumerate(hdl, 1):
+                            yield LogLine('{}/{}'.format(day.isoformat(),
+                                                         fname[:-3]),
+                                          lineno, line.rstrip('\n'))
+            day += timedelta(days=1)
+
+
+class _Stream(object):
+    """
+    Buffered, exact reads from a file-like object that can be read in
+    chunks, only.
+    """
+
+    def __init__(self, fp, chunksize=2**18):
+        self.fp = fp
+        self.chunksize = chunksize
+        self.buf = b''
+
+    def read(self, n=-1):
+        """
+        Read *n* bytes (less at EOF only), or all if *n* < 0.
+        """
+        while n < 0 or len(self.buf) < n:
+            chunk = self.fp.read(self.chunksize)
+            if not chunk:
+                break
+            self.buf += chunk
+        if n < 0:
+            n = len(self.buf)
+        data, self.buf = self.buf[:n], self.buf[n:]
+        return data
+
+    def read1(self, n):
+        """
+        Read up to *n* bytes, but at least one (unless EOF).
+        """
+        if not self.buf:
+            self.buf = self.fp.read(self.chunksize)
+        data, self.buf = self.buf[:n], self.buf[n:]
+        return data
+
+    def unread(self, data):
+        self.buf = data + self.buf
+
+
+class _ZipMember(object):
+    """
+    A zip archive member, read from a *_Stream()*.
+    """
+
+    def __init__(self, stream, name, method, csize, crc, descriptor):
+        self.stream = stream
+        self.name = name
+        self.method = method
+        self.remaining = None if descriptor else csize
+        self.crc = crc
+        self.descriptor = descriptor
+        self.zip64 = False
+        self.crcnow = 0
+        self.eof = False
+        self.buf = b''
+        if method == zipfile.ZIP_DEFLATED:
+            self.zobj = zlib.decompressobj(-15)
+        elif method != zipfile.ZIP_STORED or descriptor:
+            raise LogsError('{}: member can\'t be read from a stream '
+                            '(compression {}, data descriptor: {})'
+                            .format(name, method, bool(descriptor)))
+
+    def _fill(self, n):
+        """
+        Get the next piece of (decompressed) data.
+        """
+        if self.method == zipfile.ZIP_STORED:
+            data = self.stream.read1(min(n, self.remaining))
+            if not data and self.remaining:
+                raise LogsError('{}: truncated'.format(self.name))
+            self.remaining -= len(data)
+            done = not self.remaining
+        else:
+            raw = self.stream.read1(2**16 if self.remaining is None
+                                    else min(2**16, self.remaining))
+            if not raw:
+                raise LogsError('{}: truncated'.format(self.name))
+            if self.remaining is not None:
+                self.remaining -= len(raw)
+            data = self.zobj.decompress(raw)
+            done = self.zobj.eof
+            if done:
+                self.stream.unread(self.zobj.unused_data)
+        self.crcnow = zlib.crc32(data, self.crcnow)
+        if done:
+            self._finish()
+        return data
+
+    def _finish(self):
+        """
+        Check the CRC (read from the data descriptor, if there is one).
+        """
+        self.eof = True
+        if self.descriptor:
+            sig = self.stream.read(4)
+            if sig == b'PK\x07\x08':
+                sig = self.stream.read(4)
+            self.crc = struct.unpack('<I', sig)[0]
+            self.stream.read(16 if self.zip64 else 8)
+        if self.crcnow & 0xffffffff != self.crc:
+            raise LogsError('{}: CRC mismatch'.format(self.name))
+
+    def read(self, n=-1):
+        if n < 0:
+            chunks = [self.buf]
+            self.buf = b''
+            while not self.eof:
+                chunks.append(self._fill(2**18))
+            return b''.join(chunks)
+        while len(self.buf) < n and not self.eof:
+            self.buf += self._fill(n)
+        data, self.buf = self.buf[:n], self.buf[n:]
+        return data
+
+
+def _iterzip(stream):
+    """
+    Walk through the local headers of a zip archive.
+    """
+    while True:
+        if stream.read(4) != b'PK\x03\x04':
+            return  # the central directory (or the end) has been reached
+        (ver, flag, method, mtime, mdate, crc, csize, usize, nlen,
+         xlen) = struct.unpack('<HHHHHIIIHH', stream.read(26))
+        name = stream.read(nlen).decode('utf-8' if flag & 0x800
+                                        else 'cp437')
+        extra = stream.read(xlen)
+        zip64 = False
+        while len(extra) >= 4:
+            xid, xsize = struct.unpack('<HH', extra[:4])
+            if xid == 1:
+                zip64 = True
+                if csize == 0xffffffff and xsize >= 16:
+                    usize, csize = struct.unpack('<QQ', extra[4:20])
+            extra = extra[4 + xsize:]
+        member = _ZipMember(stream, name, method, csize, crc, flag & 0x08)
+        member.zip64 = zip64
+        if not flag & 0x08 and not csize:
+            member._finish()
+        yield name, member
+        member.read()  # skip whatever hasn't been read by the caller
+
+
+def iterarchive(fp, chunksize=2**18):
+    """
+    Iterate over the members of a zip or tar archive (compressed or not)
+    while it is read from a stream, without the need for a temporary file.
+    Members that are archives themselves are iterated recursively, members
+    ending with *.gz* are decompressed.
+
+    :param fp:          a file-like object in binary mode (an
+                        *hcpsdk.Connection()* with a pending *Response* will
+                        do), to be read in chunks
+    :param chunksize:   the number of bytes read at once
+    :return:            a generator yielding *(name, fileobj)* tuples; a
+                        *fileobj* needs to be read before the next member
+                        is requested (it's skipped, otherwise)
+    :raises:            *LogsError* if the archive can't be read
+
+    ..  versionadded:: 0.9.5.0
+    """
+    stream = fp if isinstance(fp, _Stream) else _Stream(fp, chunksize)
+    magic = stream.read(4)
+    stream.unread(magic)
+    if magic == b'PK\x03\x04':
+        members = _iterzip(stream)
+    else:
+        try:
+            tf = tarfile.open(fileobj=stream, mode='r|*')
+        except tarfile.TarError as e:
+            raise LogsError('not a zip or tar archive: {}'.format(e))
+        members = ((m.name, tf.extractfile(m)) for m in tf if m.isfile())
+
+    for name, member in members:
+        lname = name.lower()
+        if lname.endswith(('.zip', '.tar', '.tgz', '.tar.gz')):
+            for iname, imember in iterarchive(member, chunksize):
+                yield '{}/{}'.format(name, iname), imember
+        elif lname.endswith('.gz'):
+            yield name[:-3], gzip.GzipFile(fileobj=member, mode='rb')
+        else:
+            yield name, member
+
+
+def iterblocks(fp, select, blocksize, timestamp=None):
+    """
+    Read the members of an archive in blocks of complete lines, to be
+    handed over to worker processes.
+
+    :param fp:          see *iterarchive()*
+    :param select:      a function taking a member name, returning *True* if
+                        the member is to be read
+    :param blocksize:   the (approx.) number of bytes per block
+    :param timestamp:   a function taking a line, returning its timestamp
+                        or *None* (see *LogFilter.timestamp()*); if given,
+                        blocks are cut before a line with a timestamp, so
+                        that the lines following it stay in its block
+    :return:            a generator yielding *(member name, line number of
+                        the first line, block)* tuples; *block* is bytes
+
+    ..  versionadded:: 0.9.5.0
+    """
+    for name, member in iterarchive(fp):
+        if not select(name):
+            continue
+        lineno = 1
+        rest = b''
+        while True:
+            data = member.read(blocksize)
+            if not data:
+                break
+            data = rest + data
+            cut = data.rfind(b'\n') + 1
+            if not cut:
+                rest = data
+                continue
+            if timestamp:
+                cut = _recordstart(data, cut, timestamp) or cut
+            data, rest = data[:cut], data[cut:]
+            yield name, lineno, data
+            lineno += data.count(b'\n')
+        if rest:
+            yield name, lineno, rest
+
+
+def _recordstart(data, end, timestamp, limit=2**16):
+    """
+    Find the start of the last line with a timestamp in *data[:end]*,
+    looking back *limit* bytes at most.
+
+    :return:    the offset of the line, 0 if there is none
+    """
+    floor = max(0, end - limit)
+    while end > floor:
+        start = data.rfind(b'\n', floor, end - 1) + 1
+        if start <= floor:
+            break
+        if timestamp(data[start:end].decode('utf-8', 'replace')) is not None:
+            return start
+        end = start
+    return 0
+
+
+def splitblock(data):
+    """
+    Split a block read by *iterblocks()* into lines at *\\n* (and
+    *\\r\\n*) only, unlike *str.splitlines()*, which would miscount the
+    line numbers.
+
+    :param data:    the block (bytes, utf-8)
+    :return:        a list of lines (str), without the line endings
+
+    ..  versionadded:: 0.9.5.0
+    """
+    lines = data.decode('utf-8', 'replace').split('\n')
+    if not lines[-1]:
+        lines.pop()
+    return [l[:-1] if l.endswith('\r') else l for l in lines]
+
+
+def _filterblock(logfilter, member, firstline, data):
+    """
+    Filter a block of lines (run in a worker process).
+    """
+    return [LogLine(member, lineno, line) for lineno, line in
+            logfilter.lines(splitblock(data), firstline)]
+
+
+def filterarchive(fp, logfilter, processes=None, blocksize=2**22):
+    """
+    Filter the lines of the log files in an archive while it is read from
+    a stream. The archive is read and decompressed in the calling process,
+    blocks of lines are filtered by a pool of worker processes.
+
+    :param fp:          a file-like object in binary mode, see *iterarchive()*
+    :param logfilter:   a *LogFilter()* object
+    :param processes:   the number of worker processes; defaults to the
+                        number of CPUs, 0 filters in the calling process
+    :param blocksize:   the number of bytes handed over to a worker at once
+    :return:            a generator yielding *LogLine*\\ s, in the order of
+                        the archive members and their lines
+
+    ..  versionadded:: 0.9.5.0
+    """
+    blocks = iterblocks(fp, logfilter.member, blocksize,
+                        logfilter.timestamp)
+    if processes == 0:
+        for name, lineno, data in blocks:
+            for line in _filterblock(logfilter, name, lineno, data):
+                yield line
+        return
+
+    processes = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        # keep the workers busy, but don't read ahead too far
+        maxpending = 2 * processes
+        pending = deque()
+        try:
+            for name, lineno, data in blocks:
+                pending.append(executor.submit(_filterblock, logfilter, name,
+                                               lineno, data))
+                while len(pending) >= maxpending:
+                    for line in pending.popleft().result():
+                        yield line
+            while pending:
+                for line in pending.popleft().result():
+                    yield line
+        finally:
+            for future in pending:
+                future.cancel()
+
@@ -21,11 +21,16 @@
 # CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 import xml.etree.ElementTree as Et
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Thread
 import logging
 import hcpsdk
 
 
-__all__ = ['ReplicationSettingsError', 'Replication']
+__all__ = ['ReplicationSettingsError', 'Replication', 'ReplicationMonitor',
+           'xmltodict']
 
 logging.getLogger('hcpsdk.mapi.replication').addHandler(logging.NullHandler())
 
@@ -44,6 +49,72 @@ class ReplicationSettingsError(Exception):
         self.args = (reason,)
 
 
+def xmltodict(fp, chunksize=2**16):
+    """
+    Convert an XML document into a dict while it is read from a stream,
+    without buffering the raw document. Elements holding text become str
+    values, elements holding other elements (or nothing at all) become
+    dicts; elements found more than once become a list of values. Memory
+    use is proportional to the size of the resulting dict, not constant.
+
+    :param fp:          a file-like object (an *hcpsdk.Connection()* with a
+                        pending *Response* will do), bytes or str
+    :param chunksize:   the number of bytes read at once
+    :return:            a dict holding the content of the root element
+    :raises:            *hcpsdk.HcpsdkError* if the XML is malformed
+
+    ..  versionadded:: 0.9.5.0
+    """
+    parser = Et.XMLPullParser(events=('start', 'end'))
+    stack = [{}]
+    try:
+        while True:
+            if isinstance(fp, (bytes, str)):
+                chunk, fp = fp, b''
+            else:
+                chunk = fp.read(chunksize)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            for event, elem in parser.read_events():
+                if event == 'start':
+                    stack.append({})
+                    continue
+                d = stack.pop()
+                value = d if d or not elem.text or not elem.text.strip() \
+                    else elem.text
+                parent = stack[-1]
+                if elem.tag not in parent:
+                    parent[elem.tag] = value
+                elif isinstance(parent[elem.tag], list):
+                    parent[elem.tag].append(value)
+                else:
+                    parent[elem.tag] = [parent[elem.tag], value]
+                elem.clear()
+        parser.close()
+    except Et.ParseError as e:
+        raise hcpsdk.HcpsdkError('malformed XML: {}'.format(e))
+    root = stack[0]
+    return next(iter(root.values())) if root else {}
+
+
+def _legacy(value, depth):
+    """
+    Project a value converted by *xmltodict()* onto the layout the
+    *Replication()* query methods have always returned: elements holding
+    text become str values, elements holding other elements become dicts,
+    down to *depth* levels; deeper elements become *None*. Of elements found
+    more than once, the last one wins.
+    """
+    if isinstance(value, list):
+        value = value[-1]
+    if isinstance(value, str):
+        return value
+    if not depth:
+        return None
+    return {k: _legacy(v, depth - 1) for k, v in value.items()}
+
+
 class Replication(object):
     """
     Access replication link information, modify the replication link state.
@@ -61,51 +132,67 @@ class Replication(object):
     R_BEGINRECOVERY = 'beginRecovery'  # for active/passive links
     R_COMPLETERECOVERY = 'completeRecovery'  # dito
 
-    def __init__(self, target, debuglevel=0):
+    def __init__(self, target, debuglevel=0, pool=None):
         """
         :param target:      an hcpsdk.Target object
         :param debuglevel:  0..9 (used in *http.client*)
+        :param pool:        an **hcpsdk.ConnectionPool** object used for the
+                            queries; if *None*, a new *Connection()* is used
+                            per query
+
+        ..  versionchanged:: 0.9.5.0
+            added *pool*
         """
         self.logger = logging.getLogger(__name__ + '.Replication')
         hcpsdk.checkport(target, hcpsdk.P_MAPI)
         self.target = target
         self.debuglevel = debuglevel
+        self.pool = pool
         self.connect_time = 0.0
         self.service_time = 0.0
 
-    def getreplicationsettings(self):
+    def _get(self, url, params=None, requesterror=None):
         """
-        Query MAPI for the general settings of the replication service.
-
-        :return: a dict containing the settings
-        :raises: HcpsdkError
+        GET a MAPI resource and convert the XML Response into a dict by
+        *xmltodict()* while it is read. If *requesterror* is given, the
+        result of *requesterror(exception)* is returned if the request fails.
         """
-        d = {}
+        if self.pool:
+            with self.pool.connection() as con:
+                return self._query(con, url, params, requesterror)
         try:
             con = hcpsdk.Connection(self.target, debuglevel=self.debuglevel)
         except Exception as e:
             raise hcpsdk.HcpsdkError(str(e))
-        else:
-            self.connect_time = con.connect_time
-            try:
-                r = con.GET('/mapi/services/replication')
-            except Exception as e:
-                raise hcpsdk.HcpsdkError(str(e))
-            else:
-                if r.status == 200:
-                    # Good status, get and parse the Response
-                    x = r.read()
-                    self.service_time = con.service_time2
-                    for child in Et.fromstring(x):
-                        d[child.tag] = child.text
-                else:
-                    raise (hcpsdk.HcpsdkError('{} - {}'.format(r.status, r.reason)))
+        try:
+            return self._query(con, url, params, requesterror)
         finally:
-            # noinspection PyUnboundLocalVariable
             con.close()
 
+    def _query(self, con, url, params, requesterror):
+        self.connect_time = con.connect_time
+        try:
+            r = con.GET(url, params=params)
+        except Exception as e:
+            if requesterror:
+                return requesterror(e)
+            raise hcpsdk.HcpsdkError(str(e))
+        if r.status != 200:
+            con.read()
+            raise hcpsdk.HcpsdkError('{} - {}'.format(r.status, r.reason))
+        d = xmltodict(con)
+        self.service_time = con.service_time2
         return d
 
+    def getreplicationsettings(self):
+        """
+        Query MAPI for the general settings of the replication service.
+
+        :return: a dict containing the settings
+        :raises: HcpsdkError
+        """
+        return _legacy(self._get('/mapi/services/replication'), 1)
+
     def getlinklist(self):
         """
         Query MAPI for a list of replication links.
@@ -113,33 +200,12 @@ class Replication(object):
         :return:  a list with the names of replication links
         :raises: HcpsdkError
         """
-        d = []
-        try:
-            con = hcpsdk.Connection(self.target, debuglevel=self.debuglevel)
-        except Exception as e:
-            raise hcpsdk.HcpsdkError(str(e))
-        else:
-            self.connect_time = con.connect_time
-            try:
-                r = con.GET('/mapi/services/replication/links')
-            except Exception as e:
-                d.append('Error: {}'.format(str(e)))
-            else:
-                if r.status == 200:
-                    # Good status, get and parse the Response
-                    x = r.read()
-                    self.service_time = con.service_time2
-                    root = Et.fromstring(x)
-                    for child in root:
-                        if child.tag == 'name':
-                            d.append(child.text)
-                else:
-                    raise (hcpsdk.HcpsdkError('{} - {}'.format(r.status, r.reason)))
-        finally:
-            # noinspection PyUnboundLocalVariable
-            con.close()
-
-        return d
+        d = self._get('/mapi/services/replication/links',
+                      requesterror=lambda e: {'name': 'Error: {}'
+                                              .format(str(e))})
+        names = d.get('name', [])
+        return [_legacy(n, 0) for n in
+                (names if isinstance(names, list) else [names])]
 
     def getlinkdetails(self, link):
         """
@@ -149,42 +215,22 @@ class Replication(object):
         :return:        a dict holding the details
         :raises:        HcpsdkError
         """
-        d = {}
-        try:
-            con = hcpsdk.Connection(self.target, debuglevel=self.debuglevel)
-        except Exception as e:
-            raise hcpsdk.HcpsdkError(str(e))
-        else:
-            self.connect_time = con.connect_time
-            try:
-                r = con.GET('/mapi/services/replication/links/{}'.format(link),
-                            params={'verbose': 'true'})
-            except Exception as e:
-                raise hcpsdk.HcpsdkError(str(e))
-            else:
-                if r.status == 200:
-                    # Good status, get and parse the Response
-                    x = r.read()
-                    self.service_time = con.service_time2
-                    for child in Et.fromstring(x):
-                        if child.text:
-                            d[child.tag] = child.text
-                        else:
-                            d[child.tag] = {}
-                            for i in child:
-                                if i.text:
-                                    d[child.tag][i.tag] = i.text
-                                else:
-                                    d[child.tag][i.tag] = {}
-                                    for j in i:
-                                        d[child.tag][i.tag][j.tag] = j.text
-                else:
-                    raise (hcpsdk.HcpsdkError('{} - {}'.format(r.status, r.reason)))
-        finally:
-            # noinspection PyUnboundLocalVariable
-            con.close()
+        return _legacy(self._linkdetails(link), 3)
 
-        return d
+    def _linknames(self):
+        """
+        Like *getlinklist()*, but raises *HcpsdkError* if the request fails.
+        """
+        names = self._get('/mapi/services/replication/links').get('name', [])
+        return names if isinstance(names, list) else [names]
+
+    def _linkdetails(self, link):
+        """
+        Like *getlinkdetails()*, but converted by *xmltodict()*, at any
+        depth.
+        """
+        return self._get('/mapi/services/replication/links/{}'.format(link),
+                         params={'verbose': 'true'})
 
     def setreplicationlinkstate(self, linkname, action, linktype=None):
         """
@@ -236,3 +282,160 @@ class Replication(object):
             con.close()
 
 
+
+
+class ReplicationMonitor(object):
+    """
+    Polls the details of all replication links concurrently, on a schedule,
+    through a shared pool of *Connection()*\\ s, and keeps the statistics in
+    a *hcpsdk.timeseries.Series* per link, which allows to calculate
+    throughput and backlog trends.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    # the fields sampled from the link statistics
+    FIELDS = ('bytesPending', 'objectsPending', 'bytesReplicated',
+              'objectsReplicated', 'errors', 'upToDateAsOfMillis')
+
+    def __init__(self, target, links=None, interval=10, history=1440,
+                 workers=8, debuglevel=0):
+        """
+        :param target:      an hcpsdk.Target object
+        :param links:       a list of link names to poll; all links (as
+                            reported by *Replication.getlinklist()* with
+                            every poll) if *None*
+        :param interval:    the time between two samples (seconds)
+        :param history:     the number of samples kept per link
+        :param workers:     the max. number of links polled in parallel
+                            (and the size of the *ConnectionPool*)
+        :param debuglevel:  0..9 (propagated to *http.client*)
+        """
+        self.logger = logging.getLogger(__name__ + '.ReplicationMonitor')
+        self.links = links
+        self.interval = interval
+        self.history = history
+        self.workers = workers
+        self.pool = hcpsdk.ConnectionPool(target, size=workers,
+                                          debuglevel=debuglevel)
+        self.replication = Replication(target, debuglevel=debuglevel,
+                                       pool=self.pool)
+        self.details = OrderedDict()  # link: details of the last poll
+        self.errors = {}  # link: the exception raised by the last poll
+        self.__series = OrderedDict()
+        self.__stop = Event()
+        self.__thread = None
+
+    def sample(self):
+        """
+        Poll all links once.
+
+        :return:    a dict holding the number of links polled successfully
+                    (*'ok'*) and failed (*'failed'*)
+        :raises:    *hcpsdk.HcpsdkError* if the list of links can't be
+                    queried
+        """
+        links = self.links or self.replication._linknames()
+
+        def _poll(link):
+            try:
+                details = self.replication._linkdetails(link)
+            except Exception as e:
+                self.logger.debug('polling {} failed: {}'.format(link, e))
+                self.errors[link] = e
+                return False
+            stats = details.get('statistics') or {}
+            if link not in self.__series:
+                self.__series[link] = hcpsdk.timeseries.Series(
+                    ReplicationMonitor.FIELDS, size=self.history)
+            self.__series[link].append(time.time(),
+                                       [float(stats.get(f) or 0)
+                                        for f in ReplicationMonitor.FIELDS])
+            self.details[link] = details
+            self.errors.pop(link, None)
+            return True
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(_poll, links))
+        return {'ok': results.count(True), 'failed': results.count(False)}
+
+    def start(self):
+        """
+        Start polling every *interval* seconds, in a background thread.
+        """
+        if self.__thread and self.__thread.is_alive():
+            return
+        self.__stop.clear()
+        self.__thread = Thread(target=self.__run,
+                               name='hcpsdk.ReplicationMonitor', daemon=True)
+        self.__thread.start()
+
+    def __run(self):
+        hcpsdk.timeseries.every(self.interval, self.sample, self.__stop,
+                                self.logger)
+
+    def stop(self):
+        """
+        Stop polling.
+        """
+        self.__stop.set()
+        if self.__thread:
+            self.__thread.join()
+            self.__thread = None
+
+    def series(self, link):
+        """
+        Get the samples of a link.
+
+        :param link:    the link's name
+        :return:        a *hcpsdk.timeseries.Series* object, its fields are
+                        *FIELDS*
+        """
+        return self.__series[link]
+
+    def rates(self, link):
+        """
+        Get the throughput and the backlog trend of a link.
+
+        :param link:    the link's name
+        :return:        a list of *(timestamp, bytes/s, objects/s, backlog
+                        bytes/s, backlog objects/s)* tuples, one per
+                        interval; a negative backlog rate means that the
+                        backlog is shrinking
+        """
+        return [(t, r[2], r[3], r[0], r[1])
+                for t, r in self.__series[link].rates()]
+
+    def latest(self):
+        """
+        Get the state of all links as of the last poll.
+
+        :return:    a dict holding a dict per link name, with the
+                    backlog (*'bytesPending'*, *'objectsPending'*), the
+                    throughput of the last interval (*'bytesPerSecond'*,
+                    *'objectsPerSecond'*, *None* if there are less than two
+                    samples available) and the seconds the link's data is
+                    behind (*'lag'*)
+        """
+        d = OrderedDict()
+        for link, series in self.__series.items():
+            last = series.last()
+            if not last:
+                continue
+            t, values = last
+            sample = dict(zip(ReplicationMonitor.FIELDS, values))
+            rates = series.rates()
+            d[link] = {'bytesPending': sample['bytesPending'],
+                       'objectsPending': sample['objectsPending'],
+                       'bytesPerSecond': rates[-1][1][2] if rates else None,
+                       'objectsPerSecond': rates[-1][1][3] if rates else None,
+                       'lag': max(0.0, t - sample['upToDateAsOfMillis'] / 1000)
+                       if sample['upToDateAsOfMillis'] else None}
+        return d
+
+    def close(self):
+        """
+        Stop polling and close the *ConnectionPool*.
+        """
+        self.stop()
+        self.pool.close()
@@ -21,12 +21,15 @@
 # CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 import logging
+import time
 from json import loads
-from pprint import pprint
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
 import hcpsdk
 
 
-__all__ = ['TenantError', 'listtenants', 'Tenant']
+__all__ = ['TenantError', 'listtenants', 'infos', 'Tenant']
 
 logging.getLogger('hcpsdk.mapi.tenant').addHandler(logging.NullHandler())
 
@@ -42,111 +45,157 @@ class TenantError(Exception):
         self.args = (reason,)
 
 
-def listtenants(target, timeout=60, debuglevel=0):
+def listtenants(target, timeout=60, debuglevel=0, pool=None, size=4,
+                ttl=None):
     """
     Get a list of available Tenants
 
     :param target:      an hcpsdk.Target object
     :param timeout:     the connection timeout in seconds
     :param debuglevel:  0..9 (used in *http.client*)
-    :returns:           a list() of *Tenant()* objects
+    :param pool:        an **hcpsdk.ConnectionPool** object to use; if
+                        *None*, a pool of *size* *Connection()*\\ s is
+                        created
+    :param size:        the size of the pool created if *pool* is *None*
+    :param ttl:         passed to the *Tenant()* objects
+    :returns:           a list() of *Tenant()* objects, sharing *pool*
     :raises:            *hcpsdk.HcpsdkPortError* in case *target* is
                         initialized with a port different that *P_MAPI*
+
+    ..  versionchanged:: 0.9.5.0
+        added *pool*, *size* and *ttl*
     """
     logger = logging.getLogger(__name__)
     logger.debug('getting a list of Tenants')
     hcpsdk.checkport(target, hcpsdk.P_MAPI)
-    tenantslist = []
-
-    try:
-        con = hcpsdk.Connection(target, timeout=timeout, debuglevel=debuglevel)
-    except Exception as e:
-        raise hcpsdk.HcpsdkError(str(e))
+    pool = pool or hcpsdk.ConnectionPool(target, size=size, timeout=timeout,
+                                         debuglevel=debuglevel)
 
     try:
-        con.GET('/mapi/tenants', headers={'Accept': 'application/json'},
-                params={'verbose': 'true'})
+        with pool.connection() as con:
+            con.GET('/mapi/tenants', headers={'Accept': 'application/json'},
+                    params={'verbose': 'true'})
+            if con.response_status == 200:
+                names = loads(con.read().decode())['name']
+            else:
+                con.close()
+                logger.debug('getting a list of Tenants failed: {}-{}'
+                             .format(con.response_status,
+                                     con.response_reason))
+                raise TenantError('unable to list Tenants ({} - {})'
+                                  .format(con.response_status,
+                                          con.response_reason))
+    except TenantError:
+        raise
     except Exception as e:
         logger.debug('getting a list of Tenants failed: {}'.format(e))
         raise TenantError('get Tenant list failed: {}'.format(e))
-    else:
-        if con.response_status == 200:
-            for t in loads(con.read().decode())['name']:
-                tenantslist.append(Tenant(target, t, debuglevel=debuglevel))
-            logger.debug('got a list of {} Tenants'.format(len(tenantslist)))
-        else:
-            con.close()
-            logger.debug('getting a list of Tenants failed: {}-{}'
-                         .format(con.response_status, con.response_reason))
-            raise TenantError('unable to list Tenants ({} - {})'
-                              .format(con.response_status,
-                                      con.response_reason))
-
-    con.close()
+
+    tenantslist = [Tenant(target, t, pool=pool, ttl=ttl) for t in names]
+    logger.debug('got a list of {} Tenants'.format(len(tenantslist)))
     return tenantslist
 
 
+def infos(tenants, cache=True, workers=4):
+    """
+    Get the settings of many Tenants concurrently.
+
+    :param tenants:     a list of *Tenant()* objects
+    :param cache:       a bool indicating if cached information shall be used
+    :param workers:     the max. number of requests in flight (also bound by
+                        the size of the Tenants' *ConnectionPool*)
+    :return:            an OrderedDict holding the settings, keyed by the
+                        Tenants' names (in the order of *tenants*)
+    :raises:            *TenantError* or *hcpsdk.HcpsdkError* for the first
+                        Tenant that failed
+
+    ..  versionadded:: 0.9.5.0
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(lambda t: t.info(cache=cache), tenants)
+        return OrderedDict(zip([t.name for t in tenants], results))
+
 
 class Tenant(object):
     """
     A class representing a Tenant
-    """
 
-    # TODO: this object is simply a container for a single tenants settings
-    #       remove all the other stuff...
+    ..  versionchanged:: 0.9.5.0
+        No longer opens a *Connection()* when instantiated; requests are
+        served by a (shared) *ConnectionPool*.
+    """
 
-    def __init__(self, target, name, timeout=60, debuglevel=0):
+    def __init__(self, target, name, timeout=60, debuglevel=0, pool=None,
+                 ttl=None):
         """
         :param target:      an hcpsdk.Target object
         :param name:        the Tenants name
         :param timeout:     the connection timeout in seconds
         :param debuglevel:  0..9 (used in *http.client*)
+        :param pool:        an **hcpsdk.ConnectionPool** object to use; if
+                            *None*, a private pool with a single
+                            *Connection()* is created
+        :param ttl:         the number of seconds *info()* is cached; if
+                            *None*, until it's called with *cache=False*
+
+        ..  versionchanged:: 0.9.5.0
+            added *pool* and *ttl*
         """
         self.logger = logging.getLogger(__name__ + '.Tenant')
         self.target = target
-        try:
-            self.con = hcpsdk.Connection(self.target, timeout=timeout,
-                                         debuglevel=debuglevel)
-        except Exception as e:
-            raise hcpsdk.HcpsdkError(str(e))
-
+        self.pool = pool or hcpsdk.ConnectionPool(target, size=1,
+                                                  timeout=timeout,
+                                                  debuglevel=debuglevel)
         self.name = name        # the Tenants name
+        self.ttl = ttl
         self._settings = {}     # the Tenants base settings
+        self._expiry = 0.0      # the time the settings expire
+        self._lock = Lock()
 
         self.logger.debug('initialized for "{}"'.format(self.name))
 
-
     def info(self, cache=True):
         """
-        Get the settings of the Tenant
+        Get the settings of the Tenant; they are loaded on first use.
 
         :param cache:   a bool indicating if cached information shall be used
         :return:        a dict holding the Tenants settings
         """
+        with self._lock:
+            if cache and self._settings and \
+                    (self.ttl is None or self._expiry > time.time()):
+                return self._settings
 
-        if not self._settings or not cache:
-            try:
-                self.con.GET('/mapi/tenants/{}'.format(self.name),
-                             headers={'Accept': 'application/json'})
-            except Exception as e:
-                raise hcpsdk.HcpsdkError(str(e))
-            else:
-                if self.con.response_status == 200:
-                    self._settings = loads(self.con.read().decode())
-                    self.logger.debug('got settings of Tenant {}'
-                                      .format(self.name))
+        try:
+            with self.pool.connection() as con:
+                con.GET('/mapi/tenants/{}'.format(self.name),
+                        headers={'Accept': 'application/json'})
+                if con.response_status == 200:
+                    settings = loads(con.read().decode())
                 else:
                     self.logger.debug('getting settings of Tenant {} '
                                       'failed: {}-{}'
-                                      .format(self.con.response_status,
-                                              self.con.response_reason))
-                    raise TenantError('unable to list Tenants ({} - {})'
-                                      .format(self.con.response_status,
-                                              self.con.response_reason))
-        return self._settings
+                                      .format(self.name,
+                                              con.response_status,
+                                              con.response_reason))
+                    raise TenantError('unable to get settings of Tenant {} '
+                                      '({} - {})'
+                                      .format(self.name, con.response_status,
+                                              con.response_reason))
+        except TenantError:
+            raise
+        except Exception as e:
+            raise hcpsdk.HcpsdkError(str(e))
+
+        self.logger.debug('got settings of Tenant {}'.format(self.name))
+        with self._lock:
+            self._settings = settings
+            self._expiry = time.time() + (self.ttl or 0)
+        return settings
 
     def close(self):
         """
-        Close the underlying *hcpsdk.Connection()* object
+        Close the idle *Connection()*\\ s of the underlying *ConnectionPool*
+        (it stays usable).
         """
-        self.con.close()
+        self.pool.close()
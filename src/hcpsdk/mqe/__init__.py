@@ -0,0 +1,548 @@
+# -*- coding: utf-8 -*-
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2016 Thorsten Simons (sw@snomis.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+import json
+import time
+import logging
+import queue
+from collections import namedtuple
+from datetime import datetime
+from threading import Event, Lock, Thread
+import hcpsdk
+
+
+__all__ = ['QueryError', 'Query', 'ChangeEvent', 'ChangeFeed']
+
+logging.getLogger('hcpsdk.mqe').addHandler(logging.NullHandler())
+
+
+class QueryError(Exception):
+    """
+    Base Exception used by the *hcpsdk.mqe.Query()* class.
+    """
+    def __init__(self, reason):
+        """
+        :param reason: An error description
+        """
+        self.args = (reason,)
+
+
+def _millis(value):
+    """
+    Convert a point in time to milliseconds since the epoch.
+
+    :param value:   a *datetime.datetime* object or a number (milliseconds)
+    :return:        an int
+    """
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    return int(value)
+
+
+def _slices(start, end, parallel):
+    """
+    Split the range *start* .. *end* (milliseconds, both included) into up to
+    *parallel* adjacent, non-overlapping slices.
+
+    :return:    a list of (start, end) tuples, in ascending order
+    """
+    parallel = max(1, min(parallel, end - start + 1))
+    width = (end - start + 1) // parallel
+    slices = []
+    for i in range(parallel):
+        s = start + i * width
+        e = end if i == parallel - 1 else s + width - 1
+        slices.append((s, e))
+    return slices
+
+
+class Query(object):
+    """
+    Access to HCP's Metadata Query API (:term:`MQE`).
+
+    Results are paged automatically and yielded as soon as a page has been
+    received. Queries over a time range can be split into slices that are
+    queried in parallel; the results are merged back into their original
+    order.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    # transaction types for operation based queries
+    T_CREATE = 'create'
+    T_DELETE = 'delete'
+    T_DISPOSE = 'dispose'
+    T_PRUNE = 'prune'
+    T_PURGE = 'purge'
+    T_ALL = [T_CREATE, T_DELETE, T_DISPOSE, T_PRUNE, T_PURGE]
+
+    def __init__(self, target, pool=None, size=4, timeout=120, debuglevel=0):
+        """
+        :param target:      an hcpsdk.Target object pointing to a Tenant FQDN
+                            (**<tenant>.hcp.domain**, port 443 or 80)
+        :param pool:        an **hcpsdk.ConnectionPool** object to use; if
+                            *None*, a private pool is created
+        :param size:        the size of the private pool, which limits the
+                            number of sub-queries run in parallel
+        :param timeout:     the connection timeout in seconds
+        :param debuglevel:  0..9 (used in *http.client*)
+        """
+        self.logger = logging.getLogger(__name__ + '.Query')
+        self.target = target
+        self.__ownpool = pool is None
+        self.pool = pool or hcpsdk.ConnectionPool(target, size=size,
+                                                  timeout=timeout,
+                                                  debuglevel=debuglevel)
+
+    def operation(self, start=0, end=None, namespaces=None, directories=None,
+                  transactions=None, count=1000, parallel=1, verbose=True):
+        """
+        Run an operation based query, which finds objects by the time they
+        were created, changed, deleted, disposed, pruned or purged.
+
+        :param start:           first point in time to look at (a
+                                *datetime.datetime* object or milliseconds
+                                since the epoch)
+        :param end:             last point in time to look at (included), now
+                                if *None*
+        :param namespaces:      a list of namespaces
+                                (*namespace.tenant*) to query, all
+                                namespaces of the Tenant if *None*
+        :param directories:     a list of directories to limit the query to
+        :param transactions:    a list out of *T_ALL*, HCP's default if
+                                *None*
+        :param count:           the number of results per page
+        :param parallel:        the number of slices the time range is split
+                                into, to be queried in parallel
+        :param verbose:         return all metadata if True, a few, only, if
+                                False
+        :return:                a generator yielding a dict per result, in
+                                the order of their change time
+        :raises:                *QueryError*
+        """
+        start = _millis(start)
+        end = _millis(end if end is not None else datetime.now())
+        if end < start:
+            raise ValueError('end before start')
+        if transactions and not set(transactions) <= set(Query.T_ALL):
+            raise ValueError('transactions not in {}'.format(Query.T_ALL))
+
+        def _query(s, e):
+            sysmeta = {'changeTime': {'start': s, 'end': e}}
+            if namespaces:
+                sysmeta['namespaces'] = {'namespace': list(namespaces)}
+            if directories:
+                sysmeta['directories'] = {'directory': list(directories)}
+            if transactions:
+                sysmeta['transactions'] = {'transaction': list(transactions)}
+            request = {'count': count,
+                       'verbose': 'true' if verbose else 'false',
+                       'systemMetadata': sysmeta}
+            return self._operationpages(request)
+
+        return self._merge(_slices(start, end, parallel), _query)
+
+    def object(self, query, start=None, end=None, properties=None,
+               count=1000, parallel=1):
+        """
+        Run an object based query, which finds objects by their metadata,
+        using HCP's query language.
+
+        If *start* or *end* are given, the query is limited to objects with
+        a change time in that range, and the results are sorted by their
+        change time; the range can be split into slices queried in parallel
+        then.
+
+        :param query:       a query expression, i.e.
+                            *'+namespace:"ns.tenant" +size:[1000 TO *]'*
+        :param start:       first change time to look at (a
+                            *datetime.datetime* object or milliseconds since
+                            the epoch)
+        :param end:         last change time to look at (included)
+        :param properties:  a list of object properties to return, HCP's
+                            default if *None*
+        :param count:       the number of results per page
+        :param parallel:    the number of slices the time range is split into
+        :return:            a generator yielding a dict per result
+        :raises:            *QueryError*
+        """
+        def _query(s, e):
+            request = {'query': query, 'count': count}
+            if s is not None:
+                request['query'] = '+({}) +changeTimeMilliseconds:[{} TO {}]' \
+                                   .format(query, s, e)
+                request['sort'] = 'changeTimeMilliseconds+asc'
+            if properties:
+                request['objectProperties'] = ','.join(properties)
+            return self._objectpages(request)
+
+        if start is None and end is None:
+            return self._merge([(None, None)], _query)
+        start = _millis(start or 0)
+        end = _millis(end if end is not None else datetime.now())
+        if end < start:
+            raise ValueError('end before start')
+        return self._merge(_slices(start, end, parallel), _query)
+
+    def _operationpages(self, request):
+        """
+        Page through an operation based query, using the last result of a
+        page to request the next one.
+        """
+        while True:
+            result = self._post({'operation': request})
+            resultset = result.get('resultSet') or []
+            for r in resultset:
+                yield r
+            if result.get('status', {}).get('results') != 'INCOMPLETE' \
+                    or not resultset:
+                break
+            last = resultset[-1]
+            request['lastResult'] = {
+                'urlName': last.get('urlName'),
+                'changeTimeMilliseconds': last.get('changeTimeMilliseconds'),
+                'version': last.get('version')}
+
+    def _objectpages(self, request):
+        """
+        Page through an object based query, using offsets.
+        """
+        offset = 0
+        while True:
+            request['offset'] = offset
+            result = self._post({'object': request})
+            resultset = result.get('resultSet') or []
+            for r in resultset:
+                yield r
+            offset += len(resultset)
+            total = result.get('status', {}).get('totalResults')
+            if len(resultset) < request['count'] or \
+                    (total is not None and offset >= int(total)):
+                break
+
+    def _post(self, request):
+        """
+        Send a single query request.
+
+        :param request: the request, as a dict
+        :return:        the *queryResult* part of the response
+        :raises:        *QueryError*
+        """
+        body = json.dumps(request)
+        self.logger.debug('query: {}'.format(body))
+        with self.pool.connection() as con:
+            try:
+                con.POST('/query', body=body,
+                         headers={'Content-Type': 'application/json',
+                                  'Accept': 'application/json'})
+                data = con.read()
+            except Exception as e:
+                self.logger.debug('query failed: {}'.format(e))
+                raise QueryError(e)
+            if con.response_status != 200:
+                raise QueryError('{} - {} ({})'
+                                 .format(con.response_status,
+                                         con.response_reason,
+                                         con.getheader('X-HCP-ErrorMessage',
+                                                       default='?')))
+        try:
+            return json.loads(data.decode())['queryResult']
+        except (ValueError, KeyError) as e:
+            raise QueryError('invalid query result: {}'.format(e))
+
+    def _merge(self, slices, query):
+        """
+        Run *query(start, end)* for all *slices* in parallel, yielding the
+        results slice by slice, in order.
+
+        :param slices:  a list of (start, end) tuples
+        :param query:   a function returning a result generator for a slice
+        :return:        a generator
+        """
+        if len(slices) == 1:
+            for r in query(*slices[0]):
+                yield r
+            return
+
+        done = object()
+        cancel = Event()
+        lock = Lock()
+        queues = [queue.Queue(maxsize=10000) for _ in slices]
+        pending = list(enumerate(slices))  # slices not yet started
+        threads = []
+
+        def _start():
+            with lock:
+                if pending and not cancel.is_set():
+                    idx, (s, e) = pending.pop(0)
+                    t = Thread(target=_run, args=(idx, s, e), daemon=True)
+                    threads.append((idx, t))
+                    t.start()
+
+        def _run(idx, start, end):
+            try:
+                for r in query(start, end):
+                    if cancel.is_set():
+                        break
+                    queues[idx].put(r)
+            except Exception as e:
+                queues[idx].put(e)
+            finally:
+                queues[idx].put(done)
+                _start()
+
+        # never run more sub-queries in parallel than we have Connections
+        for _ in range(min(self.pool.size, len(slices))):
+            _start()
+        try:
+            for q in queues:
+                while True:
+                    item = q.get()
+                    if item is done:
+                        break
+                    elif isinstance(item, Exception):
+                        raise item
+                    yield item
+        finally:
+            cancel.set()
+            with lock:
+                running = list(threads)
+            for idx, t in running:
+                while t.is_alive():
+                    try:
+                        queues[idx].get(timeout=.1)
+                    except queue.Empty:
+                        pass
+
+    def close(self):
+        """
+        Close the private pool's *Connection()*\\ s (a pool handed in by the
+        caller is left untouched).
+        """
+        if self.__ownpool:
+            self.pool.close()
+
+
+ChangeEvent = namedtuple('ChangeEvent', ['event', 'url', 'changetime',
+                                         'version', 'namespace', 'result'])
+ChangeEvent.__doc__ = """
+A single event delivered by *ChangeFeed.events()*.
+
+    *   *event* - one of *ChangeFeed.E_CREATE*, *E_MODIFY*, *E_DELETE*
+    *   *url* - the objects url (*urlName*)
+    *   *changetime* - milliseconds since the epoch (float)
+    *   *version* - the objects version ID
+    *   *namespace* - *namespace.tenant*
+    *   *result* - the complete query result (a dict)
+"""
+
+
+class ChangeFeed(object):
+    """
+    An incremental feed of the changes within a Tenant's namespaces, based on
+    operation based queries.
+
+    The feed walks through windows of change time, from the oldest to the
+    newest, and keeps its position in a checkpoint file. Restarted with the
+    same checkpoint file, it resumes right after the last event committed.
+    The width of the windows adapts to the density of events.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    # event types
+    E_CREATE = 'create'
+    E_MODIFY = 'modify'
+    E_DELETE = 'delete'
+
+    # HCP operations signaling a deleted object
+    _DELETEOPS = ['DELETED', 'DISPOSED', 'PRUNED', 'PURGED']
+
+    def __init__(self, target, checkpoint, namespaces=None, directories=None,
+                 start=0, window=3600000, minwindow=60000,
+                 maxwindow=86400000, density=10000, lag=120000, count=1000,
+                 commitevery=1000, pool=None, timeout=120, debuglevel=0):
+        """
+        :param target:      an hcpsdk.Target object pointing to a Tenant FQDN
+        :param checkpoint:  the path of the local checkpoint file; created if
+                            it doesn't exist
+        :param namespaces:  a list of namespaces (*namespace.tenant*) to
+                            watch, all if *None*
+        :param directories: a list of directories to limit the feed to
+        :param start:       where to start (a *datetime.datetime* object or
+                            milliseconds since the epoch) if there is no
+                            checkpoint, yet
+        :param window:      the initial width of a window (milliseconds)
+        :param minwindow:   the minimal width of a window (milliseconds)
+        :param maxwindow:   the maximal width of a window (milliseconds)
+        :param density:     the number of events per window aimed for; the
+                            window width gets halved if there were more
+                            events, and doubled if there were less than a
+                            quarter of that
+        :param lag:         the distance to keep from now (milliseconds), to
+                            make sure HCP has recorded all operations within
+                            a window
+        :param count:       the number of results per query page
+        :param commitevery: write the checkpoint after this number of events
+                            has been processed (1 for an exact resume
+                            after a crash, at the cost of a write per event)
+        :param pool:        an **hcpsdk.ConnectionPool** object to use
+        :param timeout:     the connection timeout in seconds
+        :param debuglevel:  0..9 (used in *http.client*)
+        """
+        self.logger = logging.getLogger(__name__ + '.ChangeFeed')
+        if not minwindow <= window <= maxwindow:
+            raise ValueError('window not within minwindow and maxwindow')
+        self.query = Query(target, pool=pool, size=1, timeout=timeout,
+                           debuglevel=debuglevel)
+        self.checkpoint = checkpoint
+        self.namespaces = namespaces
+        self.directories = directories
+        self.minwindow = minwindow
+        self.maxwindow = maxwindow
+        self.density = density
+        self.lag = lag
+        self.count = count
+        self.commitevery = commitevery
+
+        # the position: start of the actual window, the last result
+        # processed within it and the actual window width
+        self._state = {'start': _millis(start), 'lastResult': None,
+                       'window': window}
+        if os.path.exists(self.checkpoint):
+            with open(self.checkpoint, 'r') as hdl:
+                self._state.update(json.load(hdl))
+            self.logger.debug('resuming from checkpoint {}: {}'
+                              .format(self.checkpoint, self._state))
+        self.__uncommitted = 0
+
+    def events(self, until=None, follow=False, interval=60):
+        """
+        Deliver the events, in the order of their change time.
+
+        An event counts as processed when the next one is requested from the
+        generator (or when *commit()* is called).
+
+        :param until:       stop at this point in time (a
+                            *datetime.datetime* object or milliseconds since
+                            the epoch), now if *None*
+        :param follow:      if True, don't stop when all events up to now have
+                            been delivered, but wait for new ones
+        :param interval:    seconds to wait between polls when following
+        :return:            a generator yielding *ChangeEvent*\\ s
+        :raises:            *QueryError*
+        """
+        until = _millis(until) if until is not None else None
+        while True:
+            last = _millis(datetime.now()) - self.lag
+            if until is not None:
+                last = min(last, until)
+            start = self._state['start']
+            if start > last:
+                self.commit()
+                if not follow or until is not None:
+                    break
+                time.sleep(interval)
+                continue
+
+            end = min(start + self._state['window'] - 1, last)
+            request = {'count': self.count, 'verbose': 'true',
+                       'systemMetadata': self._sysmeta(start, end)}
+            if self._state['lastResult']:
+                request['lastResult'] = self._state['lastResult']
+            num = 0
+            for r in self.query._operationpages(request):
+                yield self._event(r)
+                # the consumer asked for the next one, so this one is done
+                self._state['lastResult'] = {
+                    'urlName': r.get('urlName'),
+                    'changeTimeMilliseconds': r.get('changeTimeMilliseconds'),
+                    'version': r.get('version')}
+                num += 1
+                self.__uncommitted += 1
+                if self.__uncommitted >= self.commitevery:
+                    self.commit()
+
+            self.logger.debug('window {} - {}: {} events'
+                              .format(start, end, num))
+            self._state['start'] = end + 1
+            self._state['lastResult'] = None
+            # only full windows are a measure for the density
+            if end == start + self._state['window'] - 1:
+                if num > self.density:
+                    self._state['window'] = max(self.minwindow,
+                                                self._state['window'] // 2)
+                elif num < self.density // 4:
+                    self._state['window'] = min(self.maxwindow,
+                                                self._state['window'] * 2)
+            self.commit()
+
+    def _sysmeta(self, start, end):
+        sysmeta = {'changeTime': {'start': start, 'end': end},
+                   'transactions': {'transaction': Query.T_ALL}}
+        if self.namespaces:
+            sysmeta['namespaces'] = {'namespace': list(self.namespaces)}
+        if self.directories:
+            sysmeta['directories'] = {'directory': list(self.directories)}
+        return sysmeta
+
+    def _event(self, r):
+        """
+        Build a *ChangeEvent* from a query result.
+        """
+        op = r.get('operation', '')
+        changetime = float(r.get('changeTimeMilliseconds', 0))
+        if op in ChangeFeed._DELETEOPS:
+            event = ChangeFeed.E_DELETE
+        else:
+            # HCP reports metadata changes as CREATED, too - they are younger
+            # than the object's ingest time
+            ingest = r.get('ingestTime')
+            if op == 'CREATED' and (ingest is None or
+                                    changetime < (int(ingest) + 1) * 1000):
+                event = ChangeFeed.E_CREATE
+            else:
+                event = ChangeFeed.E_MODIFY
+        return ChangeEvent(event=event, url=r.get('urlName'),
+                           changetime=changetime, version=r.get('version'),
+                           namespace=r.get('namespace'), result=r)
+
+    def commit(self):
+        """
+        Write the actual position to the checkpoint file (atomically).
+        """
+        tmp = self.checkpoint + '.tmp'
+        with open(tmp, 'w') as hdl:
+            json.dump(self._state, hdl)
+            hdl.flush()
+            os.fsync(hdl.fileno())
+        os.replace(tmp, self.checkpoint)
+        self.__uncommitted = 0
+
+    def close(self):
+        """
+        Commit the actual position and close the underlying
+        *Connection()*\\ s.
+        """
+        self.commit()
+        self.query.close()
@@ -22,10 +22,15 @@
 
 import hcpsdk
 import xml.etree.ElementTree as Et
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock, Thread
+from copy import deepcopy
+import queue
+import time
 import logging
 
-__all__ = ['Info']
+__all__ = ['Info', 'Sampler', 'DirEntry', 'Listing']
 
 logging.getLogger('hcpsdk.namespace').addHandler(logging.NullHandler())
 
@@ -33,19 +38,37 @@ logging.getLogger('hcpsdk.namespace').addHandler(logging.NullHandler())
 class Info(object):
     """
     Class to access namespaces metadata information.
+
+    All requests are served through a *ConnectionPool*, so the session to HCP
+    is re-used between calls. If *ttl* is set, results are cached for that
+    number of seconds.
     """
 
-    def __init__(self, target, debuglevel=0):
+    def __init__(self, target, debuglevel=0, ttl=0, pool=None, size=4):
         """
         :param target:      an **hcpsdk.Target** object
         :param debuglevel:  0..9 (propagated to *http.client*)
+        :param ttl:         the number of seconds results are cached;
+                            0 disables caching
+        :param pool:        an **hcpsdk.ConnectionPool** object to use; if
+                            *None*, a private pool is created
+        :param size:        the size of the private pool (used by
+                            *refresh()*)
 
+        ..  versionchanged:: 0.9.5.0
+            added *ttl*, *pool* and *size*
         """
         self.logger = logging.getLogger(__name__ + '.Info')
         self.target = target
         self.debuglevel = debuglevel
         self.connect_time = 0.0
         self.service_time = 0.0
+        self.ttl = ttl
+        self.__ownpool = pool is None
+        self.pool = pool or hcpsdk.ConnectionPool(target, size=size,
+                                                  debuglevel=debuglevel)
+        self.__cache = {}  # key: (expiry time, result)
+        self.__lock = Lock()
 
     def nsstatistics(self):
         """
@@ -54,40 +77,7 @@ class Info(object):
         :return:  a dict holding the stats
         :raises: hcpsdk.HcpsdkError()
         """
-        # noinspection PyUnusedLocal
-        d = None
-        try:
-            con = hcpsdk.Connection(self.target, debuglevel=self.debuglevel)
-        except Exception as e:
-            raise hcpsdk.HcpsdkError(str(e))
-        else:
-            self.connect_time = con.connect_time
-            try:
-                r = con.GET('/proc/statistics')
-            except Exception as e:
-                raise hcpsdk.HcpsdkError(str(e))
-            else:
-                if r.status == 200:
-                    # Good status, get and parse the Response
-                    x = r.read()
-                    self.service_time = con.service_time2
-                    root = Et.fromstring(x)
-                    d = root.attrib
-                    tobedel = None
-                    for i in d.keys():
-                        if i.startswith('{http'):
-                            tobedel = i
-                        else:
-                            d[i] = self._castvar(d[i])
-                    if tobedel:
-                        del d[tobedel]
-                else:
-                    raise (hcpsdk.HcpsdkError('{} - {}'.format(r.status, r.reason)))
-        finally:
-            # noinspection PyUnboundLocalVariable
-            con.close()
-
-        return d
+        return self._cached(('nsstatistics',), self._nsstatistics)
 
     # noinspection PyShadowingBuiltins
     def listaccessiblens(self, all=False):
@@ -98,46 +88,8 @@ class Info(object):
                         actual one, only.
         :return:        a dict holding a dict per namespace
         """
-
-        # setup Target URL and apply parameters
-        url = '/proc'
-        if not all:
-            params = {'single': 'true'}
-        else:
-            params = None
-
-        try:
-            con = hcpsdk.Connection(self.target, debuglevel=self.debuglevel)
-        except Exception as e:
-            raise hcpsdk.HcpsdkError(str(e))
-        else:
-            self.connect_time = con.connect_time
-
-            try:
-                r = con.GET(url, params=params)
-            except Exception as e:
-                raise hcpsdk.HcpsdkError(str(e))
-            else:
-                if r.status == 200:
-                    # Good status, get and parse the Response
-                    x = r.read()
-                    self.service_time = con.service_time2
-                    root = Et.fromstring(x)
-                    d = OrderedDict()
-                    for n in root:
-                        d[n.attrib.get('name')] = n.attrib
-                        for i in d[n.attrib.get('name')].keys():
-                            d[n.attrib.get('name')][i] = \
-                                self._castvar(d[n.attrib.get('name')][i])
-                        for n1 in n:
-                            d[n.attrib['name']]['description'] = n1.text.strip().split('°')
-                else:
-                    raise (hcpsdk.HcpsdkError('{} - {}'.format(r.status, r.reason)))
-        finally:
-            # noinspection PyUnboundLocalVariable
-            con.close()
-
-        return d
+        return self._cached(('listaccessiblens', bool(all)),
+                            lambda con: self._listaccessiblens(con, all))
 
     def listretentionclasses(self):
         """
@@ -145,34 +97,8 @@ class Info(object):
 
         :return: a dict holding a dict per Retention Class
         """
-        try:
-            con = hcpsdk.Connection(self.target, debuglevel=self.debuglevel)
-        except Exception as e:
-            raise hcpsdk.HcpsdkError(str(e))
-        else:
-            self.connect_time = con.connect_time
-
-            r = con.GET('/proc/retentionClasses')
-            if r.status == 200:
-                # Good status, get and parse the Response
-                x = r.read()
-                self.service_time = con.service_time2
-                root = Et.fromstring(x)
-                d = OrderedDict()
-                for n in root:
-                    d[n.attrib.get('name')] = n.attrib
-                    for i in d[n.attrib.get('name')].keys():
-                        d[n.attrib.get('name')][i] = \
-                            self._castvar(d[n.attrib.get('name')][i])
-                    for n1 in n:
-                        d[n.attrib.get('name')]['description'] = n1.text.strip()
-            else:
-                raise (hcpsdk.HcpsdkError('{} - {}'.format(r.status, r.reason)))
-        finally:
-            # noinspection PyUnboundLocalVariable
-            con.close()
-
-        return d
+        return self._cached(('listretentionclasses',),
+                            self._listretentionclasses)
 
     def listpermissions(self):
         """
@@ -180,30 +106,146 @@ class Info(object):
 
         :return: a dict holding a dict per permission domain
         """
+        return self._cached(('listpermissions',), self._listpermissions)
+
+    def refresh(self):
+        """
+        Fetch the results of all the methods above concurrently (and cache
+        them, if *ttl* is set).
+
+        :return:    a dict holding the results, keyed by the method names
+                    (*listaccessiblens* with *all=True*)
+        :raises:    hcpsdk.HcpsdkError()
+
+        ..  versionadded:: 0.9.5.0
+        """
+        jobs = [(('nsstatistics',), self._nsstatistics),
+                (('listaccessiblens', True),
+                 lambda con: self._listaccessiblens(con, True)),
+                (('listretentionclasses',), self._listretentionclasses),
+                (('listpermissions',), self._listpermissions)]
+        results = self.pool.map(lambda con, job: (job[0], job[1](con)), jobs)
+        if self.ttl:
+            with self.__lock:
+                for key, result in results:
+                    self.__cache[key] = (time.time() + self.ttl, result)
+        return {key[0]: deepcopy(result) for key, result in results}
+
+    def invalidate(self, *names):
+        """
+        Drop cached results.
+
+        :param names:   the names of the methods whose results shall be
+                        dropped (i.e. *'nsstatistics'*); all if none given
+
+        ..  versionadded:: 0.9.5.0
+        """
+        with self.__lock:
+            for key in list(self.__cache.keys()):
+                if not names or key[0] in names:
+                    del self.__cache[key]
+
+    def close(self):
+        """
+        Close the private pool's *Connection()*\\ s (a pool handed in by the
+        caller is left untouched).
+
+        ..  versionadded:: 0.9.5.0
+        """
+        if self.__ownpool:
+            self.pool.close()
+
+    def _cached(self, key, fetch):
+        """
+        Return a cached result, if there is a valid one, or get it from HCP.
+
+        :param key:     the cache key
+        :param fetch:   a function taking a *Connection()*, returning the
+                        result
+        :return:        a copy of the result
+        """
+        if self.ttl:
+            with self.__lock:
+                expiry, result = self.__cache.get(key, (0, None))
+            if expiry > time.time():
+                return deepcopy(result)
+        with self.pool.connection() as con:
+            result = fetch(con)
+        if self.ttl:
+            with self.__lock:
+                self.__cache[key] = (time.time() + self.ttl, result)
+            result = deepcopy(result)
+        return result
+
+    def _get(self, con, url, params=None):
+        """
+        GET *url* and parse the XML received.
+
+        :return:    the root element of the parsed XML
+        :raises:    hcpsdk.HcpsdkError()
+        """
         try:
-            con = hcpsdk.Connection(self.target, debuglevel=self.debuglevel)
+            r = con.GET(url, params=params)
+            x = r.read()
         except Exception as e:
             raise hcpsdk.HcpsdkError(str(e))
+        self.connect_time = con.connect_time
+        if r.status == 200:
+            self.service_time = con.service_time2
+            return Et.fromstring(x)
         else:
-            self.connect_time = con.connect_time
-
-            r = con.GET('/proc/permissions')
-            if r.status == 200:
-                # Good status, get and parse the Response
-                x = r.read()
-                self.service_time = con.service_time2
-                root = Et.fromstring(x)
-                d = OrderedDict()
-                for n in root:
-                    d[n.tag] = n.attrib
-                    for i in d[n.tag].keys():
-                        d[n.tag][i] = self._castvar(d[n.tag][i])
+            raise (hcpsdk.HcpsdkError('{} - {}'.format(r.status, r.reason)))
+
+    def _nsstatistics(self, con):
+        root = self._get(con, '/proc/statistics')
+        d = root.attrib
+        tobedel = None
+        for i in d.keys():
+            if i.startswith('{http'):
+                tobedel = i
             else:
-                raise (hcpsdk.HcpsdkError('{} - {}'.format(r.status, r.reason)))
-        finally:
-            # noinspection PyUnboundLocalVariable
-            con.close()
+                d[i] = self._castvar(d[i])
+        if tobedel:
+            del d[tobedel]
+        return d
+
+    # noinspection PyShadowingBuiltins
+    def _listaccessiblens(self, con, all=False):
+        # setup Target URL and apply parameters
+        if not all:
+            params = {'single': 'true'}
+        else:
+            params = None
+        root = self._get(con, '/proc', params=params)
+        d = OrderedDict()
+        for n in root:
+            d[n.attrib.get('name')] = n.attrib
+            for i in d[n.attrib.get('name')].keys():
+                d[n.attrib.get('name')][i] = \
+                    self._castvar(d[n.attrib.get('name')][i])
+            for n1 in n:
+                d[n.attrib['name']]['description'] = n1.text.strip().split('°')
+        return d
+
+    def _listretentionclasses(self, con):
+        root = self._get(con, '/proc/retentionClasses')
+        d = OrderedDict()
+        for n in root:
+            d[n.attrib.get('name')] = n.attrib
+            for i in d[n.attrib.get('name')].keys():
+                d[n.attrib.get('name')][i] = \
+                    self._castvar(d[n.attrib.get('name')][i])
+            for n1 in n:
+                d[n.attrib.get('name')]['description'] = n1.text.strip()
+        return d
 
+    def _listpermissions(self, con):
+        root = self._get(con, '/proc/permissions')
+        d = OrderedDict()
+        for n in root:
+            d[n.tag] = n.attrib
+            for i in d[n.tag].keys():
+                d[n.tag][i] = self._castvar(d[n.tag][i])
         return d
 
     # noinspection PyMethodMayBeStatic
@@ -222,3 +264,336 @@ class Info(object):
                 return int(var)
             except ValueError:
                 return var
+
+
+class Sampler(object):
+    """
+    Polls the statistics of many namespaces concurrently, on a schedule, and
+    keeps the samples in a *hcpsdk.timeseries.Series* per namespace, which
+    allows to calculate per-interval deltas and rates.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    # the fields sampled from *Info.nsstatistics()*
+    FIELDS = ('objectCount', 'usedCapacityBytes',
+              'customMetadataObjectCount', 'customMetadataObjectBytes',
+              'shredObjectCount', 'shredObjectBytes')
+
+    def __init__(self, targets, interval=60, history=1440, workers=16,
+                 debuglevel=0):
+        """
+        :param targets:     a list of **hcpsdk.Target** objects, one per
+                            namespace
+        :param interval:    the time between two samples (seconds)
+        :param history:     the number of samples kept per namespace
+        :param workers:     the max. number of namespaces polled in parallel
+        :param debuglevel:  0..9 (propagated to *http.client*)
+        """
+        self.logger = logging.getLogger(__name__ + '.Sampler')
+        self.interval = interval
+        self.workers = workers
+        self.__infos = OrderedDict()
+        self.__series = OrderedDict()
+        self.errors = {}  # fqdn: the exception raised by the last poll
+        for t in targets:
+            self.__infos[t.fqdn] = Info(t, debuglevel=debuglevel,
+                                        pool=hcpsdk.ConnectionPool(
+                                            t, size=1, debuglevel=debuglevel))
+            self.__series[t.fqdn] = hcpsdk.timeseries.Series(
+                Sampler.FIELDS, size=history)
+        self.__stop = Event()
+        self.__thread = None
+
+    def sample(self):
+        """
+        Poll all namespaces once.
+
+        :return:    a dict holding the number of namespaces polled
+                    successfully (*'ok'*) and failed (*'failed'*)
+        """
+        def _poll(fqdn):
+            try:
+                stats = self.__infos[fqdn].nsstatistics()
+                # raises KeyError or TypeError for an incomplete or
+                # non-numeric payload
+                self.__series[fqdn].append(time.time(), stats)
+            except Exception as e:
+                self.logger.debug('polling {} failed: {}'.format(fqdn, e))
+                self.errors[fqdn] = e
+                return False
+            self.errors.pop(fqdn, None)
+            return True
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(_poll, self.__infos.keys()))
+        return {'ok': results.count(True), 'failed': results.count(False)}
+
+    def start(self):
+        """
+        Start polling every *interval* seconds, in a background thread.
+        """
+        if self.__thread and self.__thread.is_alive():
+            return
+        self.__stop.clear()
+        self.__thread = Thread(target=self.__run, name='hcpsdk.Sampler',
+                               daemon=True)
+        self.__thread.start()
+
+    def __run(self):
+        hcpsdk.timeseries.every(self.interval, self.sample, self.__stop,
+                                self.logger)
+
+    def stop(self):
+        """
+        Stop polling.
+        """
+        self.__stop.set()
+        if self.__thread:
+            self.__thread.join()
+            self.__thread = None
+
+    def series(self, fqdn):
+        """
+        Get the samples of a namespace.
+
+        :param fqdn:    the namespace's FQDN
+        :return:        a *hcpsdk.timeseries.Series* object, its fields are
+                        *FIELDS*
+        """
+        return self.__series[fqdn]
+
+    def rates(self, fqdn):
+        """
+        Get the ingest rates of a namespace.
+
+        :param fqdn:    the namespace's FQDN
+        :return:        a list of *(timestamp, objects/s, bytes/s)* tuples,
+                        one per interval
+        """
+        return [(t, r[0], r[1]) for t, r in self.__series[fqdn].rates()]
+
+    def latest(self):
+        """
+        Get the ingest rates of the last interval for all namespaces.
+
+        :return:    a dict holding an *(timestamp, objects/s, bytes/s)* tuple
+                    per namespace FQDN (*None* if there are less than two
+                    samples available)
+        """
+        d = OrderedDict()
+        for fqdn in self.__series:
+            rates = self.__series[fqdn].rates()
+            d[fqdn] = (rates[-1][0], rates[-1][1][0], rates[-1][1][1]) \
+                if rates else None
+        return d
+
+    def close(self):
+        """
+        Stop polling and close all *Connection()*\\ s.
+        """
+        self.stop()
+        for info in self.__infos.values():
+            info.pool.close()
+
+
+DirEntry = namedtuple('DirEntry', ['path', 'name', 'type', 'size',
+                                   'hashscheme', 'hash', 'changetime',
+                                   'state', 'version'])
+DirEntry.__doc__ = """
+A single entry of a directory listing.
+
+    *   *path* - the full (url-encoded) path of the entry, usable as url
+    *   *name* - the (utf-8) name of the entry
+    *   *type* - 'object', 'directory' or 'symlink'
+    *   *size* - the size in bytes (objects, only)
+    *   *hashscheme*, *hash* - the objects hash
+    *   *changetime* - milliseconds since the epoch (float)
+    *   *state* - 'created' or 'deleted'
+    *   *version* - the version ID (objects, only)
+
+Attributes not available for the type of entry are *None*.
+"""
+
+
+class Listing(object):
+    """
+    Class to list the content of a namespace's directories.
+
+    Listings are parsed incrementally while they are read from HCP, so the
+    memory needed doesn't depend on the number of entries in a directory.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    # the state of a walk's workers, signaled through the output queue
+    __DONE = object()
+
+    def __init__(self, target, pool=None, size=4, timeout=60,
+                 chunksize=2**16, debuglevel=0):
+        """
+        :param target:      an **hcpsdk.Target** object
+        :param pool:        an **hcpsdk.ConnectionPool** object to use; if
+                            *None*, a private pool is created
+        :param size:        the size of the private pool, which is the number
+                            of directories listed in parallel by *walk()*
+        :param timeout:     the connection timeout in seconds
+        :param chunksize:   the number of bytes read from HCP per call
+        :param debuglevel:  0..9 (propagated to *http.client*)
+        """
+        self.logger = logging.getLogger(__name__ + '.Listing')
+        self.target = target
+        self.chunksize = chunksize
+        self.__ownpool = pool is None
+        self.pool = pool or hcpsdk.ConnectionPool(target, size=size,
+                                                  timeout=timeout,
+                                                  debuglevel=debuglevel)
+
+    def listdir(self, path, deleted=False):
+        """
+        List a single directory.
+
+        :param path:    the directory to list (i.e. */rest/dir*)
+        :param deleted: include deleted objects and directories if True
+                        (requires versioning being enabled for the namespace)
+        :return:        a generator yielding a *DirEntry* per entry, as soon
+                        as it has been received
+        :raises:        hcpsdk.HcpsdkError()
+        """
+        with self.pool.connection() as con:
+            for entry in self._iterdir(con, path, deleted):
+                yield entry
+
+    def walk(self, path, deleted=False):
+        """
+        List a directory and all of its sub-directories. Sub-directories are
+        listed in parallel, using up to *size* *Connection()*\\ s out of the
+        pool.
+
+        :param path:    the directory to start at
+        :param deleted: include deleted objects and directories if True
+        :return:        a generator yielding a *DirEntry* per entry (the
+                        order in which directories are listed isn't
+                        predictable)
+        :raises:        hcpsdk.HcpsdkError()
+        """
+        out = queue.Queue(maxsize=self.pool.size * 1024)
+        cancel = Event()
+        lock = Lock()
+        pending = [0]  # number of directory listings submitted, not done
+        executor = ThreadPoolExecutor(max_workers=self.pool.size)
+
+        def _submit(dirpath):
+            with lock:
+                pending[0] += 1
+            executor.submit(_list, dirpath)
+
+        def _list(dirpath):
+            try:
+                with self.pool.connection() as con:
+                    for entry in self._iterdir(con, dirpath, deleted):
+                        if cancel.is_set():
+                            break
+                        if entry.type == 'directory':
+                            _submit(entry.path)
+                        out.put(entry)
+            except Exception as e:
+                out.put(e)
+            finally:
+                out.put(Listing.__DONE)
+
+        _submit(path)
+        try:
+            while pending[0]:
+                item = out.get()
+                if item is Listing.__DONE:
+                    with lock:
+                        pending[0] -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            # make sure the workers come to an end, even if the consumer
+            # stopped early
+            cancel.set()
+            while pending[0]:
+                if out.get() is Listing.__DONE:
+                    with lock:
+                        pending[0] -= 1
+            executor.shutdown(wait=True)
+
+    def _iterdir(self, con, path, deleted=False):
+        """
+        Request the listing of a directory and parse it while it is read.
+
+        :param con:     the *Connection()* to use
+        :param path:    the directory to list
+        :param deleted: include deleted entries
+        :return:        a generator yielding *DirEntry*\\ s
+        """
+        try:
+            r = con.GET(path, params={'deleted': 'true'} if deleted else None)
+        except Exception as e:
+            raise hcpsdk.HcpsdkError(str(e))
+        if r.status != 200:
+            con.read()
+            raise hcpsdk.HcpsdkError('{} - {}'.format(r.status, r.reason))
+        if con.getheader('X-HCP-Type', 'directory') != 'directory':
+            con.read()
+            raise hcpsdk.HcpsdkError('not a directory: {}'.format(path))
+
+        base = path.rstrip('/')
+        parser = Et.XMLPullParser(events=('start', 'end'))
+        root = None
+        finished = False
+        try:
+            while not finished:
+                buf = con.read(self.chunksize)
+                if buf:
+                    parser.feed(buf)
+                else:
+                    parser.close()
+                    finished = True
+                for event, elem in parser.read_events():
+                    if event == 'start':
+                        if root is None:
+                            root = elem
+                    elif elem.tag == 'entry':
+                        yield self._direntry(base, elem.attrib)
+                        # drop what we have seen to keep memory usage flat
+                        root.clear()
+        except Et.ParseError as e:
+            raise hcpsdk.HcpsdkError('invalid listing for {}: {}'
+                                     .format(path, e))
+        finally:
+            if not finished:
+                # the Response is unread, so the session is unusable
+                con.close()
+        self.logger.debug('listed {}'.format(path))
+
+    # noinspection PyMethodMayBeStatic
+    def _direntry(self, base, attrib):
+        """
+        Build a *DirEntry* from the attributes of an *entry* element.
+        """
+        size = attrib.get('size')
+        changetime = attrib.get('changeTimeMilliseconds')
+        version = attrib.get('version')
+        return DirEntry(path='{}/{}'.format(base, attrib.get('urlName')),
+                        name=attrib.get('utf8Name', attrib.get('urlName')),
+                        type=attrib.get('type'),
+                        size=int(size) if size else None,
+                        hashscheme=attrib.get('hashScheme'),
+                        hash=attrib.get('hash'),
+                        changetime=float(changetime) if changetime else None,
+                        state=attrib.get('state'),
+                        version=int(version) if version else None)
+
+    def close(self):
+        """
+        Close the private pool's *Connection()*\\ s (a pool handed in by the
+        caller is left untouched).
+        """
+        if self.__ownpool:
+            self.pool.close()
@@ -0,0 +1,1041 @@
+# -*- coding: utf-8 -*-
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2016 Thorsten Simons (sw@snomis.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import hcpsdk
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from threading import Condition, Event, Lock, Thread
+import json
+import os
+import queue
+import sqlite3
+import time
+import uuid
+import logging
+
+__all__ = ['VerifierError', 'Difference', 'Checkpoint', 'Verifier',
+           'mergejoin', 'LagProbe', 'QuorumError', 'QuorumResult',
+           'QuorumWriter']
+
+logging.getLogger('hcpsdk.replica').addHandler(logging.NullHandler())
+
+
+class VerifierError(Exception):
+    """
+    Raised by *Verifier()* if it can't be used as requested, and by
+    *mergejoin()* if a listing isn't sorted.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    def __init__(self, reason):
+        """
+        :param reason:  an error description
+        """
+        self.args = (reason,)
+
+
+class QuorumError(Exception):
+    """
+    Raised by *QuorumWriter.put()* if the quorum can't be reached.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    def __init__(self, reason, result=None):
+        """
+        :param reason:  an error description
+        :param result:  the *QuorumResult* as of the time of the failure
+        """
+        self.args = (reason,)
+        self.result = result
+
+
+Difference = namedtuple('Difference', ['kind', 'path', 'primary', 'replica'])
+Difference.__doc__ = """
+A difference found between primary and replica
+
+..  versionadded:: 0.9.5.0
+"""
+Difference.kind.__doc__ = "*'missing'* (on the replica), *'extra'* (found " \
+                          "on the replica, only) or *'mismatch'* (type, " \
+                          "size or hash differ)"
+Difference.path.__doc__ = 'the path of the entry (i.e. */rest/dir/object*)'
+Difference.primary.__doc__ = "the primary's *hcpsdk.namespace.DirEntry*, " \
+                             "*None* if missing"
+Difference.replica.__doc__ = "the replica's *hcpsdk.namespace.DirEntry*, " \
+                             "*None* if missing"
+
+
+def mergejoin(primary, replica):
+    """
+    Join two directory listings sorted by name, in constant memory.
+
+    :param primary:     an iterable of *hcpsdk.namespace.DirEntry*\\ s,
+                        sorted by *name*
+    :param replica:     the same for the replica
+    :return:            a generator yielding *(primary entry, replica
+                        entry)* tuples, one of them *None* if the entry is
+                        missing on that side
+    :raises:            *VerifierError* if a listing isn't sorted
+
+    ..  versionadded:: 0.9.5.0
+    """
+    def _checked(entries, side):
+        last = None
+        for entry in entries:
+            if last is not None and entry.name <= last:
+                raise VerifierError('{} listing not sorted at {}'
+                                    .format(side, entry.path))
+            last = entry.name
+            yield entry
+
+    primary = _checked(primary, 'primary')
+    replica = _checked(replica, 'replica')
+    p = next(primary, None)
+    r = next(replica, None)
+    while p or r:
+        if r is None or (p is not None and p.name < r.name):
+            yield p, None
+            p = next(primary, None)
+        elif p is None or r.name < p.name:
+            yield None, r
+            r = next(replica, None)
+        else:
+            yield p, r
+            p = next(primary, None)
+            r = next(replica, None)
+
+
+def _compare(p, r):
+    """
+    Find the kind of difference between two entries (*None* if equal).
+    """
+    if r is None:
+        return 'missing'
+    if p is None:
+        return 'extra'
+    if p.type != r.type or p.size != r.size:
+        return 'mismatch'
+    if p.hash and r.hash and p.hashscheme == r.hashscheme and \
+            p.hash != r.hash:
+        return 'mismatch'
+    return None
+
+
+class Checkpoint(object):
+    """
+    The state of a verification, kept in a SQLite database: the partitions
+    (directories) found, which of them have been compared already, and the
+    differences found in them. A verification that has been interrupted
+    continues with the partitions not yet done, when *Verifier.verify()* is
+    called again with the same *Checkpoint*.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    # partition states
+    PENDING = 0
+    RUNNING = 1
+    DONE = 2
+    FAILED = 3
+
+    def __init__(self, path=':memory:'):
+        """
+        :param path:    the database file (created if it doesn't exist);
+                        the default keeps the state in memory, only
+        """
+        self.logger = logging.getLogger(__name__ + '.Checkpoint')
+        self.path = path
+        self.__lock = Lock()
+        self.__db = sqlite3.connect(path, check_same_thread=False)
+        with self.__db:
+            if path != ':memory:':
+                self.__db.execute('PRAGMA journal_mode=WAL')
+                self.__db.execute('PRAGMA synchronous=NORMAL')
+            self.__db.execute(
+                'CREATE TABLE IF NOT EXISTS partitions ('
+                'path TEXT PRIMARY KEY, state INTEGER NOT NULL, '
+                'objects INTEGER NOT NULL DEFAULT 0)')
+            self.__db.execute('CREATE INDEX IF NOT EXISTS partitions_state '
+                              'ON partitions (state)')
+            self.__db.execute(
+                'CREATE TABLE IF NOT EXISTS differences ('
+                'partition TEXT NOT NULL, kind TEXT NOT NULL, '
+                'path TEXT NOT NULL, primaryentry TEXT, replicaentry TEXT)')
+            self.__db.execute('CREATE INDEX IF NOT EXISTS '
+                              'differences_partition '
+                              'ON differences (partition)')
+
+    def seed(self, path):
+        """
+        Prepare for a (resumed) verification: partitions that were running
+        or failed are set pending again; *path* becomes the first partition
+        if there are none, yet.
+
+        :param path:    the directory to start at
+        """
+        with self.__lock, self.__db:
+            self.__db.execute('UPDATE partitions SET state = ? '
+                              'WHERE state IN (?, ?)',
+                              (Checkpoint.PENDING, Checkpoint.RUNNING,
+                               Checkpoint.FAILED))
+            if not self.__db.execute('SELECT COUNT(*) FROM partitions'
+                                     ).fetchone()[0]:
+                self.__db.execute('INSERT INTO partitions (path, state) '
+                                  'VALUES (?, ?)', (path, Checkpoint.PENDING))
+
+    def claim(self):
+        """
+        Get a pending partition and mark it running.
+
+        :return:    the partition's path, *None* if none is pending
+        """
+        with self.__lock, self.__db:
+            row = self.__db.execute('SELECT path FROM partitions '
+                                    'WHERE state = ? LIMIT 1',
+                                    (Checkpoint.PENDING,)).fetchone()
+            if not row:
+                return None
+            self.__db.execute('UPDATE partitions SET state = ? '
+                              'WHERE path = ?', (Checkpoint.RUNNING, row[0]))
+            return row[0]
+
+    def done(self, partition, subdirs, differences, objects):
+        """
+        Record a partition as done, in a single transaction.
+
+        :param partition:   the partition's path
+        :param subdirs:     the paths of the sub-directories found on both
+                            sides, which become new partitions
+        :param differences: a list of *Difference*\\ s found
+        :param objects:     the number of objects compared
+        """
+        with self.__lock, self.__db:
+            self.__db.execute('DELETE FROM differences WHERE partition = ?',
+                              (partition,))
+            self.__db.executemany(
+                'INSERT INTO differences VALUES (?, ?, ?, ?, ?)',
+                [(partition, d.kind, d.path,
+                  json.dumps(d.primary) if d.primary else None,
+                  json.dumps(d.replica) if d.replica else None)
+                 for d in differences])
+            self.__db.executemany(
+                'INSERT OR IGNORE INTO partitions (path, state) '
+                'VALUES (?, ?)', [(s, Checkpoint.PENDING) for s in subdirs])
+            self.__db.execute('UPDATE partitions SET state = ?, objects = ? '
+                              'WHERE path = ?',
+                              (Checkpoint.DONE, objects, partition))
+
+    def fail(self, partition):
+        """
+        Record a partition as failed; it will be retried when the
+        verification is resumed.
+
+        :param partition:   the partition's path
+        """
+        with self.__lock, self.__db:
+            self.__db.execute('UPDATE partitions SET state = ? '
+                              'WHERE path = ?', (Checkpoint.FAILED, partition))
+
+    def differences(self, kind=None):
+        """
+        Get the differences recorded.
+
+        :param kind:    the kind of differences to get (all if *None*)
+        :return:        a generator yielding *Difference*\\ s
+        """
+        with self.__lock:
+            rows = self.__db.execute(
+                'SELECT kind, path, primaryentry, replicaentry '
+                'FROM differences{} ORDER BY path'
+                .format(' WHERE kind = ?' if kind else ''),
+                (kind,) if kind else ()).fetchall()
+        for k, path, p, r in rows:
+            yield Difference(k, path,
+                             hcpsdk.namespace.DirEntry(*json.loads(p))
+                             if p else None,
+                             hcpsdk.namespace.DirEntry(*json.loads(r))
+                             if r else None)
+
+    def summary(self):
+        """
+        Summarize the state of the verification.
+
+        :return:    a dict holding the number of partitions per state
+                    (*'pending'*, *'running'*, *'done'*, *'failed'*), the
+                    number of *'objects'* compared and the number of
+                    differences per kind
+        """
+        d = {'pending': 0, 'running': 0, 'done': 0, 'failed': 0,
+             'objects': 0, 'missing': 0, 'extra': 0, 'mismatch': 0}
+        names = {Checkpoint.PENDING: 'pending', Checkpoint.RUNNING: 'running',
+                 Checkpoint.DONE: 'done', Checkpoint.FAILED: 'failed'}
+        with self.__lock:
+            for state, count, objects in self.__db.execute(
+                    'SELECT state, COUNT(*), SUM(objects) FROM partitions '
+                    'GROUP BY state'):
+                d[names[state]] = count
+                d['objects'] += objects or 0
+            for kind, count in self.__db.execute(
+                    'SELECT kind, COUNT(*) FROM differences GROUP BY kind'):
+                d[kind] = count
+        return d
+
+    def close(self):
+        """
+        Close the database.
+        """
+        with self.__lock:
+            self.__db.close()
+
+
+class Verifier(object):
+    """
+    Verify that a replica holds the same objects as the primary HCP.
+
+    The namespace is compared directory by directory (a partition), by a
+    pool of workers. For each partition, the primary and the replica are
+    listed in parallel, and the (sorted) listings are merge-joined while
+    they are received, so the memory needed doesn't depend on the number of
+    entries in a directory. Directories found on both sides become new
+    partitions; directories missing on one side are reported as a whole.
+
+    The state is kept in a *Checkpoint()*, which allows to resume an
+    interrupted verification.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    # the state of a worker, signaled through the output queue
+    __DONE = object()
+
+    def __init__(self, primary, replica=None, checkpoint=None, workers=8,
+                 deleted=False, timeout=60, debuglevel=0):
+        """
+        :param primary:     an **hcpsdk.Target** object for the namespace on
+                            the primary HCP
+        :param replica:     an **hcpsdk.Target** object for the namespace on
+                            the replica HCP; defaults to *primary.replica*
+        :param checkpoint:  a *Checkpoint()* object; a *Checkpoint()* held
+                            in memory is used if *None*
+        :param workers:     the number of partitions verified in parallel
+        :param deleted:     compare deleted objects and directories as well
+                            (requires versioning being enabled)
+        :param timeout:     the connection timeout in seconds
+        :param debuglevel:  0..9 (propagated to *http.client*)
+        :raises:            *VerifierError* if there is no replica
+        """
+        self.logger = logging.getLogger(__name__ + '.Verifier')
+        replica = replica or primary.replica
+        if not replica:
+            raise VerifierError('no replica Target given')
+        self.workers = workers
+        self.deleted = deleted
+        self.__owncheckpoint = checkpoint is None
+        self.checkpoint = checkpoint or Checkpoint()
+        self.failed = []  # (partition, exception)
+        self.primary = hcpsdk.namespace.Listing(primary, size=workers,
+                                                timeout=timeout,
+                                                debuglevel=debuglevel)
+        self.replica = hcpsdk.namespace.Listing(replica, size=workers,
+                                                timeout=timeout,
+                                                debuglevel=debuglevel)
+
+    def verify(self, path='/rest'):
+        """
+        Verify (or continue verifying) the replica.
+
+        :param path:    the directory to start at; ignored when an
+                        interrupted verification is continued
+        :return:        a generator yielding the *Difference*\\ s found,
+                        partition by partition once they have been recorded
+                        in the *Checkpoint()*; partitions that failed are
+                        listed in *failed* (and in *checkpoint.summary()*)
+        """
+        self.failed = []
+        self.checkpoint.seed(path)
+        out = queue.Queue(maxsize=self.workers * 4)
+        cond = Condition()
+        cancel = Event()
+        active = [0]  # the number of partitions being verified
+
+        def _worker():
+            try:
+                while not cancel.is_set():
+                    with cond:
+                        while True:
+                            partition = self.checkpoint.claim()
+                            if partition or not active[0] or \
+                                    cancel.is_set():
+                                break
+                            cond.wait()
+                        if not partition:
+                            return
+                        active[0] += 1
+                    try:
+                        out.put(self._partition(partition))
+                    except Exception as e:
+                        self.logger.debug('verifying {} failed: {}'
+                                          .format(partition, e))
+                        self.checkpoint.fail(partition)
+                        self.failed.append((partition, e))
+                    finally:
+                        with cond:
+                            active[0] -= 1
+                            cond.notify_all()
+            finally:
+                out.put(Verifier.__DONE)
+
+        threads = [Thread(target=_worker, name='hcpsdk.Verifier',
+                          daemon=True) for _ in range(self.workers)]
+        for t in threads:
+            t.start()
+        running = len(threads)
+        try:
+            while running:
+                item = out.get()
+                if item is Verifier.__DONE:
+                    running -= 1
+                else:
+                    for difference in item:
+                        yield difference
+        finally:
+            # make sure the workers come to an end, even if the consumer
+            # stopped early
+            cancel.set()
+            with cond:
+                cond.notify_all()
+            while running:
+                if out.get() is Verifier.__DONE:
+                    running -= 1
+            for t in threads:
+                t.join()
+
+    def _partition(self, partition):
+        """
+        Verify a single directory and record the result.
+        """
+        try:
+            result = self._join(partition, False)
+        except VerifierError as e:
+            # HCP didn't deliver a sorted listing, fall back to sorting it
+            self.logger.debug('{} - sorting in memory'.format(e))
+            result = self._join(partition, True)
+        differences, subdirs, objects = result
+        self.checkpoint.done(partition, subdirs, differences, objects)
+        return differences
+
+    def _join(self, partition, sort):
+        """
+        List a directory on both sides in parallel and compare the entries.
+        """
+        prefetch = _Prefetch(self.replica.listdir(partition, self.deleted))
+        listing = self.primary.listdir(partition, self.deleted)
+        try:
+            primary, replica = listing, prefetch
+            if sort:
+                primary = sorted(primary, key=lambda e: e.name)
+                replica = sorted(replica, key=lambda e: e.name)
+            differences = []
+            subdirs = []
+            objects = 0
+            for p, r in mergejoin(primary, replica):
+                kind = _compare(p, r)
+                if kind:
+                    differences.append(Difference(kind, (p or r).path, p, r))
+                elif p.type == 'directory':
+                    subdirs.append(p.path)
+                else:
+                    objects += 1
+            return differences, subdirs, objects
+        finally:
+            listing.close()
+            prefetch.close()
+
+    def close(self):
+        """
+        Close the *Connection()*\\ s (and the in-memory *Checkpoint()*).
+        """
+        self.primary.close()
+        self.replica.close()
+        if self.__owncheckpoint:
+            self.checkpoint.close()
+
+
+class LagProbe(object):
+    """
+    Measures the end-to-end replication latency: writes small canary
+    objects to the primary HCP and polls the replica (using HEAD) until
+    they show up there, with a polling interval growing from *interval* up
+    to *maxinterval*. The time from the acknowledged write to the first
+    successful HEAD is recorded in a *hcpsdk.timeseries.Histogram* and a
+    *hcpsdk.timeseries.Series*; the canaries are deleted afterwards.
+
+    As the replica is polled, a latency is measured with a resolution of the
+    polling interval it was found at (it's rounded up, never down).
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    def __init__(self, primary, replica=None, path='/rest/.lagprobe',
+                 every=60, size=1024, timeout=3600, interval=0.25,
+                 maxinterval=15, workers=4, history=1440, debuglevel=0):
+        """
+        :param primary:     an **hcpsdk.Target** object for the namespace on
+                            the primary HCP
+        :param replica:     an **hcpsdk.Target** object for the namespace on
+                            the replica HCP; defaults to *primary.replica*
+        :param path:        the directory the canaries are written to
+        :param every:       the time between two canaries (seconds), when
+                            started by *start()*
+        :param size:        the size of a canary (bytes)
+        :param timeout:     the max. time to wait for a canary to show up on
+                            the replica (seconds)
+        :param interval:    the initial time between two polls (seconds)
+        :param maxinterval: the max. time between two polls (seconds)
+        :param workers:     the max. number of canaries in flight
+        :param history:     the number of latencies kept in *series*
+        :param debuglevel:  0..9 (propagated to *http.client*)
+        :raises:            *ValueError* if there is no replica
+        """
+        self.logger = logging.getLogger(__name__ + '.LagProbe')
+        replica = replica or primary.replica
+        if not replica:
+            raise ValueError('no replica Target given')
+        self.path = path.rstrip('/')
+        self.every = every
+        self.size = size
+        self.timeout = timeout
+        self.interval = interval
+        self.maxinterval = maxinterval
+        self.workers = workers
+        self.histogram = hcpsdk.timeseries.Histogram()
+        self.series = hcpsdk.timeseries.Series(('latency',), size=history)
+        self.timeouts = 0  # canaries that didn't show up within timeout
+        self.errors = []  # exceptions raised by probes run by start()
+        self.leftovers = []  # canaries that couldn't be deleted
+        self.__primary = hcpsdk.ConnectionPool(primary, size=workers,
+                                               debuglevel=debuglevel)
+        self.__replica = hcpsdk.ConnectionPool(replica, size=workers,
+                                               debuglevel=debuglevel)
+        self.__executor = None
+        self.__stop = Event()
+        self.__thread = None
+
+    def probe(self):
+        """
+        Write a single canary and wait for it to show up on the replica.
+
+        :return:    the replication latency (seconds), *None* if the canary
+                    didn't show up within *timeout*
+        :raises:    *hcpsdk.HcpsdkError* if the canary can't be written
+        """
+        canary = '{}/{}-{}'.format(self.path, os.getpid(), uuid.uuid4().hex)
+        with self.__primary.connection() as con:
+            r = con.PUT(canary, os.urandom(self.size))
+        if r.status != 201:
+            raise hcpsdk.HcpsdkError('{} - {} (writing {})'
+                                     .format(r.status, r.reason, canary))
+        written = time.time()
+        try:
+            latency = self._poll(canary, written)
+        finally:
+            self._delete(canary)
+        if latency is None and self.__stop.is_set():
+            return None  # given up by stop()
+        if latency is None:
+            self.timeouts += 1
+            self.logger.debug('{} not replicated within {} seconds'
+                              .format(canary, self.timeout))
+        else:
+            self.histogram.add(latency)
+            self.series.append(written, (latency,))
+        return latency
+
+    def _poll(self, canary, written):
+        """
+        HEAD the canary on the replica until it's there or *timeout* passed.
+        """
+        interval = self.interval
+        while not self.__stop.is_set():
+            with self.__replica.connection() as con:
+                r = con.HEAD(canary)
+            now = time.time()
+            if r.status == 200:
+                return now - written
+            if r.status != 404:
+                self.logger.debug('HEAD {} on replica: {} - {}'
+                                  .format(canary, r.status, r.reason))
+            remaining = written + self.timeout - now
+            if remaining <= 0:
+                return None
+            self.__stop.wait(min(interval, remaining))
+            interval = min(interval * 2, self.maxinterval)
+        return None
+
+    def _delete(self, canary):
+        """
+        Delete a canary from the primary (and, by replication, the replica).
+        """
+        try:
+            with self.__primary.connection() as con:
+                r = con.DELETE(canary)
+            if r.status not in (200, 404):
+                raise hcpsdk.HcpsdkError('{} - {}'.format(r.status, r.reason))
+        except Exception as e:
+            self.logger.debug('deleting {} failed: {}'.format(canary, e))
+            self.leftovers.append(canary)
+
+    def start(self):
+        """
+        Start writing a canary every *every* seconds, in a background
+        thread; up to *workers* canaries are in flight at a time.
+        """
+        if self.__thread and self.__thread.is_alive():
+            return
+        self.__stop.clear()
+        self.__executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.__thread = Thread(target=self.__run, name='hcpsdk.LagProbe',
+                               daemon=True)
+        self.__thread.start()
+
+    def __run(self):
+        inflight = []
+
+        def submit():
+            inflight[:] = [f for f in inflight if not f.done()]
+            if len(inflight) < self.workers:
+                inflight.append(self.__executor.submit(self.__probe))
+            else:
+                self.logger.debug('{} canaries in flight, skipping one'
+                                  .format(len(inflight)))
+
+        hcpsdk.timeseries.every(self.every, submit, self.__stop, self.logger)
+
+    def __probe(self):
+        try:
+            self.probe()
+        except Exception as e:
+            self.logger.debug('probe failed: {}'.format(e))
+            self.errors.append(e)
+
+    def stop(self):
+        """
+        Stop writing canaries; canaries in flight are given up (and
+        deleted).
+        """
+        self.__stop.set()
+        if self.__thread:
+            self.__thread.join()
+            self.__thread = None
+        if self.__executor:
+            self.__executor.shutdown(wait=True)
+            self.__executor = None
+        self.__stop.clear()
+
+    def stats(self):
+        """
+        Summarize the latencies measured.
+
+        :return:    a dict holding the number of canaries replicated
+                    (*'count'*) and timed out (*'timeouts'*), the *'mean'*,
+                    *'min'* and *'max'* latency and the percentiles
+                    *'p50'*, *'p90'*, *'p99'* (*None* if nothing has been
+                    measured, yet)
+        """
+        h = self.histogram
+        return {'count': h.count, 'timeouts': self.timeouts,
+                'mean': h.mean(), 'min': h.min, 'max': h.max,
+                'p50': h.percentile(50), 'p90': h.percentile(90),
+                'p99': h.percentile(99)}
+
+    def close(self):
+        """
+        Stop writing canaries and close the *Connection()*\\ s.
+        """
+        self.stop()
+        self.__primary.close()
+        self.__replica.close()
+
+
+QuorumResult = namedtuple('QuorumResult', ['url', 'acked', 'pending',
+                                           'failed'])
+QuorumResult.__doc__ = """
+The state of a quorum write when *QuorumWriter.put()* returns
+
+..  versionadded:: 0.9.5.0
+"""
+QuorumResult.url.__doc__ = 'the url written'
+QuorumResult.acked.__doc__ = 'the FQDNs of the Targets that acknowledged ' \
+                             'the write'
+QuorumResult.pending.__doc__ = 'the FQDNs of the Targets still being ' \
+                               'written to (stragglers)'
+QuorumResult.failed.__doc__ = 'the FQDNs of the Targets that failed (to be ' \
+                              'repaired, if enabled)'
+
+
+class QuorumWriter(object):
+    """
+    Write the same object to several Targets (independent HCP systems)
+    concurrently. The source is read once, into a spool that feeds one
+    stream per Target, so a slow Target doesn't hold back the others. A
+    write succeeds as soon as *quorum* Targets have acknowledged it; the
+    stragglers are completed in the background and Targets that failed are
+    repaired (written again, out of the spool) asynchronously.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    def __init__(self, targets, quorum=None, workers=4, retries=3, backoff=1,
+                 repair=True, callback=None, chunksize=2**20,
+                 spoolsize=2**26, timeout=60, debuglevel=0):
+        """
+        :param targets:     a list of **hcpsdk.Target** objects
+        :param quorum:      the number of Targets that need to acknowledge
+                            a write; defaults to the majority
+        :param workers:     the max. number of *put()*\\ s running in
+                            parallel (and the size of each Target's
+                            *ConnectionPool*)
+        :param retries:     the number of repair attempts per Target
+        :param backoff:     the seconds to wait before the 1st repair
+                            attempt, doubled with every attempt
+        :param repair:      repair failed Targets if *True*
+        :param callback:    a function called as *callback(url, fqdn,
+                            state, exception)* for each Target that was
+                            still pending or failed when *put()* returned,
+                            once its *state* is final: *'acked'*,
+                            *'repaired'* or *'failed'*
+        :param chunksize:   the number of bytes read from the source at once
+        :param spoolsize:   the max. number of bytes spooled in memory per
+                            *put()*; larger objects are spooled to disk
+        :param timeout:     the connection timeout in seconds
+        :param debuglevel:  0..9 (propagated to *http.client*)
+        """
+        self.logger = logging.getLogger(__name__ + '.QuorumWriter')
+        if not targets:
+            raise ValueError('no targets given')
+        self.targets = list(targets)
+        self.quorum = quorum or len(self.targets) // 2 + 1
+        if not 0 < self.quorum <= len(self.targets):
+            raise ValueError('quorum needs to be 1 .. {}'
+                             .format(len(self.targets)))
+        self.retries = retries
+        self.backoff = backoff
+        self.repair = repair
+        self.callback = callback
+        self.chunksize = chunksize
+        self.spoolsize = spoolsize
+        self.failed = []  # (url, fqdn, exception) that couldn't be repaired
+        self.__pools = [hcpsdk.ConnectionPool(t, size=workers,
+                                              timeout=timeout,
+                                              debuglevel=debuglevel)
+                        for t in self.targets]
+        self.__executor = ThreadPoolExecutor(
+            max_workers=workers * len(self.targets))
+        self.__repairs = ThreadPoolExecutor(max_workers=workers)
+        self.__cond = Condition()
+        self.__pending = 0  # Target writes and repairs not yet finished
+
+    def put(self, url, body, length=None, params=None, headers=None):
+        """
+        Write an object to all Targets, returning as soon as *quorum* of
+        them acknowledged the write.
+
+        :param url:     the url to write to (i.e. */rest/dir/object*)
+        :param body:    the object's content (bytes or a file-like object
+                        open for binary read, which is read once)
+        :param length:  the size of *body*; if *None* and *body* isn't
+                        bytes, it's determined for real files and the
+                        object is sent with chunked transfer encoding,
+                        otherwise
+        :param params:  see *hcpsdk.Connection.request()*
+        :param headers: see *hcpsdk.Connection.request()*
+        :return:        a *QuorumResult*
+        :raises:        *QuorumError* if the quorum can't be reached
+        """
+        if length is None:
+            if isinstance(body, bytes):
+                length = len(body)
+            elif hasattr(body, 'fileno'):
+                try:
+                    length = os.fstat(body.fileno()).st_size - body.tell()
+                except (OSError, ValueError):
+                    pass
+        headers = dict(headers or {})
+        if length is not None:
+            headers['Content-Length'] = str(length)
+        spool = _Spool(body, self.chunksize, self.spoolsize)
+
+        lock = Lock()
+        done = Event()
+        state = {'acked': [], 'failed': [], 'returned': False}
+        fqdns = [t.fqdn for t in self.targets]
+
+        def _finished(i, future):
+            e = future.exception()
+            with lock:
+                state['failed' if e else 'acked'].append(fqdns[i])
+                returned = state['returned']
+                if len(state['acked']) >= self.quorum or \
+                        len(state['failed']) > len(fqdns) - self.quorum:
+                    done.set()
+            if e:
+                self.logger.debug('writing {} to {} failed: {}'
+                                  .format(url, fqdns[i], e))
+            if e and self.repair:
+                self._submit(self.__repairs, self._repair, i, url, spool,
+                             params, headers, e)
+            elif returned:
+                self._report(url, fqdns[i], 'failed' if e else 'acked', e)
+            self._release(spool)
+
+        with self.__cond:
+            self.__pending += len(self.targets)
+            spool.users = len(self.targets)
+        for i in range(len(self.targets)):
+            future = self.__executor.submit(self._put, i, url, spool,
+                                            params, headers)
+            future.add_done_callback(lambda f, i=i: _finished(i, f))
+
+        done.wait()
+        with lock:
+            state['returned'] = True
+            result = QuorumResult(url, list(state['acked']),
+                                  [f for f in fqdns if f not in
+                                   state['acked'] + state['failed']],
+                                  list(state['failed']))
+        if len(result.acked) < self.quorum:
+            raise QuorumError('{} of {} Targets acknowledged, {} needed'
+                              .format(len(result.acked), len(fqdns),
+                                      self.quorum), result=result)
+        return result
+
+    def _put(self, i, url, spool, params, headers):
+        """
+        Write the spooled object to a single Target.
+        """
+        with self.__pools[i].connection() as con:
+            r = con.PUT(url, body=spool.reader(), params=params,
+                        headers=dict(headers))
+        if r.status != 201:
+            raise hcpsdk.HcpsdkError('{} - {}'.format(r.status, r.reason))
+
+    def _repair(self, i, url, spool, params, headers, error):
+        """
+        Write the object to a Target again, after a failure.
+        """
+        fqdn = self.targets[i].fqdn
+        for attempt in range(self.retries):
+            time.sleep(self.backoff * 2 ** attempt)
+            try:
+                self._put(i, url, spool, params, headers)
+            except Exception as e:
+                self.logger.debug('repairing {} on {} failed: {}'
+                                  .format(url, fqdn, e))
+                error = e
+            else:
+                self.logger.debug('repaired {} on {}'.format(url, fqdn))
+                self._report(url, fqdn, 'repaired', None)
+                return
+        self.failed.append((url, fqdn, error))
+        self._report(url, fqdn, 'failed', error)
+
+    def _submit(self, executor, func, i, url, spool, *args):
+        with self.__cond:
+            self.__pending += 1
+            spool.users += 1
+
+        def _run():
+            try:
+                func(i, url, spool, *args)
+            finally:
+                self._release(spool)
+        executor.submit(_run)
+
+    def _release(self, spool):
+        with self.__cond:
+            self.__pending -= 1
+            spool.users -= 1
+            if not spool.users:
+                spool.close()
+            self.__cond.notify_all()
+
+    def _report(self, url, fqdn, state, error):
+        if self.callback:
+            try:
+                self.callback(url, fqdn, state, error)
+            except Exception as e:
+                self.logger.debug('callback failed: {}'.format(e))
+
+    def wait(self, timeout=None):
+        """
+        Wait for all stragglers and repairs to finish.
+
+        :param timeout: max. seconds to wait, forever if *None*
+        :return:        *True* if everything has finished
+        """
+        with self.__cond:
+            return self.__cond.wait_for(lambda: not self.__pending,
+                                        timeout=timeout)
+
+    def close(self):
+        """
+        Wait for all stragglers and repairs, then close the
+        *Connection()*\\ s.
+        """
+        self.wait()
+        self.__executor.shutdown(wait=True)
+        self.__repairs.shutdown(wait=True)
+        for pool in self.__pools:
+            pool.close()
+
+
+class _Spool(object):
+    """
+    Read a source once, in a thread of its own, into a spool file that can
+    be read by many readers, each at its own pace.
+    """
+
+    def __init__(self, source, chunksize, maxsize):
+        self.users = 0  # maintained by QuorumWriter
+        self.__cond = Condition()
+        self.__size = 0
+        self.__done = False
+        self.__error = None
+        if isinstance(source, bytes):
+            self.__file = None
+            self.__data = source
+            self.__size = len(source)
+            self.__done = True
+        else:
+            self.__file = SpooledTemporaryFile(max_size=maxsize)
+            Thread(target=self.__fill, args=(source, chunksize),
+                   daemon=True).start()
+
+    def __fill(self, source, chunksize):
+        try:
+            while True:
+                chunk = source.read(chunksize)
+                if not chunk:
+                    break
+                with self.__cond:
+                    if self.__file.closed:
+                        return
+                    self.__file.seek(0, 2)
+                    self.__file.write(chunk)
+                    self.__size += len(chunk)
+                    self.__cond.notify_all()
+        except Exception as e:
+            self.__error = e
+        with self.__cond:
+            self.__done = True
+            self.__cond.notify_all()
+
+    def read(self, pos, n):
+        with self.__cond:
+            while pos >= self.__size and not self.__done:
+                self.__cond.wait()
+            if self.__error:
+                raise hcpsdk.HcpsdkError('reading the source failed: {}'
+                                         .format(self.__error))
+            n = self.__size - pos if n is None or n < 0 \
+                else min(n, self.__size - pos)
+            if self.__file is None:
+                return self.__data[pos:pos + n]
+            self.__file.seek(pos)
+            return self.__file.read(n)
+
+    def reader(self):
+        return _SpoolReader(self)
+
+    def close(self):
+        with self.__cond:
+            if self.__file:
+                self.__file.close()
+            self.__data = None
+
+
+class _SpoolReader(object):
+    """
+    A file-like view of a *_Spool*, for a single reader.
+    """
+
+    def __init__(self, spool):
+        self.__spool = spool
+        self.__pos = 0
+
+    def read(self, n=-1):
+        data = self.__spool.read(self.__pos, n)
+        self.__pos += len(data)
+        return data
+
+
+class _Prefetch(object):
+    """
+    Iterate over a generator in a thread of its own, buffering a limited
+    number of items.
+    """
+
+    __END = object()
+
+    def __init__(self, generator, maxsize=1024):
+        self.__generator = generator
+        self.__queue = queue.Queue(maxsize=maxsize)
+        self.__stop = Event()
+        self.__thread = Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def __run(self):
+        try:
+            for item in self.__generator:
+                if not self.__put(item):
+                    break
+            self.__put(_Prefetch.__END)
+        except Exception as e:
+            self.__put(e)
+        finally:
+            self.__generator.close()
+
+    def __put(self, item):
+        while not self.__stop.is_set():
+            try:
+                self.__queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def __iter__(self):
+        while True:
+            item = self.__queue.get()
+            if item is _Prefetch.__END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def close(self):
+        self.__stop.set()
+        self.__thread.join()
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2016 Thorsten Simons (sw@snomis.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from array import array
+from bisect import bisect_left
+from threading import Lock
+import time
+import logging
+
+
+__all__ = ['Series', 'Histogram', 'every']
+
+logging.getLogger('hcpsdk.timeseries').addHandler(logging.NullHandler())
+
+
+class Series(object):
+    """
+    A time series of samples with a fixed number of numeric fields, kept in a
+    ring buffer of a fixed size. Each field (and the timestamps) is stored in
+    its own *array.array*, so a sample costs a few bytes per field, only.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    def __init__(self, fields, size=1024, typecode='d'):
+        """
+        :param fields:      the names of the fields of a sample
+        :param size:        the number of samples kept; the oldest sample
+                            gets overwritten if the buffer is full
+        :param typecode:    the *array.array* typecode used for the fields
+                            ('d' for floats, 'q' for 64 bit integers, ...)
+        """
+        if size < 2:
+            raise ValueError('size needs to be 2 or more')
+        self.fields = tuple(fields)
+        self.size = size
+        self._time = array('d', [0.0]) * size
+        self._data = [array(typecode, [0]) * size for _ in self.fields]
+        self._next = 0  # the slot the next sample goes to
+        self._count = 0  # the number of samples stored
+        self._lock = Lock()
+
+    def append(self, timestamp, values):
+        """
+        Add a sample.
+
+        :param timestamp:   the time of the sample (seconds since the epoch)
+        :param values:      a sequence of values in the order of *fields*,
+                            or a dict holding (at least) all *fields*
+        """
+        if isinstance(values, dict):
+            values = [values[f] for f in self.fields]
+        elif len(values) != len(self.fields):
+            raise ValueError('{} values expected'.format(len(self.fields)))
+        with self._lock:
+            self._time[self._next] = timestamp
+            for column, value in zip(self._data, values):
+                column[self._next] = value
+            self._next = (self._next + 1) % self.size
+            self._count = min(self._count + 1, self.size)
+
+    def __len__(self):
+        return self._count
+
+    def _slots(self):
+        """
+        The slots in use, from the oldest to the newest sample.
+        """
+        first = (self._next - self._count) % self.size
+        return [(first + i) % self.size for i in range(self._count)]
+
+    def samples(self):
+        """
+        Get the samples stored.
+
+        :return:    a list of *(timestamp, (value, ...))* tuples, from the
+                    oldest to the newest sample
+        """
+        with self._lock:
+            return [(self._time[i], tuple(c[i] for c in self._data))
+                    for i in self._slots()]
+
+    def last(self):
+        """
+        Get the newest sample.
+
+        :return:    a *(timestamp, (value, ...))* tuple, *None* if empty
+        """
+        with self._lock:
+            if not self._count:
+                return None
+            i = (self._next - 1) % self.size
+            return self._time[i], tuple(c[i] for c in self._data)
+
+    def deltas(self):
+        """
+        Get the differences between subsequent samples.
+
+        :return:    a list of *(timestamp, interval, (delta, ...))* tuples,
+                    where *timestamp* is the time of the younger sample
+        """
+        samples = self.samples()
+        return [(t1, t1 - t0, tuple(b - a for a, b in zip(v0, v1)))
+                for (t0, v0), (t1, v1) in zip(samples, samples[1:])]
+
+    def rates(self):
+        """
+        Get the change per second between subsequent samples.
+
+        :return:    a list of *(timestamp, (rate, ...))* tuples, where
+                    *timestamp* is the time of the younger sample
+        """
+        return [(t, tuple(d / dt for d in delta))
+                for t, dt, delta in self.deltas() if dt > 0]
+
+    def __repr__(self):
+        return "<{} class at {}>".format(Series.__name__, id(self))
+
+    def __str__(self):
+        return ("<{} class ({}), {} of {} samples>"
+                .format(Series.__name__, ', '.join(self.fields),
+                        self._count, self.size))
+
+
+class Histogram(object):
+    """
+    A histogram of values (latencies, for example), counted in buckets with
+    fixed upper bounds. Recording a value costs the same, no matter how many
+    values have been recorded already; percentiles are estimated out of the
+    buckets.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    def __init__(self, bounds=None):
+        """
+        :param bounds:  the (sorted) upper bounds of the buckets; values
+                        above the last bound are counted in an extra
+                        bucket. Defaults to *exponential()*.
+        """
+        self.bounds = tuple(bounds or Histogram.exponential())
+        self._counts = array('q', [0]) * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self._lock = Lock()
+
+    @staticmethod
+    def exponential(start=0.001, factor=2 ** 0.25, count=96):
+        """
+        Calculate exponentially growing bucket bounds.
+
+        :param start:   the upper bound of the first bucket
+        :param factor:  the factor between two subsequent bounds
+        :param count:   the number of bounds
+        :return:        a list of bounds (by default, 1 ms to about 4 hours
+                        in steps of 19%, for latencies in seconds)
+        """
+        return [start * factor ** i for i in range(count)]
+
+    def add(self, value):
+        """
+        Record a value.
+
+        :param value:   the value
+        """
+        with self._lock:
+            self._counts[bisect_left(self.bounds, value)] += 1
+            self.count += 1
+            self.sum += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        """
+        Add the values recorded by another *Histogram* with the same bounds.
+
+        :param other:   a *Histogram* object
+        """
+        if other.bounds != self.bounds:
+            raise ValueError('histograms with different bounds')
+        with other._lock:
+            counts = list(other._counts)
+            count, total, lo, hi = other.count, other.sum, other.min, \
+                other.max
+        with self._lock:
+            for i, c in enumerate(counts):
+                self._counts[i] += c
+            self.count += count
+            self.sum += total
+            if count:
+                self.min = lo if self.min is None else min(self.min, lo)
+                self.max = hi if self.max is None else max(self.max, hi)
+
+    def buckets(self):
+        """
+        Get the buckets.
+
+        :return:    a list of *(upper bound, count)* tuples; the upper bound
+                    of the extra bucket is *None*
+        """
+        with self._lock:
+            return list(zip(self.bounds + (None,), self._counts))
+
+    def mean(self):
+        """
+        :return:    the mean of the values recorded, *None* if empty
+        """
+        with self._lock:
+            return self.sum / self.count if self.count else None
+
+    def percentile(self, q):
+        """
+        Estimate a percentile, interpolating linearly within its bucket.
+
+        :param q:   the percentile (0..100)
+        :return:    the estimated value, *None* if empty
+        """
+        with self._lock:
+            if not self.count:
+                return None
+            rank = q / 100 * self.count
+            seen = 0
+            for i, c in enumerate(self._counts):
+                if c and seen + c >= rank:
+                    lo = self.bounds[i - 1] if i else self.min
+                    hi = self.bounds[i] if i < len(self.bounds) else self.max
+                    lo, hi = max(lo, self.min), min(hi, self.max)
+                    return lo + (hi - lo) * max(0.0, rank - seen) / c
+                seen += c
+            return self.max
+
+    def __len__(self):
+        return self.count
+
+    def __str__(self):
+        return ("<{} class, {} values>"
+                .format(Histogram.__name__, self.count))
+
+
+def every(interval, func, stop, logger=None):
+    """
+    Call *func()* every *interval* seconds until *stop* is set, sticking to
+    the schedule: calls that would have been due while *func()* was still
+    running are skipped. Exceptions raised by *func()* are logged and don't
+    end the loop.
+
+    :param interval:    the time between two calls (seconds)
+    :param func:        the callable to call, without arguments
+    :param stop:        a *threading.Event()* that ends the loop when set
+    :param logger:      the logger to report exceptions to
+
+    ..  versionadded:: 0.9.5.0
+    """
+    logger = logger or logging.getLogger(__name__)
+    nexttime = time.time()
+    while not stop.is_set():
+        try:
+            func()
+        except Exception as e:
+            logger.warning('scheduled call failed: {}'.format(e))
+        nexttime += interval
+        while nexttime < time.time():
+            nexttime += interval
+        stop.wait(nexttime - time.time())
@@ -0,0 +1,560 @@
+# -*- coding: utf-8 -*-
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2016 Thorsten Simons (sw@snomis.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import hcpsdk
+from collections import OrderedDict, namedtuple
+from threading import Lock, Thread
+from urllib.parse import parse_qsl
+import argparse
+import gzip
+import json
+import logging
+import os
+import struct
+import sys
+import time
+
+__all__ = ['TraceError', 'Record', 'Recorder', 'load', 'Replayer', 'main']
+
+logging.getLogger('hcpsdk.trace').addHandler(logging.NullHandler())
+
+# the methods a trace can hold, the index is what gets recorded
+METHODS = ('GET', 'PUT', 'HEAD', 'POST', 'DELETE', 'OPTIONS')
+
+# a trace starts with the magic bytes, including the format version
+_MAGIC = b'HCPTRACE\x01'
+
+# start, stream, method, status, sent, received, connect, wait, read,
+# length of path, length of query - followed by path and query (utf-8)
+_RECORD = struct.Struct('<dIBHqqfffHH')
+
+# the bucket bounds used to record latencies (10 us to about 3 hours)
+_BOUNDS = hcpsdk.timeseries.Histogram.exponential(start=0.00001, count=120)
+
+
+class TraceError(Exception):
+    """
+    Raised if a trace can't be read.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    def __init__(self, reason):
+        """
+        :param reason:  an error description
+        """
+        self.args = (reason,)
+
+
+Record = namedtuple('Record', ['start', 'stream', 'method', 'path', 'query',
+                               'status', 'sent', 'received', 'connect',
+                               'wait', 'read'])
+Record.__doc__ = """
+A single Request read from a trace.
+
+:param start:       the time the Request was started (secs since the epoch)
+:param stream:      the id of the *Connection()* that issued it
+:param method:      the http method
+:param path:        the url as given to *Connection.request()*
+:param query:       the urlencoded params (w/o the leading '?')
+:param status:      the http status, 0 if the Request failed
+:param sent:        the bytes sent with the body, -1 if unknown (iterables)
+:param received:    the bytes read from the Response through
+                    *Connection.read()*
+:param connect:     the *Connection.connect_time* of a connection opened
+                    for the Request, 0.0 if an open one has been used
+:param wait:        the time (secs) until the Response arrived, w/o connect
+:param read:        the time (secs) spent in *Connection.read()*
+
+..  versionadded:: 0.9.5.0
+"""
+
+
+def _open(file, mode):
+    """
+    Open a trace file, compressed if its name ends with *.gz*.
+    """
+    if file.endswith('.gz'):
+        return gzip.open(file, mode)
+    return open(file, mode)
+
+
+class Recorder(object):
+    """
+    Write a compact, binary trace of the Requests done through the
+    *Connection()*\\ s it is given to (*Connection(recorder=...)*).
+
+    Each Request is written as a fixed size record (47 bytes) followed by
+    its url and query. A Request is recorded once its *Response* has been
+    read to the end, when the next Request is started or when the
+    *Connection()* is closed, whatever happens first.
+
+    The bodies aren't recorded, just their size.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    def __init__(self, file):
+        """
+        :param file:    the trace file name (written gzip'ed if it ends
+                        with *.gz*) or a binary file object open for
+                        writing
+        """
+        self.logger = logging.getLogger(__name__ + '.Recorder')
+        self.__lock = Lock()
+        self.__streams = 0
+        self.__count = 0
+        if isinstance(file, str):
+            self.__hdl = _open(file, 'wb')
+            self.__own = True
+        else:
+            self.__hdl = file
+            self.__own = False
+        self.__hdl.write(_MAGIC)
+
+    def stream(self):
+        """
+        Get a new stream id (one per *Connection()*).
+        """
+        with self.__lock:
+            self.__streams += 1
+            return self.__streams
+
+    def record(self, start, stream, method, path, query, status, sent,
+               received, connect, wait, read):
+        """
+        Write a record - see *Record()* for the parameters; called by
+        *Connection()*.
+        """
+        try:
+            m = METHODS.index(method)
+        except ValueError:
+            self.logger.debug('{} not recordable: {}'.format(method, path))
+            return
+        path = path.encode('utf-8', 'surrogateescape')[:0xffff]
+        query = query.encode('utf-8', 'surrogateescape')[:0xffff]
+        data = _RECORD.pack(start, stream, m, status, sent, received,
+                            connect, wait, read, len(path), len(query))
+        with self.__lock:
+            if not self.__hdl:
+                return
+            self.__hdl.write(data + path + query)
+            self.__count += 1
+
+    def close(self):
+        """
+        Flush the trace and close the file if it has been opened by the
+        *Recorder()*. Requests recorded later are silently discarded.
+        """
+        with self.__lock:
+            if self.__hdl:
+                if self.__own:
+                    self.__hdl.close()
+                else:
+                    self.__hdl.flush()
+                self.__hdl = None
+
+    def __getcount(self):
+        return self.__count
+    count = property(__getcount, None, None,
+                     'The number of Requests recorded (r/o)')
+
+    def __repr__(self):
+        return "<{} class at {}>".format(Recorder.__name__, id(self))
+
+    def __str__(self):
+        return "<{} class, {} Requests>".format(Recorder.__name__,
+                                                self.__count)
+
+
+def load(file):
+    """
+    Read a trace.
+
+    :param file:    the trace file name (gzip'ed or not) or a binary file
+                    object open for reading
+    :return:        a generator yielding *Record()*\\ s
+    :raises:        *TraceError* if the file isn't a trace or is truncated
+    """
+    if isinstance(file, str):
+        with open(file, 'rb') as hdl:
+            zipped = hdl.read(2) == b'\x1f\x8b'
+        hdl = gzip.open(file, 'rb') if zipped else open(file, 'rb')
+    else:
+        hdl = file
+    try:
+        if hdl.read(len(_MAGIC)) != _MAGIC:
+            raise TraceError('not a trace (or unsupported version)')
+        while True:
+            data = hdl.read(_RECORD.size)
+            if not data:
+                break
+            if len(data) < _RECORD.size:
+                raise TraceError('truncated trace')
+            (start, stream, m, status, sent, received, connect, wait, read,
+             plen, qlen) = _RECORD.unpack(data)
+            strings = hdl.read(plen + qlen)
+            if len(strings) < plen + qlen or m >= len(METHODS):
+                raise TraceError('truncated or corrupt trace')
+            yield Record(start, stream, METHODS[m],
+                         strings[:plen].decode('utf-8', 'surrogateescape'),
+                         strings[plen:].decode('utf-8', 'surrogateescape'),
+                         status, sent, received, connect, wait, read)
+    finally:
+        if hdl is not file:
+            hdl.close()
+
+
+def _latency(histogram):
+    """
+    Summarize a *Histogram()* of latencies.
+    """
+    d = OrderedDict([('mean', histogram.mean())])
+    for name, q in hcpsdk.bench.PERCENTILES.items():
+        d[name] = histogram.percentile(q)
+    d['max'] = histogram.max
+    return d
+
+
+class _Stats(object):
+    """
+    The results of replaying a single stream, per method.
+    """
+
+    def __init__(self):
+        self.original = {m: hcpsdk.timeseries.Histogram(_BOUNDS)
+                         for m in METHODS}
+        self.replayed = {m: hcpsdk.timeseries.Histogram(_BOUNDS)
+                         for m in METHODS}
+        self.errors = {m: {} for m in METHODS}
+        self.mismatches = dict.fromkeys(METHODS, 0)
+        self.lag = hcpsdk.timeseries.Histogram(_BOUNDS)
+
+
+class Replayer(object):
+    """
+    Re-issue the Requests of a trace against a *Target()* - another HCP or
+    an *hcpsdk.emulator.Emulator()*.
+
+    Each stream of the trace (the Requests done through one *Connection()*)
+    is replayed by a thread and a *Connection()* of its own, so the replay
+    has the concurrency of the original workload. A Request is started at
+    its offset from the start of the trace, divided by *speed*; if a stream
+    can't keep up, it's started as soon as the previous one has finished,
+    and the delay is reported as lag.
+
+    PUT and POST bodies are random data of the recorded size. With
+    *prepare*, objects the trace reads, checks or deletes without having
+    written them are written before the replay starts (with the size that
+    has been read, if known), as they existed when the trace was recorded.
+    Objects already existing in the *Target()* make PUTs fail (409), so
+    replay into a fresh Namespace or directory (see *rewrite*).
+
+    The report compares the latency (connect + wait + read) of the
+    replayed Requests with the recorded one, per method, and counts the
+    Requests getting another status than recorded (*mismatches*).
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    def __init__(self, target, trace, speed=1.0, prepare=True, rewrite=None,
+                 **kwargs):
+        """
+        :param target:      an *hcpsdk.Target()* object
+        :param trace:       the trace - a file name or object to *load()*
+                            it from, or a sequence of *Record()*\\ s
+        :param speed:       the replay speed; 2.0 replays twice as fast
+        :param prepare:     write the objects the trace expects to exist
+        :param rewrite:     a callable mapping a recorded url to the url to
+                            use (*lambda url: url.replace('/rest/',
+                            '/rest/replay/', 1)*, for example)
+        :param kwargs:      keyword arguments passed to *Connection()*
+                            (timeout, retries, ...)
+        :raises:            *TraceError* if the trace can't be read,
+                            *ValueError* if *speed* isn't positive
+        """
+        self.logger = logging.getLogger(__name__ + '.Replayer')
+        if speed <= 0:
+            raise ValueError('speed must be > 0')
+        self.target = target
+        self.speed = speed
+        self.prepare = prepare
+        self.rewrite = rewrite or (lambda url: url)
+        self.kwargs = kwargs
+        if isinstance(trace, str) or hasattr(trace, 'read'):
+            trace = load(trace)
+        self.records = sorted(trace, key=lambda r: r.start)
+        self.streams = OrderedDict()
+        for rec in self.records:
+            self.streams.setdefault(rec.stream, []).append(rec)
+        self.__payload = b''
+        self.__plock = Lock()
+
+    def _payload(self, size):
+        """
+        Get *size* bytes of random data, to be sent with a PUT or POST.
+        """
+        if size > len(self.__payload):
+            with self.__plock:
+                if size > len(self.__payload):
+                    self.__payload += os.urandom(size - len(self.__payload))
+        return self.__payload[:size]
+
+    def _prepare(self):
+        """
+        Write the objects the trace expects to exist.
+
+        :return:    the number of objects written
+        """
+        dirs = set()
+        for rec in self.records:
+            parts = rec.path.rstrip('/').split('/')
+            for i in range(1, len(parts)):
+                dirs.add('/'.join(parts[:i]))
+
+        written = set()
+        needed = OrderedDict()
+        for rec in self.records:
+            if rec.method == 'PUT':
+                written.add(rec.path)
+            elif (rec.method in ('GET', 'HEAD', 'DELETE')
+                  and 200 <= rec.status < 300 and rec.path not in written
+                  and rec.path.rstrip('/') not in dirs):
+                size = (rec.received if rec.method == 'GET' and not rec.query
+                        else 0)
+                needed[rec.path] = max(needed.get(rec.path, 0), size)
+
+        done = []
+
+        def _put(con, item):
+            url = self.rewrite(item[0])
+            try:
+                r = con.PUT(url, self._payload(item[1]))
+                con.read()
+            except Exception as e:
+                self.logger.debug('prepare of {} failed: {}'.format(url, e))
+                con.close()
+                return
+            if r.status in (200, 201, 409):
+                done.append(url)
+            else:
+                self.logger.debug('prepare of {} failed: {} {}'
+                                  .format(url, r.status, r.reason))
+
+        pool = hcpsdk.ConnectionPool(self.target, size=4, **self.kwargs)
+        try:
+            pool.map(_put, needed.items())
+        finally:
+            pool.close()
+        return len(done)
+
+    def _do(self, con, rec):
+        """
+        Replay a single Request.
+
+        :return:    the status, or the name of the exception raised
+        """
+        body = None
+        if rec.method in ('PUT', 'POST') and rec.sent > 0:
+            body = self._payload(rec.sent)
+        try:
+            r = con.request(rec.method, self.rewrite(rec.path), body=body,
+                            params=parse_qsl(rec.query,
+                                             keep_blank_values=True) or None)
+            while con.read(2**16):
+                pass
+        except Exception as e:
+            con.close()
+            return type(e).__name__
+        return r.status
+
+    def _stream(self, records, t0, start, stats):
+        """
+        Replay the Requests of a single stream.
+        """
+        con = hcpsdk.Connection(self.target, **self.kwargs)
+        try:
+            for rec in records:
+                delay = start + (rec.start - t0) / self.speed - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                stats.lag.add(max(0.0, -delay))
+                t1 = time.time()
+                result = self._do(con, rec)
+                stats.replayed[rec.method].add(time.time() - t1)
+                stats.original[rec.method].add(rec.connect + rec.wait +
+                                               rec.read)
+                status = result if isinstance(result, int) else 0
+                if not status or status >= 400:
+                    errors = stats.errors[rec.method]
+                    errors[str(result)] = errors.get(str(result), 0) + 1
+                if status != rec.status:
+                    stats.mismatches[rec.method] += 1
+        finally:
+            con.close()
+
+    def run(self):
+        """
+        Replay the trace.
+
+        :return:    the report, a dict ready to be dumped as JSON
+        """
+        prepared = self._prepare() if self.prepare else 0
+        t0 = self.records[0].start if self.records else 0.0
+        # give the threads a moment to get started
+        start = time.time() + 0.05
+        stats = [_Stats() for s in self.streams]
+        threads = [Thread(target=self._stream, name='hcpsdk.Replayer',
+                          args=(records, t0, start, stats[i]), daemon=True)
+                   for i, records in enumerate(self.streams.values())]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = max(time.time() - start, 0.000001)
+        return self._report(stats, elapsed, t0, prepared)
+
+    def _report(self, stats, elapsed, t0, prepared):
+        """
+        Merge the streams' results into the report.
+        """
+        lag = hcpsdk.timeseries.Histogram(_BOUNDS)
+        totalerrors = {}
+        mismatches = 0
+        ops = OrderedDict()
+        for m in METHODS:
+            original = hcpsdk.timeseries.Histogram(_BOUNDS)
+            replayed = hcpsdk.timeseries.Histogram(_BOUNDS)
+            errors = {}
+            mismatch = 0
+            for s in stats:
+                original.merge(s.original[m])
+                replayed.merge(s.replayed[m])
+                mismatch += s.mismatches[m]
+                for kind, n in s.errors[m].items():
+                    errors[kind] = errors.get(kind, 0) + n
+            if not replayed.count:
+                continue
+            ops[m] = OrderedDict([('requests', replayed.count),
+                                  ('errors', sum(errors.values())),
+                                  ('errorcodes', errors),
+                                  ('mismatches', mismatch),
+                                  ('original', _latency(original)),
+                                  ('replayed', _latency(replayed))])
+            mismatches += mismatch
+            for kind, n in errors.items():
+                totalerrors[kind] = totalerrors.get(kind, 0) + n
+        for s in stats:
+            lag.merge(s.lag)
+
+        duration = max([r.start + r.connect + r.wait + r.read - t0
+                        for r in self.records] or [0.0])
+        return OrderedDict([
+            ('target', self.target.fqdn),
+            ('trace', OrderedDict([('requests', len(self.records)),
+                                   ('streams', len(self.streams)),
+                                   ('duration', duration)])),
+            ('speed', self.speed),
+            ('prepared', prepared),
+            ('elapsed', elapsed),
+            ('requests', lag.count),
+            ('errors', sum(totalerrors.values())),
+            ('errorcodes', totalerrors),
+            ('mismatches', mismatches),
+            ('lag', _latency(lag)),
+            ('ops', ops)])
+
+    def __repr__(self):
+        return "<{} class at {}>".format(Replayer.__name__, id(self))
+
+    def __str__(self):
+        return "<{} class for {}>".format(Replayer.__name__,
+                                          self.target.fqdn)
+
+
+def main(argv=None):
+    """
+    The command line interface::
+
+        hcpsdk-replay [--speed N] [--no-prepare] [--retries n]
+                      [-u user -p password] [--port port] [-o report.json]
+                      trace (fqdn | --emulator)
+
+    The report is written as JSON.
+
+    :param argv:    the arguments, *sys.argv[1:]* if *None*
+    :return:        the exit code
+    """
+    parser = argparse.ArgumentParser(
+        prog='hcpsdk-replay',
+        description='Replay a trace recorded by hcpsdk.trace.Recorder.')
+    parser.add_argument('trace', help='the trace file')
+    parser.add_argument('fqdn', nargs='?',
+                        help='the Namespace ([namespace.]tenant.hcp.loc)')
+    parser.add_argument('--emulator', action='store_true',
+                        help='replay against an in-process hcpsdk.emulator')
+    parser.add_argument('-u', '--user', help='the data access user')
+    parser.add_argument('-p', '--password', default='',
+                        help='the password')
+    parser.add_argument('--port', type=int, default=hcpsdk.P_HTTPS,
+                        help='the port (default: %(default)s)')
+    parser.add_argument('--dnscache', action='store_true',
+                        help='use the system resolver')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='the replay speed (default: %(default)s)')
+    parser.add_argument('--no-prepare', dest='prepare', action='store_false',
+                        help="don't write the objects the trace expects to "
+                             "exist")
+    parser.add_argument('--retries', type=int, default=0,
+                        help='retries per Request (default: %(default)s)')
+    parser.add_argument('-o', '--output', type=argparse.FileType('w'),
+                        default=sys.stdout, help='the report file')
+    args = parser.parse_args(argv)
+    if bool(args.fqdn) == args.emulator:
+        parser.error('either fqdn or --emulator is required')
+
+    emulator = None
+    try:
+        if args.emulator:
+            emulator = hcpsdk.emulator.Emulator()
+            emulator.start()
+            target = emulator.target('replay.hcpsdk')
+        else:
+            auth = (hcpsdk.NativeAuthorization(args.user, args.password)
+                    if args.user else hcpsdk.DummyAuthorization())
+            target = hcpsdk.Target(args.fqdn, auth, port=args.port,
+                                   dnscache=args.dnscache)
+        replayer = Replayer(target, args.trace, speed=args.speed,
+                            prepare=args.prepare, retries=args.retries)
+        report = replayer.run()
+    except (OSError, ValueError, TraceError, hcpsdk.HcpsdkError,
+            hcpsdk.ips.IpsError, hcpsdk.emulator.EmulatorError) as e:
+        print('error: {}'.format(e), file=sys.stderr)
+        return 1
+    finally:
+        if emulator:
+            emulator.stop()
+
+    json.dump(report, args.output, indent=2)
+    args.output.write('\n')
+    return 0
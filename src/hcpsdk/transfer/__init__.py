@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2016 Thorsten Simons (sw@snomis.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import hcpsdk
+from collections import OrderedDict, namedtuple
+from concurrent.futures import (ProcessPoolExecutor, ThreadPoolExecutor,
+                                wait)
+from heapq import heapify, heapreplace
+from threading import Lock
+import logging
+import multiprocessing
+import os
+import time
+
+__all__ = ['Progress', 'Transfer', 'walk']
+
+logging.getLogger('hcpsdk.transfer').addHandler(logging.NullHandler())
+
+# the counters each worker keeps in shared memory
+_COUNTERS = ('done', 'failed', 'bytes')
+
+# the chunk size used to read and write files
+_BLOCKSIZE = 2**20
+
+Progress = namedtuple('Progress', ['total', 'done', 'failed', 'bytes',
+                                   'elapsed'])
+Progress.__doc__ = """
+The state of a transfer, handed to the *progress* callback.
+
+:param total:   the number of files to transfer
+:param done:    the number of files transferred
+:param failed:  the number of files failed
+:param bytes:   the number of bytes transferred so far (including files
+                in progress)
+:param elapsed: the seconds since the transfer started
+
+..  versionadded:: 0.9.5.0
+"""
+
+
+def walk(directory, path):
+    """
+    Build the jobs to upload a directory tree.
+
+    :param directory:   the local directory
+    :param path:        the url of the directory to upload to
+                        (*/rest/backup*, for example)
+    :return:            a generator yielding *(file, url)* tuples
+    """
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        rel = os.path.relpath(root, directory)
+        rel = '' if rel == os.curdir else rel.replace(os.sep, '/') + '/'
+        for name in sorted(files):
+            yield (os.path.join(root, name),
+                   '{}/{}{}'.format(path.rstrip('/'), rel, name))
+
+
+class _Reader(object):
+    """
+    Wraps a file object and counts the bytes read from it.
+    """
+
+    def __init__(self, fileobj, count):
+        self.fileobj = fileobj
+        self.count = count
+
+    def read(self, amt=-1):
+        data = self.fileobj.read(amt)
+        self.count(nbytes=len(data))
+        return data
+
+
+def _upload(con, job, count):
+    """
+    Upload a single file.
+
+    :return:    the failure reason, *None* if it succeeded
+    """
+    filename, url = job
+    with open(filename, 'rb') as hdl:
+        size = os.fstat(hdl.fileno()).st_size
+        r = con.PUT(url, _Reader(hdl, count),
+                    headers={'Content-Length': str(size)})
+    con.read()
+    if r.status != 201:
+        return '{} {}'.format(r.status, r.reason)
+
+
+def _download(con, job, count):
+    """
+    Download a single object; a partial file is removed.
+
+    :return:    the failure reason, *None* if it succeeded
+    """
+    url, filename = job
+    r = con.GET(url)
+    if r.status != 200:
+        con.read()
+        return '{} {}'.format(r.status, r.reason)
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    try:
+        with open(filename, 'wb') as hdl:
+            while True:
+                data = con.read(_BLOCKSIZE)
+                if not data:
+                    break
+                hdl.write(data)
+                count(nbytes=len(data))
+    except Exception:
+        os.remove(filename)
+        raise
+
+
+def _share(counters):
+    """
+    Initialize a worker process with the shared counters.
+    """
+    global _counters
+    _counters = counters
+
+
+# the counters shared with the worker processes
+_counters = None
+
+
+def _run(target, kwargs, op, jobs, threads, slot, counters=None):
+    """
+    Transfer a shard of the jobs with a pool of threads, in a worker
+    process (or thread); the shard's counters are kept in *counters* (the
+    shared ones, if *None*) at *slot*.
+
+    :return:    a list of the failed jobs, with the reason appended
+    """
+    counters = _counters if counters is None else counters
+    lock = Lock()
+    base = slot * len(_COUNTERS)
+    func = _upload if op == 'upload' else _download
+    failures = []
+
+    def _count(done=0, failed=0, nbytes=0):
+        with lock:
+            counters[base] += done
+            counters[base + 1] += failed
+            counters[base + 2] += nbytes
+
+    def _do(con, job):
+        try:
+            reason = func(con, job, _count)
+        except Exception as e:
+            con.close()
+            reason = str(e) or type(e).__name__
+        if reason:
+            failures.append(list(job) + [reason])
+            _count(failed=1)
+        else:
+            _count(done=1)
+
+    pool = hcpsdk.ConnectionPool(target, size=threads, **kwargs)
+    try:
+        pool.map(_do, jobs)
+    finally:
+        pool.close()
+    return failures
+
+
+class Transfer(object):
+    """
+    Transfer files to or from a :term:`Namespace` in bulk, using a pool of
+    threads in each of a number of processes - beyond the throughput a
+    single Python process is able to drive.
+
+    The files are distributed to the processes up front, balanced by size
+    for uploads. The processes are started using *multiprocessing*: with
+    the *fork* start method, they inherit the *Target()* (the sessions
+    shared with this process are dropped in the child), with *spawn* or
+    *forkserver*, it's pickled and re-created w/o a DNS query. Each process
+    runs a *ConnectionPool()* of *threads* *Connection()*\\ s. The progress
+    is counted in shared memory and can be watched through a callback.
+
+    With *processes=0*, the files get transferred by threads of this
+    process, only.
+
+    ..  versionadded:: 0.9.5.0
+    """
+
+    def __init__(self, target, processes=None, threads=4, start=None,
+                 interval=1.0, **kwargs):
+        """
+        :param target:      an *hcpsdk.Target()* object; it needs to use the
+                            default *sslcontext* unless *start* is *fork*
+        :param processes:   the number of worker processes; defaults to the
+                            number of CPUs, 0 transfers in the calling
+                            process
+        :param threads:     the number of threads (and *Connection()*\\ s)
+                            per process
+        :param start:       the *multiprocessing* start method (*fork*,
+                            *spawn* or *forkserver*), the platform's
+                            default if *None*
+        :param interval:    the seconds between calls to the *progress*
+                            callback
+        :param kwargs:      keyword arguments passed to *Connection()*
+                            (timeout, retries, verifyhash, ...)
+        :raises:            *ValueError* on invalid arguments
+        """
+        self.logger = logging.getLogger(__name__ + '.Transfer')
+        if processes is not None and processes < 0:
+            raise ValueError('processes needs to be 0 or more')
+        if threads < 1:
+            raise ValueError('threads needs to be 1 or more')
+        self.target = target
+        self.processes = (os.cpu_count() or 1) if processes is None \
+            else processes
+        self.threads = threads
+        self.interval = interval
+        self.kwargs = kwargs
+        self.__context = multiprocessing.get_context(start)
+
+    def upload(self, jobs, progress=None):
+        """
+        Upload files.
+
+        :param jobs:        an iterable of *(file, url)* tuples (see
+                            *walk()*)
+        :param progress:    a callable that is called with a *Progress()*
+                            object every *interval* seconds and when
+                            finished
+        :return:            the report, a dict ready to be dumped as JSON
+        """
+        jobs = [tuple(job) for job in jobs]
+        sizes = []
+        for filename, url in jobs:
+            try:
+                sizes.append(os.stat(filename).st_size)
+            except OSError:
+                sizes.append(0)  # will fail when it's transferred
+        return self._transfer('upload', jobs, sizes, progress)
+
+    def download(self, jobs, progress=None):
+        """
+        Download objects; missing directories get created, existing files
+        overwritten.
+
+        :param jobs:        an iterable of *(url, file)* tuples
+        :param progress:    see *upload()*
+        :return:            the report, a dict ready to be dumped as JSON
+        """
+        jobs = [tuple(job) for job in jobs]
+        return self._transfer('download', jobs, None, progress)
+
+    def _shard(self, jobs, sizes, n):
+        """
+        Distribute the jobs to *n* shards - round-robin, or balanced by
+        *sizes*, if given (largest first, each to the smallest shard).
+        """
+        shards = [[] for i in range(n)]
+        if sizes is None:
+            for i, job in enumerate(jobs):
+                shards[i % n].append(job)
+            return shards
+        heap = [(0, i) for i in range(n)]
+        heapify(heap)
+        for size, job in sorted(zip(sizes, jobs), key=lambda x: -x[0]):
+            total, i = heap[0]
+            shards[i].append(job)
+            heapreplace(heap, (total + size, i))
+        return shards
+
+    def _transfer(self, op, jobs, sizes, progress):
+        """
+        Run the workers and collect their results.
+        """
+        n = max(1, min(self.processes, len(jobs))) if self.processes else 1
+        shards = self._shard(jobs, sizes, n)
+        if self.processes:
+            counters = self.__context.Array('q', n * len(_COUNTERS),
+                                            lock=False)
+            executor = ProcessPoolExecutor(max_workers=n,
+                                           mp_context=self.__context,
+                                           initializer=_share,
+                                           initargs=(counters,))
+            args = [(self.target, self.kwargs, op, shards[i],
+                     self.threads, i) for i in range(n)]
+        else:
+            counters = [0] * len(_COUNTERS)
+            executor = ThreadPoolExecutor(max_workers=1)
+            args = [(self.target, self.kwargs, op, shards[0], self.threads,
+                     0, counters)]
+
+        start = time.time()
+        failures = []
+        with executor:
+            pending = {executor.submit(_run, *a) for a in args}
+            while pending:
+                done, pending = wait(pending, timeout=self.interval)
+                for future in done:
+                    try:
+                        failures.extend(future.result())
+                    except Exception as e:
+                        # the files of the shard are left in an unknown
+                        # state (the worker process died, for example)
+                        self.logger.warning('worker failed: {}'.format(e))
+                if progress and pending:
+                    progress(self._progress(counters, jobs, start))
+        elapsed = max(time.time() - start, 0.000001)
+
+        p = self._progress(counters, jobs, start)
+        if progress:
+            progress(p)
+        return OrderedDict([
+            ('operation', op),
+            ('processes', n if self.processes else 0),
+            ('threads', self.threads),
+            ('files', len(jobs)),
+            ('done', p.done),
+            ('failed', p.failed),
+            ('lost', len(jobs) - p.done - p.failed),
+            ('bytes', p.bytes),
+            ('elapsed', elapsed),
+            ('throughput', OrderedDict([('files', p.done / elapsed),
+                                        ('bytes', p.bytes / elapsed)])),
+            ('failures', failures)])
+
+    @staticmethod
+    def _progress(counters, jobs, start):
+        """
+        Sum up the workers' counters.
+        """
+        values = list(counters)
+        width = len(_COUNTERS)
+        return Progress(len(jobs), sum(values[0::width]),
+                        sum(values[1::width]), sum(values[2::width]),
+                        time.time() - start)
+
+    def __repr__(self):
+        return "<{} class at {}>".format(Transfer.__name__, id(self))
+
+    def __str__(self):
+        return "<{} class for {} ({} processes x {} threads)>".format(
+            Transfer.__name__, self.target.fqdn, self.processes,
+            self.threads)
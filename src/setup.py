@@ -116,7 +116,8 @@ setup(
     # To provide executable scripts, use entry points in preference to the
     # "scripts" keyword. Entry points provide cross-platform support and allow
     # pip to create the appropriate form of executable for the Target platform.
-    # entry_points={
-    #               'console_scripts': ['sample=sample:main',],
-    #               },
+    entry_points={
+                  'console_scripts': ['hcpsdk-bench=hcpsdk.bench:main',
+                                      'hcpsdk-replay=hcpsdk.trace:main',],
+                  },
 )
@@ -1,224 +1,77 @@
-import sys
-from os.path import join, normpath
-import concurrent.futures
-import time
-import pprint
-import hcpsdk
-
-T_NAMESPACE = 'n1.m.hcp73.archivas.com'
-T_DAAC      = 'n'
-T_DAAC_PWD  = 'n01'
-T_PORT      = 443
-
-T_THREADS        = 10          # no. of threads to use in parallel
-T_OBJ            = 128            # the object we will use in a run (from objs)
-T_CNT_PER_THREAD = 100          # how often the object will be written
-T_OUTNAME   = '_hcp_loadtest'   # filename to be used
-T_STARTPATH = '/rest/_hcp_loadtest/'    # path to write to
-
-# a names of the source objects
-T_OBJS = {     1: '1kbfile',
-               8: '8kbfile',
-              16: '16kbfile',
-              32: '32kbfile',
-              64: '64kbfile',
-             128: '128kbfile',
-             256: '256kbfile',
-             512: '512kbfile',
-            1024: '1mbfile',
-           10240: '10mbfile',
-          102400: '100mbfile'}
-
+"""
+Write, read and delete objects of a fixed size with a number of parallel
+threads, and report throughput and latencies for each of the phases.
 
-def t_write(connection, tgtpaths, buffer):
-    '''
-    Write a set of objects
-    :param connection: the http connection to be used
-    :param tgtpaths: a list of target paths
-    :param buffer: the bytesarray holding the object
-    :return: (overall service tme, no. of objs processed)
-    '''
-    sumtime = 0.0
-    sumobjs = 0
-    for i in tgtpaths:
-        try:
-            r = connection.request('PUT', i, buffer)
-        except Exception as e:
-            print('Exception: {}'.format(str(e)))
-        else:
-            connection.read()
-            sumtime += connection.service_time2
-            sumobjs += 1
+Runs against an in-process hcpsdk.emulator, unless a Namespace is given:
 
-    return(sumtime, sumobjs)
+    python3 loadtest.py [-u user -p password] [--port 443] [fqdn]
 
-def t_read(connection, tgtpaths):
-    '''
-    Read a set of objects
-    :param buffer: the bytesarray holding the object
-    :param connection: the http connection to be used
-    :param tgtpaths: a list of target paths
-    :return: (overall service tme, no. of objs processed)
-    '''
-    sumtime = 0.0
-    sumobjs = 0
-    for i in tgtpaths:
-        try:
-            r = connection.request('GET', i)
-        except Exception as e:
-            print('Exception: {}'.format(str(e)))
-        else:
-            connection.read()
-            sumtime += connection.service_time2
-            sumobjs += 1
-
-    return(sumtime, sumobjs)
-
-def t_delete(connection, tgtpaths):
-    '''
-    Delete a set of objects
-    :param buffer: the bytesarray holding the object
-    :param connection: the http connection to be used
-    :param tgtpaths: a list of target paths
-    :return: (overall service tme, no. of objs processed)
-    '''
-    sumtime = 0.0
-    sumobjs = 0
-    for i in tgtpaths:
-        try:
-            r = connection.request('DELETE', i)
-        except Exception as e:
-            print('Exception: {}'.format(str(e)))
-        else:
-            connection.read()
-            sumtime += connection.service_time2
-            sumobjs += 1
+The work is done by hcpsdk.bench; use the hcpsdk-bench command for other
+workloads.
+"""
+import sys
+import os.path
+sys.path.insert(0, os.path.abspath('..'))
+import argparse
+import hcpsdk
+from hcpsdk.bench import Bench, Workload
 
-    return(sumtime, sumobjs)
+T_THREADS   = 10              # no. of threads to use in parallel
+T_OBJSIZE   = '128k'          # the size of the objects written
+T_DURATION  = 10              # seconds per phase
+T_STARTPATH = '/rest/_hcp_loadtest'    # path to write to
 
+# the phases, with the operations they run
+T_PHASES = [('ingest', {'PUT': 1}),
+            ('read', {'GET': 1}),
+            ('delete', {'DELETE': 1})]
 
 
 if __name__ == '__main__':
-    # the place where we will find the needed source objects
-    if sys.platform == 'win32':
-        T_INPATH = 'd:\\__files'
-    elif sys.platform == 'darwin':
-        T_INPATH = '/Volumes/dev/__files'
+    parser = argparse.ArgumentParser(description='HCP load test')
+    parser.add_argument('fqdn', nargs='?', help='the Namespace to use')
+    parser.add_argument('-u', '--user', default='n')
+    parser.add_argument('-p', '--password', default='n01')
+    parser.add_argument('--port', type=int, default=hcpsdk.P_HTTPS)
+    args = parser.parse_args()
+
+    emulator = None
+    if args.fqdn:
+        target = hcpsdk.Target(args.fqdn,
+                               hcpsdk.NativeAuthorization(args.user,
+                                                          args.password),
+                               port=args.port)
     else:
-        sys.exit('source path is undefined')
-
-    # the paths in which we will store the objects
-    T_PATHS = {}
-    for i in range (0, 256):
-        T_PATHS[i] = normpath('{}/p{:03}'.format(T_STARTPATH, i))
+        emulator = hcpsdk.emulator.Emulator()
+        emulator.start()
+        target = emulator.target('n1.m')
 
-    print("--> Init <hcptarget> object")
+    # each phase works in a directory of its own; the read and delete
+    # phases preload as many objects as the ingest phase managed to write
+    preload = 0
     try:
-        hcptarget = hcpsdk.target(T_NAMESPACE, T_DAAC, T_DAAC_PWD, T_PORT)
-    except hcpsdk.HcpsdkError as e:
-        sys.exit("Fatal: {}".format(e.errText))
-
-    input('==> Press Enter to start the process: ')
-
-    print("--> Init {} <connection> object(s)".format(T_THREADS))
-    conns = []
-    conntimes = 0.0
-    outer_contime = time.time()
-    for i in range(0, T_THREADS):
-        try:
-            conns.append(hcpsdk.connection(hcptarget, debuglevel=0))
-        except Exception as e:
-            sys.exit('Exception: {}'.format(str(e)))
-        else:
-            conntimes += conns[i].connect_time
-    outer_contime = time.time() - outer_contime
-
-    print('\tAverage inner connection time: {:,.5f}'.format(conntimes/T_THREADS))
-    print('\tAverage outer connection time: {:,.5f}'.format(outer_contime))
-
-    # load one of the files into memory
-    print('--> Loading test object into memory - ', end='')
-    with open(join(T_INPATH,T_OBJS[T_OBJ]), 'rb') as inHdl:
-        buf = bytearray(inHdl.read())
-        size = len(buf)
-        print('object size = {}'.format(size))
-
-    # Create the output paths
-    outpaths = {}
-    for i in range(0, T_THREADS):
-        outpaths[i] = []
-        for j in range(0, T_CNT_PER_THREAD):
-            outpaths[i].append(join(T_STARTPATH, 't-{:03}'.format(i), '{}.{:03}'.format(T_OUTNAME, j)))
-
-    # now write the objects...
-    print('--> Now ingesting objects:')
-    sumtime = 0.0
-    sumobjs = 0
-    outer_contime = time.time()
-    with concurrent.futures.ThreadPoolExecutor(max_workers=T_THREADS) as executor:
-        f = {executor.submit(t_write, conns[i], outpaths[i], buf): i for i in range(0,T_THREADS)}
-        for future in concurrent.futures.as_completed(f):
-            try:
-                (stime, sobjs) = future.result()
-            except Exception as exc:
-                print('t-{} generated an exception: {}'.format('...', exc))
-            else:
-                sumtime += stime
-                sumobjs += sobjs
-    outer_contime = time.time() - outer_contime
-    print('\t        Inner summary time:  {:,.5f} ({} objects)'.format(sumtime, sumobjs))
-    print('\tAverage inner service time:  {:,.5f} ({:5,.2f} Mb/sec)'.format(sumtime / T_THREADS / sumobjs,
-                                                                          (T_THREADS*sumobjs*size)/sumtime/1024/1024),
-          flush=True)
-    print('\tAverage outer service time:  {:,.5f} ({:5,.2f} Mb/sec)'.format(outer_contime,
-                                                                          (T_THREADS*sumobjs*size)/outer_contime/1024/1024),
-          flush=True)
-
-    # now reading the objects...
-    print('--> Now reading objects:')
-    sumtime = 0.0
-    sumobjs = 0
-    outer_contime = time.time()
-    with concurrent.futures.ThreadPoolExecutor(max_workers=T_THREADS) as executor:
-        f = {executor.submit(t_read, conns[i], outpaths[i]): i for i in range(0,T_THREADS)}
-        for future in concurrent.futures.as_completed(f):
-            try:
-                (stime, sobjs) = future.result()
-            except Exception as exc:
-                print('t-{} generated an exception: {}'.format('...', exc))
-            else:
-                sumtime += stime
-                sumobjs += sobjs
-    outer_contime = time.time() - outer_contime
-    print('\t        Inner summary time:  {:,.5f} ({} objects)'.format(sumtime, sumobjs))
-    print('\tAverage inner service time:  {:,.5f} ({:5,.2f} Mb/sec)'.format(sumtime / T_THREADS / sumobjs,
-                                                                          (T_THREADS*sumobjs*size)/sumtime/1024/1024),
-          flush=True)
-    print('\tAverage outer service time:  {:,.5f} ({:5,.2f} Mb/sec)'.format(outer_contime,
-                                                                          (T_THREADS*sumobjs*size)/outer_contime/1024/1024),
-          flush=True)
-
-    # now deleting objects...
-    print('--> Now deleting objects:')
-    sumtime = 0.0
-    sumobjs = 0
-    outer_contime = time.time()
-    with concurrent.futures.ThreadPoolExecutor(max_workers=T_THREADS) as executor:
-        f = {executor.submit(t_delete, conns[i], outpaths[i]): i for i in range(0,T_THREADS)}
-        for future in concurrent.futures.as_completed(f):
-            try:
-                (stime, sobjs) = future.result()
-            except Exception as exc:
-                print('t-{} generated an exception: {}'.format('...', exc))
-            else:
-                sumtime += stime
-                sumobjs += sobjs
-    outer_contime = time.time() - outer_contime
-    print('\t        Inner summary time:  {:,.5f} ({} objects)'.format(sumtime, sumobjs))
-    print('\tAverage inner service time:  {:,.5f}'.format(sumtime / T_THREADS / sumobjs))
-    print('\tAverage outer service time:  {:,.5f}'.format(outer_contime))
-
-
-    # close the session
-    for con in conns:
-        con.close()
+        for phase, mix in T_PHASES:
+            workload = Workload(mix=mix, sizes=T_OBJSIZE,
+                                concurrency=T_THREADS, duration=T_DURATION,
+                                warmup=0, path=T_STARTPATH, preload=preload)
+            bench = Bench(target, workload)
+            report = bench.run()
+            bench.close()
+            # a phase running out of objects writes new ones, which are
+            # reported separately
+            result = report['ops'][list(mix)[0]]
+            if not preload:
+                preload = max(result['operations'], 1)
+
+            print('--> {}: {} objects, {} errors'
+                  .format(phase, result['operations'], result['errors']))
+            print('\tthroughput: {:,.1f} objects/sec ({:,.2f} MB/sec)'
+                  .format(result['throughput']['ops'],
+                          result['throughput']['bytes'] / 2**20))
+            print('\tlatency:    ' +
+                  ' - '.join('{} {:,.5f}'.format(k, v or 0.0)
+                             for k, v in result['latency'].items()),
+                  flush=True)
+    finally:
+        if emulator:
+            emulator.stop()
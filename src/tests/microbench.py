@@ -0,0 +1,396 @@
+"""
+Measure the client side cost of hcpsdk's hot paths - CPU and wall clock
+time per call, in microseconds - against an in-process, zero-latency
+hcpsdk.emulator, and keep track of the results over time.
+
+    python3 microbench.py [--quick] [--filter request] [--threshold 20]
+                          [--history microbench.jsonl]
+
+CPU time is measured per thread (time.thread_time()), so the time the
+emulator's threads spend serving the Requests doesn't count. On Pythons
+lacking it, the process' CPU time is used, which includes the emulator.
+Each benchmark is repeated and the fastest run is reported.
+
+The results are appended to the history file (one JSON record per line)
+and compared with the latest result recorded per benchmark; the exit code
+is 1 if a benchmark got slower (CPU time) by more than --threshold
+percent.
+
+The info.* benchmarks measure namespace.Info's queries including the
+Request; the info.parse.* benchmarks feed the XML (captured from the
+emulator once) straight into Info's parsing code, w/o any Request.
+"""
+import sys
+import os.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                '..')))
+import argparse
+import itertools
+import json
+import platform
+import time
+from collections import OrderedDict
+from threading import Thread
+
+import hcpsdk
+from hcpsdk.pathbuilder import PathBuilder
+
+CLOCK = getattr(time, 'thread_time', time.process_time)
+
+T_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         'microbench.jsonl')
+T_REPEAT = 5              # runs per benchmark, the fastest one counts
+T_BODY = b'x' * 64        # the body of small objects
+T_LARGE = 2**20           # the size of the object read in chunks
+T_NAMES = itertools.count()
+
+# name: (setup function or None, benchmark function, calls per run)
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(name, n, setup=None):
+    """
+    Register a benchmark function; it's called as *func(ctx, n, state)*,
+    *state* being what *setup(ctx, n)* returned. If it returns a number,
+    that is taken as the CPU time used (for benchmarks running threads).
+    """
+    def _register(func):
+        BENCHMARKS[name] = (setup, func, n)
+        return func
+    return _register
+
+
+class Context(object):
+    """
+    The emulator and the objects the benchmarks work with.
+    """
+
+    def __init__(self):
+        self.emulator = hcpsdk.emulator.Emulator(nodes=4)
+        self.emulator.start()
+        self.target = self.emulator.target('n1.mb',
+                                           hcpsdk.NativeAuthorization('n',
+                                                                      'n01'))
+        self.con = hcpsdk.Connection(self.target)
+        self.put('/rest/mb/small', T_BODY)
+        self.put('/rest/mb/large', b'x' * T_LARGE)
+        self.info = hcpsdk.namespace.Info(self.target, size=1)
+        self.canned = Canned(self.con, ['/proc/statistics', '/proc',
+                                        '/proc/retentionClasses',
+                                        '/proc/permissions'])
+
+    def put(self, url, body):
+        r = self.con.PUT(url, body)
+        self.con.read()
+        if r.status != 201:
+            sys.exit('setup failed: PUT {} - {}'.format(url, r.status))
+
+    def close(self):
+        self.info.close()
+        self.con.close()
+        self.emulator.stop()
+
+
+class Canned(object):
+    """
+    Stands in for a *Connection()* (and its *Response*), answering GETs
+    with XML captured from the emulator, so that namespace.Info's parsing
+    code can be measured w/o a Request.
+    """
+
+    status = 200
+    connect_time = service_time2 = 0.0
+
+    def __init__(self, con, urls):
+        self.bodies = {}
+        for url in urls:
+            r = con.GET(url)
+            self.bodies[url] = con.read()
+            if r.status != 200:
+                sys.exit('setup failed: GET {} - {}'.format(url, r.status))
+        self.body = None
+
+    def GET(self, url, params=None):
+        self.body = self.bodies[url]
+        return self
+
+    def read(self):
+        return self.body
+
+
+# Connection.request() per method
+@benchmark('request.PUT', 500)
+def b_put(ctx, n, state):
+    for i in range(n):
+        ctx.con.PUT('/rest/mb/put/{}'.format(next(T_NAMES)), T_BODY)
+        ctx.con.read()
+
+
+@benchmark('request.GET', 500)
+def b_get(ctx, n, state):
+    for i in range(n):
+        ctx.con.GET('/rest/mb/small')
+        ctx.con.read()
+
+
+@benchmark('request.HEAD', 500)
+def b_head(ctx, n, state):
+    for i in range(n):
+        ctx.con.HEAD('/rest/mb/small')
+        ctx.con.read()
+
+
+@benchmark('request.POST', 500)
+def b_post(ctx, n, state):
+    for i in range(n):
+        ctx.con.POST('/rest/mb/small', params={'index': 'true'})
+        ctx.con.read()
+
+
+def s_delete(ctx, n):
+    urls = ['/rest/mb/del/{}'.format(next(T_NAMES)) for i in range(n)]
+    for url in urls:
+        ctx.put(url, T_BODY)
+    return urls
+
+
+@benchmark('request.DELETE', 500, setup=s_delete)
+def b_delete(ctx, n, urls):
+    for url in urls:
+        ctx.con.DELETE(url)
+        ctx.con.read()
+
+
+# read() chunk sizes, reading a 1 MiB object
+def _read(ctx, n, amt):
+    for i in range(n):
+        ctx.con.GET('/rest/mb/large')
+        while ctx.con.read(amt):
+            pass
+
+
+@benchmark('read.4k', 50)
+def b_read4k(ctx, n, state):
+    _read(ctx, n, 2**12)
+
+
+@benchmark('read.64k', 50)
+def b_read64k(ctx, n, state):
+    _read(ctx, n, 2**16)
+
+
+@benchmark('read.1m', 50)
+def b_read1m(ctx, n, state):
+    _read(ctx, n, 2**20)
+
+
+@benchmark('read.all', 50)
+def b_readall(ctx, n, state):
+    for i in range(n):
+        ctx.con.GET('/rest/mb/large')
+        ctx.con.read()
+
+
+# ips.Circle._addr(), with threads competing for the lock
+def _addr(ctx, n, threads):
+    circle = ctx.target.ipaddrqry
+    cpu = [0.0] * threads
+
+    def _run(no):
+        c = CLOCK()
+        for i in range(n // threads):
+            circle._addr()
+        cpu[no] = CLOCK() - c
+
+    workers = [Thread(target=_run, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return sum(cpu)
+
+
+@benchmark('circle._addr.1', 20000)
+def b_addr1(ctx, n, state):
+    return _addr(ctx, n, 1)
+
+
+@benchmark('circle._addr.4', 20000)
+def b_addr4(ctx, n, state):
+    return _addr(ctx, n, 4)
+
+
+@benchmark('circle._addr.16', 20000)
+def b_addr16(ctx, n, state):
+    return _addr(ctx, n, 16)
+
+
+# PathBuilder
+@benchmark('pathbuilder.getunique', 10000)
+def b_getunique(ctx, n, state):
+    p = PathBuilder(initialpath='/rest/mb')
+    for i in range(n):
+        p.getunique('testfile.txt')
+
+
+@benchmark('pathbuilder.getunique.annotation', 10000)
+def b_getunique_annotation(ctx, n, state):
+    p = PathBuilder(initialpath='/rest/mb', annotation=True)
+    for i in range(n):
+        p.getunique('testfile.txt')
+
+
+# authorization headers
+@benchmark('auth.NativeAuthorization', 10000)
+def b_nativeauth(ctx, n, state):
+    for i in range(n):
+        hcpsdk.NativeAuthorization('n', 'n01')
+
+
+@benchmark('auth.Target.headers', 10000)
+def b_headers(ctx, n, state):
+    for i in range(n):
+        ctx.target.headers
+
+
+# namespace.Info (Request plus XML parsing)
+@benchmark('info.nsstatistics', 300)
+def b_nsstatistics(ctx, n, state):
+    for i in range(n):
+        ctx.info.nsstatistics()
+
+
+@benchmark('info.listaccessiblens', 300)
+def b_listaccessiblens(ctx, n, state):
+    for i in range(n):
+        ctx.info.listaccessiblens(all=True)
+
+
+@benchmark('info.listretentionclasses', 300)
+def b_listretentionclasses(ctx, n, state):
+    for i in range(n):
+        ctx.info.listretentionclasses()
+
+
+@benchmark('info.listpermissions', 300)
+def b_listpermissions(ctx, n, state):
+    for i in range(n):
+        ctx.info.listpermissions()
+
+
+# namespace.Info XML parsing, fed with canned XML
+@benchmark('info.parse.nsstatistics', 3000)
+def b_parse_nsstatistics(ctx, n, state):
+    for i in range(n):
+        ctx.info._nsstatistics(ctx.canned)
+
+
+@benchmark('info.parse.listaccessiblens', 3000)
+def b_parse_listaccessiblens(ctx, n, state):
+    for i in range(n):
+        ctx.info._listaccessiblens(ctx.canned, all=True)
+
+
+@benchmark('info.parse.listretentionclasses', 3000)
+def b_parse_listretentionclasses(ctx, n, state):
+    for i in range(n):
+        ctx.info._listretentionclasses(ctx.canned)
+
+
+@benchmark('info.parse.listpermissions', 3000)
+def b_parse_listpermissions(ctx, n, state):
+    for i in range(n):
+        ctx.info._listpermissions(ctx.canned)
+
+
+def run(ctx, name, scale, repeat):
+    """
+    Run a benchmark *repeat* times.
+
+    :return:    a dict holding the CPU and wall clock time per call of the
+                fastest run (in microseconds) and the number of calls
+    """
+    setup, func, n = BENCHMARKS[name]
+    n = max(1, int(n * scale))
+    best = None
+    for r in range(repeat):
+        state = setup(ctx, n) if setup else None
+        w = time.perf_counter()
+        c = CLOCK()
+        cpu = func(ctx, n, state)
+        c = CLOCK() - c
+        w = time.perf_counter() - w
+        if cpu is not None:
+            c = cpu
+        if not best or c < best[0]:
+            best = (c, w)
+    return OrderedDict([('cpu', best[0] / n * 10**6),
+                        ('wall', best[1] / n * 10**6),
+                        ('n', n)])
+
+
+def previous(history):
+    """
+    Get the latest result of each benchmark recorded in the history file.
+    """
+    last = {}
+    if os.path.exists(history):
+        with open(history) as hdl:
+            for line in hdl:
+                if line.strip():
+                    last.update(json.loads(line)['results'])
+    return last
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='hcpsdk microbenchmarks')
+    parser.add_argument('--quick', action='store_true',
+                        help='run a tenth of the calls, only')
+    parser.add_argument('--filter', default='',
+                        help='run the benchmarks whose name contains this')
+    parser.add_argument('--threshold', type=float, default=20.0,
+                        help='the CPU time increase (percent) reported as '
+                             'regression (default: %(default)s)')
+    parser.add_argument('--history', default=T_HISTORY,
+                        help='the history file (default: %(default)s)')
+    parser.add_argument('--no-history', dest='record', action='store_false',
+                        help="don't record the results")
+    args = parser.parse_args()
+
+    last = previous(args.history)
+    ctx = Context()
+    results = OrderedDict()
+    regressions = []
+    print('{:35} {:>7} {:>11} {:>11} {:>8}'
+          .format('benchmark', 'calls', 'cpu us', 'wall us', 'cpu +/-'))
+    try:
+        for name in BENCHMARKS:
+            if args.filter not in name:
+                continue
+            results[name] = run(ctx, name, 0.1 if args.quick else 1.0,
+                                T_REPEAT)
+            change = ''
+            if name in last and last[name]['cpu']:
+                pct = (results[name]['cpu'] / last[name]['cpu'] - 1) * 100
+                change = '{:+.1f}%'.format(pct)
+                if pct > args.threshold:
+                    regressions.append(name)
+                    change += ' !'
+            print('{:35} {:7} {:11.1f} {:11.1f} {:>8}'
+                  .format(name, results[name]['n'], results[name]['cpu'],
+                          results[name]['wall'], change), flush=True)
+    finally:
+        ctx.close()
+
+    if args.record:
+        with open(args.history, 'a') as hdl:
+            hdl.write(json.dumps(OrderedDict([
+                ('time', time.strftime('%Y-%m-%dT%H:%M:%S')),
+                ('version', hcpsdk.version()),
+                ('python', platform.python_version()),
+                ('clock', CLOCK.__name__),
+                ('results', results)])) + '\n')
+
+    if regressions:
+        print('regressions: {}'.format(', '.join(regressions)))
+        sys.exit(1)
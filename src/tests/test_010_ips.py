@@ -62,6 +62,22 @@ class TestHcpsdk_10_1_Ips(unittest.TestCase):
         with self.assertRaises(ips.IpsError):
             ips.Circle(fqdn=it.P_NS_BAD, port=it.P_PORT, dnscache=it.P_DNSCACHE)
 
+    def test_1_30_resolver(self):
+        """
+        Make sure a registered resolver is asked before DNS
+        """
+        print('test_1_30_resolver')
+        def resolver(fqdn):
+            return ['192.0.2.1', '192.0.2.2'] if fqdn == it.P_NS_BAD else None
+
+        ips.addresolver(resolver)
+        try:
+            c = ips.Circle(fqdn=it.P_NS_BAD, port=it.P_PORT, dnscache=False)
+            self.assertEqual(c._addresses, ['192.0.2.1', '192.0.2.2'])
+        finally:
+            ips.removeresolver(resolver)
+        self.assertTrue(ips.query(it.P_NS_BAD, cache=True).raised)
+
 
 if __name__ == '__main__':
     unittest.main()
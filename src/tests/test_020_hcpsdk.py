@@ -29,6 +29,7 @@ import unittest
 import ssl
 import socket
 import http.client
+import hashlib
 from pprint import pprint
 
 import init_tests as it
@@ -111,6 +112,66 @@ class TestHcpsdk_02_Access_http(unittest.TestCase):
         self.assertEqual(r.status, 200)
 
 
+class TestHcpsdk_04_Access_Hash(unittest.TestCase):
+    '''
+    Make sure hashes are calculated and verified on the fly
+    '''
+    def setUp(self):
+        self.T_HCPFILE = '/rest/hcpsdk/TestHCPsdk_20_hash'
+        self.T_BUF = b'0123456789ABCDEF' * 4096
+        self.hcptarget = hcpsdk.Target(it.P_NS_GOOD, it.P_AUTH, it.P_PORT,
+                                       dnscache=it.P_DNSCACHE)
+        self.con = hcpsdk.Connection(self.hcptarget, verifyhash=True)
+
+    def tearDown(self):
+        self.con.close()
+        del self.hcptarget
+
+    def test_04_10_put(self):
+        """
+        Ingest a file, verifying its hash
+        """
+        r = self.con.PUT(self.T_HCPFILE, self.T_BUF)
+        self.assertEqual(r.status, 201)
+        self.assertEqual(self.con.hash,
+                         hashlib.sha256(self.T_BUF).hexdigest().upper())
+
+    def test_04_20_get(self):
+        """
+        Read a file in chunks, verifying its hash
+        """
+        r = self.con.GET(self.T_HCPFILE)
+        self.assertEqual(r.status, 200)
+        while self.con.read(2**12):
+            pass
+        self.assertEqual(self.con.hash,
+                         hashlib.sha256(self.T_BUF).hexdigest().upper())
+
+    def test_04_90_delete(self):
+        """
+        Delete a file
+        """
+        r = self.con.DELETE(self.T_HCPFILE)
+        self.assertEqual(r.status, 200)
+
+    def test_04_95_unknown_scheme(self):
+        """
+        Make sure an unknown hash scheme is refused
+        """
+        with self.assertRaises(ValueError):
+            hcpsdk.Connection(self.hcptarget, verifyhash=True,
+                              hashscheme='CRC-32')
+
+    def test_04_96_unverifiable_scheme(self):
+        """
+        Make sure a response hashed with an unknown scheme isn't refused
+        """
+        self.con._checkhash(hashlib.sha256(self.T_BUF), 'CRC-32 0A1B2C3D',
+                            self.T_HCPFILE)
+        self.assertEqual(self.con.hash,
+                         hashlib.sha256(self.T_BUF).hexdigest().upper())
+
+
 # @unittest.skip("skip TestHcpsdk_03_Access_Fail")
 class TestHcpsdk_03_Access_Fail(unittest.TestCase):
     '''
@@ -234,5 +295,86 @@ class TestHcpsdk_10_Errors(unittest.TestCase):
 
 
 
+# @unittest.skip("skip TestHcpsdk_05_Cluster")
+class TestHcpsdk_05_Cluster(unittest.TestCase):
+    def setUp(self):
+        self.cluster = hcpsdk.Cluster('localhost', port=it.P_PORT,
+                                      dnscache=True)
+        self.t1 = self.cluster.target('n1.t.localhost', it.P_AUTH)
+        self.t2 = self.cluster.target('n2.t.localhost',
+                                      hcpsdk.DummyAuthorization())
+
+    def tearDown(self):
+        self.cluster.close()
+
+    def test_05_10_shared_addresses(self):
+        """
+        Make sure the Targets of a cluster share its IP address cache
+        """
+        self.assertIs(self.t1.cluster, self.cluster)
+        self.assertIs(self.t1.ipaddrqry, self.cluster.ipaddrqry)
+        self.assertIs(self.t2.ipaddrqry, self.cluster.ipaddrqry)
+        self.assertEqual(self.t1.port, it.P_PORT)
+        self.assertEqual(self.t1.headers['Host'], 'n1.t.localhost')
+        self.assertEqual(self.t2.headers['Host'], 'n2.t.localhost')
+
+    def test_05_20_shared_connections(self):
+        """
+        Make sure an idle Connection is handed over to another Target's pool
+        """
+        p1 = hcpsdk.ConnectionPool(self.t1, size=2)
+        p2 = hcpsdk.ConnectionPool(self.t2, size=2)
+        con = p1.acquire()
+        p1.release(con)
+        con2 = p2.acquire()
+        self.assertIs(con2, con)
+        self.assertEqual(str(con2),
+                         '<Connection class initialized for fqdn '
+                         'n2.t.localhost @ None>')
+        p2.release(con2)
+        # different Connection arguments don't share
+        p3 = hcpsdk.ConnectionPool(self.t1, size=2, timeout=5)
+        con3 = p3.acquire()
+        self.assertIsNot(con3, con)
+        p3.release(con3)
+
+    def test_05_25_close_shared(self):
+        """
+        Make sure a pool closes its share of the idle Connections, only,
+        and that the shared idle queue is capped
+        """
+        cluster = hcpsdk.Cluster('localhost', port=it.P_PORT, dnscache=True,
+                                 maxidle=1)
+        p1 = hcpsdk.ConnectionPool(cluster.target('n1.t.localhost',
+                                                  it.P_AUTH), size=2)
+        p2 = hcpsdk.ConnectionPool(cluster.target('n2.t.localhost',
+                                                  it.P_AUTH), size=2)
+        c1 = p1.acquire()
+        p1.release(c1)
+        p1.close()
+        c2 = p2.acquire()
+        self.assertIsNot(c2, c1)
+        p2.release(c2)
+        p1.close()
+        self.assertIs(p2.acquire(), c2)
+        # the 2nd idle Connection is closed instead of being queued
+        c3 = p2.acquire()
+        p2.release(c2)
+        p2.release(c3)
+        self.assertIs(p2.acquire(), c2)
+        self.assertIsNot(p2.acquire(), c3)
+        cluster.close()
+
+    def test_05_30_foreign_target(self):
+        """
+        Make sure a Connection can't be moved to a Target outside its cluster
+        """
+        con = hcpsdk.Connection(self.t1)
+        with self.assertRaises(ValueError):
+            con._settarget(hcpsdk.Target('localhost', it.P_AUTH,
+                                         port=it.P_PORT, dnscache=True))
+        con.close()
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -42,6 +42,7 @@ class TestHcpsdk_30_1_NamespaceInfo_NS_GOOD(unittest.TestCase):
         self.nso = hcpsdk.namespace.Info(self.hcptarget)
 
     def tearDown(self):
+        self.nso.close()
         del self.hcptarget
 
     # @unittest.skip("demonstrating skipping")
@@ -101,5 +102,99 @@ class TestHcpsdk_30_1_NamespaceInfo_NS_GOOD(unittest.TestCase):
                                     'userEffectivePermissions'])
 
 
+class TestHcpsdk_30_3_NamespaceInfo_Cached(unittest.TestCase):
+    def setUp(self):
+        self.hcptarget = hcpsdk.Target(it.P_NS_GOOD, it.P_AUTH, port=it.P_PORT, dnscache=it.P_DNSCACHE)
+        self.nso = hcpsdk.namespace.Info(self.hcptarget, ttl=60)
+
+    def tearDown(self):
+        self.nso.close()
+        del self.hcptarget
+
+    def test_3_10_cached(self):
+        print('test_3_10_cached')
+        r1 = self.nso.listpermissions()
+        r2 = self.nso.listpermissions()
+        self.assertEqual(r1, r2)
+        self.assertIsNot(r1, r2)
+        self.nso.invalidate()
+        self.assertEqual(r1, self.nso.listpermissions())
+
+    def test_3_20_refresh(self):
+        print('test_3_20_refresh')
+        r = self.nso.refresh()
+        pprint(r)
+        self.assertEqual(sorted(r.keys()), ['listaccessiblens',
+                                            'listpermissions',
+                                            'listretentionclasses',
+                                            'nsstatistics'])
+        self.assertEqual(r['listpermissions'], self.nso.listpermissions())
+
+
+class TestHcpsdk_30_2_NamespaceListing(unittest.TestCase):
+    def setUp(self):
+        self.hcptarget = hcpsdk.Target(it.P_NS_GOOD, it.P_AUTH, port=it.P_PORT, dnscache=it.P_DNSCACHE)
+        self.lst = hcpsdk.namespace.Listing(self.hcptarget, size=4)
+
+    def tearDown(self):
+        self.lst.close()
+        del self.hcptarget
+
+    def test_2_10_listdir(self):
+        print('test_2_10_listdir')
+        r = list(self.lst.listdir('/rest'))
+        pprint(r[:10])
+        for e in r:
+            self.assertTrue(type(e) == hcpsdk.namespace.DirEntry)
+            self.assertTrue(e.path.startswith('/rest/'))
+
+    def test_2_20_walk(self):
+        print('test_2_20_walk')
+        dirs = [e for e in self.lst.listdir('/rest') if e.type == 'directory']
+        r = list(self.lst.walk('/rest'))
+        print('{} entries'.format(len(r)))
+        for d in dirs:
+            self.assertTrue(d in r)
+
+    def test_2_30_listdir_nonexisting(self):
+        print('test_2_30_listdir_nonexisting')
+        with self.assertRaises(hcpsdk.HcpsdkError):
+            list(self.lst.listdir('/rest/this/does/not/exist'))
+
+
+class TestHcpsdk_30_4_NamespaceSampler(unittest.TestCase):
+    def setUp(self):
+        self.hcptarget = hcpsdk.Target(it.P_NS_GOOD, it.P_AUTH, port=it.P_PORT, dnscache=it.P_DNSCACHE)
+        self.smp = hcpsdk.namespace.Sampler([self.hcptarget], interval=1, history=10)
+
+    def tearDown(self):
+        self.smp.close()
+        del self.hcptarget
+
+    def test_4_10_sample(self):
+        print('test_4_10_sample')
+        self.assertEqual(self.smp.sample(), {'ok': 1, 'failed': 0})
+        self.assertEqual(self.smp.sample(), {'ok': 1, 'failed': 0})
+        s = self.smp.series(it.P_NS_GOOD)
+        print(s)
+        self.assertEqual(len(s), 2)
+        self.assertEqual(len(self.smp.rates(it.P_NS_GOOD)), 1)
+        self.assertTrue(self.smp.latest()[it.P_NS_GOOD])
+
+
+class TestHcpsdk_30_5_TimeSeries(unittest.TestCase):
+    def test_5_10_series(self):
+        print('test_5_10_series')
+        s = hcpsdk.timeseries.Series(('a', 'b'), size=3)
+        for i in range(5):
+            s.append(i, {'a': i * 10, 'b': i})
+        self.assertEqual(len(s), 3)
+        self.assertEqual(s.last(), (4.0, (40.0, 4.0)))
+        self.assertEqual(s.deltas(), [(3.0, 1.0, (10.0, 1.0)),
+                                      (4.0, 1.0, (10.0, 1.0))])
+        self.assertEqual(s.rates(), [(3.0, (10.0, 1.0)),
+                                     (4.0, (10.0, 1.0))])
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2016 Thorsten Simons (sw@snomis.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import unittest
+import time
+from pprint import pprint
+from threading import Event
+
+import hcpsdk
+
+
+def entry(name, size=1, hash='AB', type='object'):
+    return hcpsdk.namespace.DirEntry(path='/rest/' + name, name=name,
+                                     type=type, size=size,
+                                     hashscheme='SHA-256', hash=hash,
+                                     changetime=None, state='created',
+                                     version=None)
+
+
+class TestHcpsdk_32_1_Replica(unittest.TestCase):
+    def test_1_10_mergejoin(self):
+        """
+        Make sure the listings are joined by name
+        """
+        print('test_1_10_mergejoin:')
+        p = [entry('a'), entry('b'), entry('d')]
+        r = [entry('b'), entry('c'), entry('d')]
+        j = [(x.name if x else None, y.name if y else None)
+             for x, y in hcpsdk.replica.mergejoin(p, r)]
+        pprint(j)
+        self.assertEqual(j, [('a', None), ('b', 'b'), (None, 'c'),
+                             ('d', 'd')])
+        with self.assertRaises(hcpsdk.replica.VerifierError):
+            list(hcpsdk.replica.mergejoin(p, reversed(r)))
+
+    def test_1_20_checkpoint(self):
+        """
+        Make sure partitions are handed out once and the differences
+        survive a restart
+        """
+        print('test_1_20_checkpoint:')
+        cp = hcpsdk.replica.Checkpoint()
+        cp.seed('/rest')
+        self.assertEqual(cp.claim(), '/rest')
+        self.assertIsNone(cp.claim())
+        d = hcpsdk.replica.Difference('missing', '/rest/a', entry('a'), None)
+        cp.done('/rest', ['/rest/x', '/rest/y'], [d], 10)
+        self.assertEqual(cp.claim(), '/rest/x')
+        cp.fail('/rest/x')
+        self.assertEqual(cp.claim(), '/rest/y')
+        s = cp.summary()
+        pprint(s)
+        self.assertEqual((s['done'], s['running'], s['failed'], s['objects'],
+                          s['missing']), (1, 1, 1, 10, 1))
+        # a resumed verification retries what didn't finish
+        cp.seed('/rest')
+        self.assertEqual(sorted([cp.claim(), cp.claim()]),
+                         ['/rest/x', '/rest/y'])
+        self.assertEqual(list(cp.differences()), [d])
+        cp.close()
+
+    def test_1_30_quorum(self):
+        """
+        Make sure the quorum defaults to the majority and is checked
+        """
+        print('test_1_30_quorum:')
+        t = hcpsdk.Target('localhost', hcpsdk.NativeAuthorization('n', 'n01'),
+                          port=443, dnscache=True)
+        w = hcpsdk.replica.QuorumWriter([t, t, t])
+        self.assertEqual(w.quorum, 2)
+        w.close()
+        with self.assertRaises(ValueError):
+            hcpsdk.replica.QuorumWriter([t, t, t], quorum=4)
+
+
+class TestHcpsdk_32_2_TimeSeries(unittest.TestCase):
+    def test_2_10_histogram(self):
+        print('test_2_10_histogram')
+        h = hcpsdk.timeseries.Histogram(bounds=[1, 2, 4, 8])
+        for v in [0.5, 1.5, 1.5, 3, 3, 3, 3, 6, 6, 20]:
+            h.add(v)
+        self.assertEqual(h.buckets(), [(1, 1), (2, 2), (4, 4), (8, 2),
+                                       (None, 1)])
+        self.assertEqual((len(h), h.min, h.max, h.mean()), (10, 0.5, 20, 4.75))
+        self.assertEqual(h.percentile(0), 0.5)
+        self.assertEqual(h.percentile(50), 3.0)
+        self.assertEqual(h.percentile(100), 20)
+        g = hcpsdk.timeseries.Histogram(bounds=[1, 2, 4, 8])
+        g.merge(h)
+        g.merge(h)
+        self.assertEqual(g.buckets()[2], (4, 8))
+        with self.assertRaises(ValueError):
+            g.merge(hcpsdk.timeseries.Histogram())
+
+    def test_2_20_every(self):
+        print('test_2_20_every')
+        stop = Event()
+        calls = []
+
+        def func():
+            calls.append(time.time())
+            if len(calls) == 1:
+                raise ValueError('first call fails')
+            if len(calls) == 2:
+                time.sleep(0.25)  # the calls due meanwhile are skipped
+            if len(calls) == 4:
+                stop.set()
+
+        hcpsdk.timeseries.every(0.1, func, stop)
+        self.assertEqual(len(calls), 4)
+        self.assertGreaterEqual(calls[2] - calls[1], 0.25)
+        self.assertLess(calls[3] - calls[2], 0.15)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -21,6 +21,7 @@
 # CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 import unittest
+import io
 from pprint import pprint
 
 import hcpsdk
@@ -75,5 +76,43 @@ class TestHcpsdk_40_1_Mapi_Replication(unittest.TestCase):
         self.assertTrue(True)
 
 
+class TestHcpsdk_40_2_Mapi_XmlToDict(unittest.TestCase):
+    def test_2_10_xmltodict(self):
+        """
+        Make sure nested and repeated elements are converted, even if the
+        XML is read in small chunks
+        """
+        print('test_2_10_xmltodict:')
+        x = io.BytesIO(b'<?xml version="1.0" encoding="UTF-8"?>\n'
+                       b'<link><name>l1</name><description/>'
+                       b'<failoverSettings><local><autoFailover>false'
+                       b'</autoFailover></local></failoverSettings>'
+                       b'<node>1</node><node>2</node><node>3</node></link>')
+        d = hcpsdk.mapi.xmltodict(x, chunksize=7)
+        pprint(d)
+        self.assertEqual(d, {'name': 'l1', 'description': {},
+                             'failoverSettings': {
+                                 'local': {'autoFailover': 'false'}},
+                             'node': ['1', '2', '3']})
+        with self.assertRaises(hcpsdk.HcpsdkError):
+            hcpsdk.mapi.xmltodict(b'<link><name>l1</link>')
+
+    def test_2_20_legacy(self):
+        """
+        Make sure the converted XML is projected onto the layout the
+        Replication query methods have always returned
+        """
+        print('test_2_20_legacy:')
+        d = hcpsdk.mapi.xmltodict(b'<link><a>1</a><e/><b><c>2</c><d/><f>'
+                                  b'<g>3</g><h/><i><j>4</j></i></f></b>'
+                                  b'<a>5</a></link>')
+        self.assertEqual(hcpsdk.mapi.replication._legacy(d, 3),
+                         {'a': '5', 'e': {},
+                          'b': {'c': '2', 'd': {},
+                                'f': {'g': '3', 'h': None, 'i': None}}})
+        self.assertEqual(hcpsdk.mapi.replication._legacy(d, 1),
+                         {'a': '5', 'e': None, 'b': None})
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -27,6 +27,11 @@ import hcpsdk
 from datetime import date, timedelta
 from collections import OrderedDict
 import _io
+import io
+import os
+import zipfile
+from datetime import datetime
+from tempfile import TemporaryDirectory
 import init_tests as it
 
 
@@ -106,6 +111,75 @@ class TestHcpsdk_41_1_Mapi_Logs(unittest.TestCase):
         self.assertTrue(type(self.logs.download()) == _io.BufferedRandom)
         print('\tno file parameter: pass')
 
+    def test_1_35_logs_downloadparallel(self):
+        """
+        Test if we can download per log type in parallel
+        """
+        print('test_1_35_logs_downloadparallel:')
+        self.logs.prepare(startdate=date.today()-timedelta(days=2),
+                          enddate=date.today() - timedelta(days=1))
+        self.logs.wait_ready(timeout=600)
+
+        with TemporaryDirectory() as tmpdir:
+            progress = []
+            files = self.logs.downloadparallel(tmpdir, size=2,
+                                               progresshook=progress.append)
+            pprint(files)
+            self.assertEqual(self.logs.failed, [])
+            self.assertEqual(len(files), len(hcpsdk.mapi.Logs.L_ALL))
+            self.assertEqual(progress[-1],
+                             sum(os.path.getsize(f) for f in files.values()))
+
+            combined = os.path.join(tmpdir, 'all.zip')
+            files = self.logs.downloadparallel(combined=combined,
+                                               logs=[hcpsdk.mapi.Logs.L_ACCESS])
+            self.assertEqual(zipfile.ZipFile(combined).namelist(),
+                             list(files.values()))
+
+    def test_1_37_logs_wait_ready(self):
+        """
+        Test if we can wait for the logs being prepared
+        """
+        print('test_1_37_logs_wait_ready:')
+        self.logs.prepare(startdate=date.today()-timedelta(days=2),
+                          enddate=date.today() - timedelta(days=1))
+        future = self.logs.wait_ready_async(timeout=600)
+        stats = []
+        stat = self.logs.wait_ready(timeout=600, callback=stats.append)
+        self.assertTrue(stat['readyForStreaming'])
+        self.assertTrue(stats[-1] is stat)
+        self.assertTrue(future.result()['readyForStreaming'])
+
+    def test_1_36_logs_wait_timeout(self):
+        """
+        Test if waiting times out while the logs aren't ready
+        """
+        print('test_1_36_logs_wait_timeout:')
+        stat = OrderedDict([('readyForStreaming', False),
+                            ('streamingInProgress', False),
+                            ('started', True), ('error', False),
+                            ('content', [hcpsdk.mapi.Logs.L_ACCESS])])
+        self.logs._status = lambda con: stat  # status() never gets ready
+        stats = []
+        with self.assertRaises(hcpsdk.mapi.LogsNotReadyError):
+            self.logs.wait_ready(timeout=0.2, callback=stats.append,
+                                 interval=0.05)
+        self.assertTrue(len(stats) > 1)
+        self.assertTrue(self.logs.status() is stat)
+        with self.assertRaises(hcpsdk.mapi.LogsNotReadyError):
+            self.logs.wait_ready_async(timeout=0).result()
+
+    def test_1_38_logs_collect(self):
+        """
+        Test if we can prepare, wait and download in one go
+        """
+        print('test_1_38_logs_collect:')
+        hdl, name = self.logs.collect(startdate=date.today()-timedelta(days=2),
+                                      enddate=date.today() - timedelta(days=1),
+                                      logs=[hcpsdk.mapi.Logs.L_ACCESS])
+        print(name)
+        self.assertTrue(zipfile.is_zipfile(hdl))
+
     def test_1_40_logs_cancel(self):
         """
         Test if we get a dict from status()
@@ -114,3 +188,121 @@ class TestHcpsdk_41_1_Mapi_Logs(unittest.TestCase):
         self.logs.prepare(startdate=date.today() - timedelta(days=10),
                               enddate=date.today() - timedelta(days=1))
         self.assertTrue(self.logs.cancel() == True)
+
+
+class TestHcpsdk_41_2_Mapi_LogArchive(unittest.TestCase):
+    def setUp(self):
+        lines = ''.join('2016-01-0{} 10:00:00 request {}{}\n'
+                        .format(1 + i % 3, i, ' FAILED' if i % 10 == 0 else '')
+                        for i in range(1000)).encode()
+        hdl = io.BytesIO()
+        with zipfile.ZipFile(hdl, 'w', compression=zipfile.ZIP_DEFLATED) as z:
+            z.writestr('1/ACCESS/request.log', lines)
+            z.writestr('2/ACCESS/request.log', lines)
+            z.writestr('1/SYSTEM/messages', lines)
+        self.archive = hdl.getvalue()
+
+    def test_2_10_iterarchive(self):
+        """
+        Test if we can iterate the members of an archive being streamed
+        """
+        print('test_2_10_iterarchive:')
+        members = [(name, len(member.read())) for name, member in
+                   hcpsdk.mapi.iterarchive(io.BytesIO(self.archive),
+                                           chunksize=1000)]
+        pprint(members)
+        self.assertEqual([m[0] for m in members],
+                         ['1/ACCESS/request.log', '2/ACCESS/request.log',
+                          '1/SYSTEM/messages'])
+
+    def test_2_20_filterarchive(self):
+        """
+        Test if filtering in worker processes gives the same result as
+        filtering in-process
+        """
+        print('test_2_20_filterarchive:')
+        f = hcpsdk.mapi.LogFilter(nodes=[1], logs=[hcpsdk.mapi.Logs.L_ACCESS],
+                                  start=datetime(2016, 1, 2),
+                                  end=datetime(2016, 1, 3), pattern='FAILED')
+        r0 = list(hcpsdk.mapi.filterarchive(io.BytesIO(self.archive), f,
+                                            processes=0))
+        r2 = list(hcpsdk.mapi.filterarchive(io.BytesIO(self.archive), f,
+                                            processes=2, blocksize=1000))
+        pprint(r0[:3])
+        self.assertEqual(r0, r2)
+        self.assertEqual(len(r0), 33)
+        for l in r0:
+            self.assertEqual(l.member, '1/ACCESS/request.log')
+            self.assertTrue(l.line.startswith('2016-01-02'))
+
+    def test_2_30_filterarchive_blocks(self):
+        """
+        Test if line numbers and the timestamps of continuation lines
+        survive being cut into blocks
+        """
+        print('test_2_30_filterarchive_blocks:')
+        lines = ''.join('2016-01-0{} 10:00:00 request {}\r\n'
+                        '  detail\x85\x0c {}\n'
+                        .format(1 + i // 100, i, i) for i in range(300))
+        hdl = io.BytesIO()
+        with zipfile.ZipFile(hdl, 'w') as z:
+            z.writestr('1/ACCESS/request.log', lines.encode())
+        f = hcpsdk.mapi.LogFilter(start=datetime(2016, 1, 2),
+                                  end=datetime(2016, 1, 3), pattern='detail')
+        r = list(hcpsdk.mapi.filterarchive(io.BytesIO(hdl.getvalue()), f,
+                                           processes=0, blocksize=100))
+        pprint(r[:3])
+        self.assertEqual(len(r), 100)
+        self.assertEqual([l.lineno for l in r], list(range(202, 401, 2)))
+        self.assertEqual(r[0].line, '  detail\x85\x0c 100')
+
+
+class TestHcpsdk_41_3_Mapi_LogStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = TemporaryDirectory()
+        self.store = hcpsdk.mapi.LogStore(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    @staticmethod
+    def archive(days):
+        """
+        Two rotated log files overlapping by the days in the middle
+        """
+        lines = ['2016-01-{:02} {:02}:00:00 request\n  detail\n'
+                 .format(d, h) for d in days for h in range(24)]
+        hdl = io.BytesIO()
+        with zipfile.ZipFile(hdl, 'w') as z:
+            z.writestr('1/ACCESS/request.log.1',
+                       ''.join(lines[:len(lines) // 2 + 24]))
+            z.writestr('1/ACCESS/request.log.0',
+                       ''.join(lines[len(lines) // 2 - 24:]))
+        hdl.seek(0)
+        return hdl
+
+    def test_3_10_logstore_add(self):
+        """
+        Test if days are split, edges dropped and overlaps de-duplicated
+        """
+        print('test_3_10_logstore_add:')
+        start, end = date(2016, 1, 1), date(2016, 1, 3)
+        self.assertEqual(len(self.store.missing(1, 'ACCESS', start, end)), 3)
+        counts = self.store.add(1, 'ACCESS', self.archive([1, 2, 3, 4]),
+                                [date(2016, 1, 2), date(2016, 1, 3)])
+        pprint(counts)
+        self.assertEqual(counts, {date(2016, 1, 2): 48, date(2016, 1, 3): 48})
+        self.assertEqual(self.store.duplicates, 48)
+        self.assertEqual(self.store.missing(1, 'ACCESS', start, end),
+                         [date(2016, 1, 1)])
+        lines = list(self.store.lines(1, 'ACCESS', start, end))
+        self.assertEqual(len(lines), 96)
+        self.assertEqual(lines[0].member, '2016-01-02/request.log')
+        self.assertTrue(lines[0].line.startswith('2016-01-02 00:00:00'))
+
+        # the manifest survives
+        store = hcpsdk.mapi.LogStore(self.tmpdir.name)
+        self.assertEqual(store.missing(1, 'ACCESS', start, end),
+                         [date(2016, 1, 1)])
+        self.assertEqual(store.missing(1, 'SYSTEM', start, end),
+                         [start, date(2016, 1, 2), end])
@@ -29,6 +29,8 @@ from _io import StringIO
 
 import hcpsdk
 from datetime import datetime, timedelta
+from tempfile import TemporaryDirectory
+import os.path
 import init_tests as it
 
 
@@ -102,3 +104,105 @@ class TestHcpsdk_41_1_Mapi_Chargeback(unittest.TestCase):
         pprint(l.read(), indent=4)
 
         self.assertTrue(type(l) == StringIO)
+
+    def test_1_40_chargeback_tenant_hourly_streamed(self):
+        """
+        Check if we can stream an hourly report into columns
+        """
+        print('test_1_40_chargeback_tenant_hourly_streamed:')
+
+        for fmt in hcpsdk.mapi.Chargeback.CBM_ALL:
+            rep = self.cb.report(tenant='m',
+                                 start=datetime.now()-timedelta(days=2),
+                                 end=datetime.now(),
+                                 granularity=hcpsdk.mapi.Chargeback.CBG_HOUR,
+                                 fmt=fmt)
+            print(fmt, len(rep), rep.keys())
+            self.assertTrue(len(rep))
+            for key in rep.keys():
+                cols = rep.columns(key)
+                self.assertEqual(list(cols['startTime']),
+                                 sorted(cols['startTime']))
+
+
+class TestHcpsdk_41_2_Mapi_Chargeback_Collector(unittest.TestCase):
+    def setUp(self):
+        self.hcptarget = hcpsdk.Target(it.L_ADMIN, it.L_ADMAUTH,
+                                       port=it.L_MAPIPORT, dnscache=it.L_DNSCACHE)
+        self.col = hcpsdk.mapi.Collector(self.hcptarget, size=4,
+                                         slicesize=timedelta(days=1))
+
+    def tearDown(self):
+        self.col.close()
+        del self.hcptarget
+
+    def test_2_10_collect_sliced(self):
+        """
+        Check if a sliced collection matches a single request
+        """
+        print('test_2_10_collect_sliced:')
+
+        end = datetime.now().replace(minute=0, second=0, microsecond=0)
+        start = end - timedelta(days=3)
+        rep = self.col.collect(['m'], start=start, end=end)
+        self.assertEqual(self.col.failed, [])
+
+        cb = hcpsdk.mapi.Chargeback(self.hcptarget)
+        ref = cb.report(tenant='m', start=start, end=end)
+        cb.close()
+        print(len(rep), len(ref))
+        self.assertEqual(list(rep.records()), list(ref.records()))
+
+
+class TestHcpsdk_41_3_Mapi_Chargeback_Store(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = TemporaryDirectory()
+        self.store = hcpsdk.mapi.Store(os.path.join(self.tmpdir.name, 'cb.db'))
+        self.start = datetime(2016, 1, 1)
+        self.report = hcpsdk.mapi.Report()
+        for h in range(6):
+            for ns in ['n1', 'n2', None]:
+                s = int((self.start + timedelta(hours=h)).timestamp())
+                r = {'tenantName': 'm', 'namespaceName': ns,
+                     'startTime': s, 'endTime': s + 3600,
+                     'valid': h != 4, 'objectCount': h, 'bytesIn': 10}
+                self.report.add(r)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    def test_3_10_store_missing(self):
+        """
+        Check if the unfinished hours are reported as missing
+        """
+        print('test_3_10_store_missing:')
+
+        end = self.start + timedelta(hours=8)
+        self.assertEqual(self.store.missing('m', self.start, end),
+                         [(self.start, end)])
+        self.store.add(self.report, 'm', self.start,
+                       self.start + timedelta(hours=6))
+        self.assertEqual(self.store.missing('m', self.start, end),
+                         [(self.start + timedelta(hours=4),
+                           self.start + timedelta(hours=5)),
+                          (self.start + timedelta(hours=6), end)])
+
+    def test_3_20_store_query(self):
+        """
+        Check if stored records can be queried and aggregated
+        """
+        print('test_3_20_store_query:')
+
+        self.store.add(self.report, 'm', self.start,
+                       self.start + timedelta(hours=6))
+        self.assertEqual(len(self.store.query(tenant='m')), 18)
+        self.assertEqual(len(self.store.query(namespace='n1',
+                                              end=self.start + timedelta(hours=2))), 2)
+        totals = self.store.aggregate(groupby=('tenant',))
+        self.assertEqual(len(totals), 1)
+        self.assertEqual(totals[0]['bytesIn'], 60)
+        self.assertEqual(totals[0]['objectCount'], 5)
+        perns = self.store.aggregate(groupby=('namespace',))
+        self.assertEqual([r['namespace'] for r in perns], ['n1', 'n2'])
+
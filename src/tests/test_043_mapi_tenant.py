@@ -58,3 +58,20 @@ class TestHcpsdk_43_1_Mapi_Tenant(unittest.TestCase):
             pprint(i.info())
             i.close()
 
+    def test_1_20_tenant_infos(self):
+        """
+        Check if we can get the settings of all Tenants concurrently
+        """
+        print('test_1_20_tenant_infos:')
+
+        tenants = hcpsdk.mapi.listtenants(self.hcptarget, ttl=60)
+        for i in tenants:
+            self.assertTrue(i.pool is tenants[0].pool)
+
+        settings = hcpsdk.mapi.infos(tenants, workers=4)
+        pprint(settings)
+        self.assertEqual(list(settings.keys()), [i.name for i in tenants])
+        for i in tenants:
+            self.assertEqual(settings[i.name], i.info())
+        tenants[0].close()
+
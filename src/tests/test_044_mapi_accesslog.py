@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2016 Thorsten Simons (sw@snomis.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import unittest
+import os.path
+import gzip
+from tempfile import TemporaryDirectory
+from pprint import pprint
+
+import hcpsdk
+
+
+LINE = '10.0.0.{} - user [02/Jan/2016:10:00:{:02} +0100] "{} /rest/obj{} HTTP/1.1" ' \
+       '200 {} ns.tenant.hcp.domain.com {}\n'
+
+
+class TestHcpsdk_44_1_Mapi_AccessLog(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = TemporaryDirectory()
+        self.paths = []
+        for node in [1, 2]:
+            os.mkdir(os.path.join(self.tmpdir.name, str(node)))
+            path = os.path.join(self.tmpdir.name, str(node),
+                                'http_gateway_request.log.0.gz')
+            with gzip.open(path, 'wt') as hdl:
+                for i in range(100):
+                    hdl.write(LINE.format(i, i % 60, ['GET', 'PUT'][i % 2],
+                                          i % 5, 1000, i + 1))
+                hdl.write('not an access log line\n')
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_1_10_parse(self):
+        """
+        Check if parallel parsing gives the same result
+        """
+        print('test_1_10_parse:')
+        a0 = hcpsdk.mapi.AccessLog.fromfiles(self.paths, processes=0)
+        a2 = hcpsdk.mapi.AccessLog.fromfiles(self.paths, processes=2)
+        self.assertEqual(len(a0), 200)
+        self.assertEqual(a0.skipped, 2)
+        self.assertEqual(a0.nodes, ['1', '2'])
+        for c in a0.columns:
+            self.assertEqual(list(a0.column(c)), list(a2.column(c)))
+
+    def test_1_20_aggregate(self):
+        """
+        Check the aggregations
+        """
+        print('test_1_20_aggregate:')
+        a = hcpsdk.mapi.AccessLog.fromfiles(self.paths, processes=0)
+        p = a.percentiles(by='op', q=(0, 50, 100))
+        pprint(p)
+        self.assertEqual(list(p.keys()), ['GET', 'PUT'])
+        self.assertEqual(p['GET'], (100, [1.0, 50.0, 99.0]))
+        self.assertEqual(p['PUT'], (100, [2.0, 51.0, 100.0]))
+        t = a.throughput(by='node')
+        self.assertEqual(t['1'], (100 / 59, 100000 / 59))
+        self.assertEqual(a.top(1), [('/rest/obj0', 40)])
+        self.assertEqual(a.top(1, by='bytes'), [('/rest/obj0', 40000)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2016 Thorsten Simons (sw@snomis.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import unittest
+import os.path
+import tempfile
+from datetime import datetime, timedelta
+from pprint import pprint
+
+import hcpsdk
+import init_tests as it
+
+
+class TestHcpsdk_60_1_Mqe(unittest.TestCase):
+    def setUp(self):
+        self.hcptarget = hcpsdk.Target(it.P_TENANT, it.P_AUTH,
+                                       port=it.P_SSLPORT,
+                                       dnscache=it.P_DNSCACHE)
+        self.q = hcpsdk.mqe.Query(self.hcptarget, size=4)
+        self.end = datetime.now()
+        self.start = self.end - timedelta(days=7)
+
+    def tearDown(self):
+        self.q.close()
+        del self.hcptarget
+
+    def test_1_10_operation(self):
+        """
+        Make sure we get the results in the order of their change time
+        """
+        print('test_1_10_operation')
+        r = list(self.q.operation(start=self.start, end=self.end, count=100))
+        pprint(r[:3])
+        times = [float(x['changeTimeMilliseconds']) for x in r]
+        self.assertEqual(times, sorted(times))
+
+    def test_1_20_operation_parallel(self):
+        """
+        Make sure parallel slices deliver the same as a single query
+        """
+        print('test_1_20_operation_parallel')
+        r1 = list(self.q.operation(start=self.start, end=self.end, count=100))
+        r2 = list(self.q.operation(start=self.start, end=self.end, count=100,
+                                   parallel=8))
+        self.assertEqual([x['urlName'] for x in r1],
+                         [x['urlName'] for x in r2])
+
+    def test_1_30_object(self):
+        """
+        Make sure we get a list of dicts from an object query
+        """
+        print('test_1_30_object')
+        r = list(self.q.object('+namespace:"{}"'.format(
+            it.P_NS_GOOD.split('.' + it.P_HCP)[0]), count=100))
+        for x in r:
+            self.assertTrue(type(x) == dict)
+
+    def test_1_40_bad_parameters(self):
+        print('test_1_40_bad_parameters')
+        with self.assertRaises(ValueError):
+            list(self.q.operation(start=self.end, end=self.start))
+        with self.assertRaises(ValueError):
+            list(self.q.operation(transactions=['nonsense']))
+
+
+class TestHcpsdk_60_2_ChangeFeed(unittest.TestCase):
+    def setUp(self):
+        self.hcptarget = hcpsdk.Target(it.P_TENANT, it.P_AUTH,
+                                       port=it.P_SSLPORT,
+                                       dnscache=it.P_DNSCACHE)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.checkpoint = os.path.join(self.tmpdir.name, 'checkpoint')
+        self.until = datetime.now() - timedelta(minutes=5)
+        self.start = self.until - timedelta(days=7)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        del self.hcptarget
+
+    def test_2_10_resume(self):
+        """
+        Make sure a feed resumes right after the last event committed
+        """
+        print('test_2_10_resume')
+        f = hcpsdk.mqe.ChangeFeed(self.hcptarget, self.checkpoint,
+                                  start=self.start, commitevery=1)
+        urls = [e.url for e in f.events(until=self.until)]
+        f.close()
+        os.remove(self.checkpoint)
+
+        f = hcpsdk.mqe.ChangeFeed(self.hcptarget, self.checkpoint,
+                                  start=self.start, commitevery=1)
+        first = []
+        for e in f.events(until=self.until):
+            first.append(e.url)
+            if len(first) > len(urls) // 2:
+                break
+        f = hcpsdk.mqe.ChangeFeed(self.hcptarget, self.checkpoint,
+                                  start=self.start, commitevery=1)
+        rest = [e.url for e in f.events(until=self.until)]
+        f.close()
+        self.assertEqual(first[:-1] + rest, urls)
+
+
+if __name__ == '__main__':
+    unittest.main()
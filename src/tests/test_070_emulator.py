@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2016 Thorsten Simons (sw@snomis.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+import unittest
+from pprint import pprint
+
+import hcpsdk
+from hcpsdk.emulator import Emulator, Profile
+
+
+class TestHcpsdk_70_1_Emulator(unittest.TestCase):
+    def setUp(self):
+        self.emulator = Emulator(nodes=2, seed=0)
+        self.emulator.start()
+        self.target = self.emulator.target('n1.t1')
+
+    def tearDown(self):
+        self.emulator.stop()
+
+    def test_1_10_resolve(self):
+        """
+        Make sure emulated names resolve to the running nodes, only
+        """
+        print('test_1_10_resolve:')
+        self.assertEqual(self.target.addresses, ['127.0.0.1', '127.0.0.2'])
+        self.emulator.nodes[0].stop()
+        r = hcpsdk.ips.query(self.emulator.fqdn('n1.t1'))
+        self.assertEqual(r.ips, ['127.0.0.2'])
+        self.emulator.nodes[0].start()
+        self.assertTrue(self.emulator.nodes[0].up)
+
+    def test_1_20_rest(self):
+        """
+        Make sure objects and directories behave like on HCP
+        """
+        print('test_1_20_rest:')
+        con = hcpsdk.Connection(self.target, verifyhash=True)
+        try:
+            self.assertEqual(con.PUT('/rest/d/o', b'0123').status, 201)
+            con.read()
+            self.assertEqual(con.PUT('/rest/d/o', b'0123').status, 409)
+            con.read()
+            self.assertEqual(con.GET('/rest/d/o').status, 200)
+            self.assertEqual(con.read(), b'0123')
+            self.assertEqual(con.getheader('X-HCP-Type'), 'object')
+            self.assertEqual(con.DELETE('/rest/d').status, 409)
+            con.read()
+        finally:
+            con.close()
+        listing = hcpsdk.namespace.Listing(self.target)
+        entries = list(listing.listdir('/rest'))
+        pprint(entries)
+        self.assertEqual([(e.path, e.type) for e in entries],
+                         [('/rest/d', 'directory')])
+        listing.close()
+        # Namespaces are separated
+        con = hcpsdk.Connection(self.emulator.target('n2.t1'))
+        self.assertEqual(con.HEAD('/rest/d/o').status, 404)
+        con.close()
+
+    def test_1_30_faults(self):
+        """
+        Make sure the injected faults happen
+        """
+        print('test_1_30_faults:')
+        for node in self.emulator.nodes:
+            node.profile = Profile(busy=0.5, drop=0.2)
+        con = hcpsdk.Connection(self.target, retries=10)
+        status = []
+        for i in range(40):
+            status.append(con.HEAD('/rest').status)
+            con.read()
+        con.close()
+        stats = self.emulator.stats()
+        pprint(stats)
+        self.assertEqual(status.count(503), stats['busy'])
+        self.assertEqual(stats['requests'],
+                         stats['drops'] + stats['busy'] + status.count(200))
+        self.assertTrue(stats['drops'] and stats['busy'])
+
+    def test_1_40_info(self):
+        """
+        Make sure namespace.Info() gets the Namespace information
+        """
+        print('test_1_40_info:')
+        con = hcpsdk.Connection(self.target)
+        con.PUT('/rest/o1', b'01234')
+        con.read()
+        con.close()
+        info = hcpsdk.namespace.Info(self.target)
+        try:
+            stats = info.nsstatistics()
+            pprint(stats)
+            self.assertEqual((stats['namespaceName'], stats['objectCount'],
+                              stats['usedCapacityBytes']), ('n1', 1, 5))
+            self.assertEqual(list(info.listaccessiblens(all=True)), ['n1'])
+            self.assertTrue(info.listpermissions()['namespacePermissions']
+                            ['read'])
+        finally:
+            info.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2016 Thorsten Simons (sw@snomis.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+import unittest
+import random
+from threading import Timer
+from pprint import pprint
+
+import hcpsdk
+from hcpsdk.bench import Bench, Workload, parsesize
+from hcpsdk.emulator import Emulator, Profile
+
+
+class TestHcpsdk_80_1_Workload(unittest.TestCase):
+    def test_1_10_sizes(self):
+        """
+        Make sure the size distributions are understood
+        """
+        print('test_1_10_sizes:')
+        rnd = random.Random(0)
+        self.assertEqual(parsesize('64k'), 65536)
+        self.assertEqual(parsesize('2M'), 2 * 2**20)
+        with self.assertRaises(ValueError):
+            parsesize('64x')
+        self.assertEqual(Workload(sizes='1k').size(rnd), 1024)
+        sizes = {Workload(sizes='1k-2k').size(rnd) for i in range(100)}
+        self.assertTrue(min(sizes) >= 1024 and max(sizes) <= 2048)
+        w = Workload(sizes='1k:9,1m:1')
+        sizes = [w.size(rnd) for i in range(1000)]
+        self.assertEqual(set(sizes), {1024, 2**20})
+        self.assertTrue(50 < sizes.count(2**20) < 150)
+        w = Workload.fromdict({'sizes': [[100, 1], [200, 0]]})
+        self.assertEqual({w.size(rnd) for i in range(100)}, {100})
+
+    def test_1_20_mix(self):
+        """
+        Make sure the operations are drawn according to the mix
+        """
+        print('test_1_20_mix:')
+        rnd = random.Random(0)
+        w = Workload(mix={'PUT': 1, 'GET': 3})
+        ops = [w.op(rnd) for i in range(4000)]
+        self.assertTrue(2800 < ops.count('GET') < 3200)
+        with self.assertRaises(ValueError):
+            Workload(mix={'POST': 1})
+        with self.assertRaises(ValueError):
+            Workload(mix={'PUT': 0})
+        with self.assertRaises(ValueError):
+            Workload.fromdict({'threads': 4})
+
+
+class TestHcpsdk_80_2_Bench(unittest.TestCase):
+    def setUp(self):
+        self.emulator = Emulator(nodes=2, seed=0)
+        self.emulator.start()
+        self.target = self.emulator.target('n1.t1')
+
+    def tearDown(self):
+        self.emulator.stop()
+
+    def test_2_10_run(self):
+        """
+        Make sure a run gets reported, including the errors
+        """
+        print('test_2_10_run:')
+        for node in self.emulator.nodes:
+            node.profile = Profile(busy=0.1)
+        w = Workload(mix={'PUT': 1, 'GET': 1, 'DELETE': 1}, sizes='1k-4k',
+                     concurrency=2, duration=1, warmup=0.2, preload=10,
+                     seed=1)
+        bench = Bench(self.target, w)
+        try:
+            report = bench.run()
+        finally:
+            bench.close()
+        pprint(report)
+        self.assertTrue(report['operations'] > 0)
+        self.assertEqual(report['errors'], report['errorcodes'].get('503'))
+        self.assertTrue(0.0 < report['errorrate'] < 0.3)
+        self.assertEqual(sorted(report['ops']), ['DELETE', 'GET', 'PUT'])
+        self.assertTrue(report['latency']['p50'] <= report['latency']['p99']
+                        <= report['latency']['max'])
+        self.assertEqual(report['operations'],
+                         sum(o['operations'] for o in report['ops'].values()))
+
+    def test_2_20_warmup(self):
+        """
+        Make sure operations started during warmup are not reported
+        """
+        print('test_2_20_warmup:')
+        # the nodes are busy during the first half of the warmup, only
+        for node in self.emulator.nodes:
+            node.profile = Profile(busy=1.0)
+        timer = Timer(0.5, lambda: [setattr(n, 'profile', Profile())
+                                    for n in self.emulator.nodes])
+        w = Workload(mix={'PUT': 1}, sizes=1000, concurrency=2, duration=0.5,
+                     warmup=1.0, preload=0, seed=1)
+        bench = Bench(self.target, w)
+        try:
+            timer.start()
+            report = bench.run()
+        finally:
+            bench.close()
+        self.assertEqual(report['errors'], 0)
+        self.assertAlmostEqual(report['throughput']['bytes'],
+                               report['throughput']['ops'] * 1000, places=3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2016 Thorsten Simons (sw@snomis.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+import unittest
+import io
+from pprint import pprint
+
+import hcpsdk
+from hcpsdk.emulator import Emulator
+from hcpsdk.trace import Recorder, Replayer, TraceError, load
+
+
+class TestHcpsdk_90_1_Trace(unittest.TestCase):
+    def setUp(self):
+        self.emulator = Emulator(nodes=2, seed=0)
+        self.emulator.start()
+        self.target = self.emulator.target('n1.t1')
+
+    def tearDown(self):
+        self.emulator.stop()
+
+    def test_1_10_record(self):
+        """
+        Make sure Requests get recorded with status, sizes and timings
+        """
+        print('test_1_10_record:')
+        hdl = io.BytesIO()
+        recorder = Recorder(hdl)
+        con = hcpsdk.Connection(self.target, recorder=recorder)
+        con.PUT('/rest/trace/a', b'x' * 1000)
+        con.GET('/rest/trace/a')
+        self.assertEqual(recorder.count, 1)
+        con.read(600)
+        con.read()
+        self.assertEqual(recorder.count, 2)
+        con.HEAD('/rest/trace/nothere', params={'x': 'y z'})
+        con.close()
+        recorder.close()
+        hdl.seek(0)
+        records = list(load(hdl))
+        pprint(records)
+        self.assertEqual([(r.method, r.status) for r in records],
+                         [('PUT', 201), ('GET', 200), ('HEAD', 404)])
+        self.assertEqual(records[0].sent, 1000)
+        self.assertEqual(records[1].received, 1000)
+        self.assertEqual(records[2].query, 'x=y+z')
+        self.assertEqual(len({r.stream for r in records}), 1)
+        self.assertTrue(records[0].start <= records[1].start
+                        <= records[2].start)
+        self.assertTrue(all(r.wait > 0.0 for r in records))
+        with self.assertRaises(TraceError):
+            list(load(io.BytesIO(b'not a trace')))
+
+    def test_1_20_replay(self):
+        """
+        Make sure a trace gets replayed with the recorded concurrency
+        """
+        print('test_1_20_replay:')
+        hdl = io.BytesIO()
+        recorder = Recorder(hdl)
+        cons = [hcpsdk.Connection(self.target, recorder=recorder)
+                for i in range(3)]
+        for i in range(5):
+            for no, con in enumerate(cons):
+                con.PUT('/rest/trace/s{}/{}'.format(no, i), b'x' * 100)
+                con.read()
+                con.GET('/rest/trace/s{}/{}'.format(no, i))
+                con.read()
+        for con in cons:
+            con.close()
+        recorder.close()
+        hdl.seek(0)
+        records = list(load(hdl))
+        self.assertEqual(len(records), 30)
+
+        # replay into another directory; existing objects get prepared
+        trace = [r for r in records if r.method == 'GET']
+        replayer = Replayer(self.target, trace, speed=2.0,
+                            rewrite=lambda url: url.replace('/trace/',
+                                                            '/replay/'))
+        report = replayer.run()
+        pprint(report)
+        self.assertEqual(report['prepared'], 15)
+        self.assertEqual(report['trace']['streams'], 3)
+        self.assertEqual(report['requests'], 15)
+        self.assertEqual(report['errors'], 0)
+        self.assertEqual(report['mismatches'], 0)
+        self.assertEqual(list(report['ops']), ['GET'])
+        self.assertIsNotNone(report['ops']['GET']['replayed']['p50'])
+        with self.assertRaises(ValueError):
+            Replayer(self.target, records, speed=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2016 Thorsten Simons (sw@snomis.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+import unittest
+import os
+import pickle
+import shutil
+import tempfile
+from pprint import pprint
+
+import hcpsdk
+from hcpsdk.emulator import Emulator
+from hcpsdk.transfer import Transfer, walk
+
+
+class TestHcpsdk_95_1_Forksafe(unittest.TestCase):
+    def setUp(self):
+        self.emulator = Emulator(nodes=2, seed=0)
+        self.emulator.start()
+        self.target = self.emulator.target('n1.t1',
+                                           hcpsdk.NativeAuthorization('n',
+                                                                      'n01'))
+
+    def tearDown(self):
+        self.emulator.stop()
+
+    def test_1_10_pickle(self):
+        """
+        Make sure Targets, Clusters and Authorizations survive pickling,
+        w/o a DNS query
+        """
+        print('test_1_10_pickle:')
+        target = pickle.loads(pickle.dumps(self.target))
+        self.assertEqual(target.fqdn, self.target.fqdn)
+        self.assertEqual(target.addresses, self.target.addresses)
+        self.assertEqual(target.headers, self.target.headers)
+        self.assertIs(target.sslcontext, hcpsdk.SSL_NOVERIFY)
+        con = hcpsdk.Connection(target)
+        try:
+            r = con.PUT('/rest/pickled', b'x')
+            con.read()
+        finally:
+            con.close()
+        self.assertEqual(r.status, 201)
+
+        cluster = self.emulator.cluster()
+        t1, t2 = pickle.loads(pickle.dumps(
+            [cluster.target(self.emulator.fqdn(name),
+                            hcpsdk.DummyAuthorization())
+             for name in ('n1.t1', 'n2.t1')]))
+        self.assertIs(t1.cluster, t2.cluster)
+        self.assertIs(t1.ipaddrqry, t2.ipaddrqry)
+        # pickled one by one, they still share a single Cluster
+        t3, t4 = [pickle.loads(pickle.dumps(cluster.target(
+            self.emulator.fqdn(name), hcpsdk.DummyAuthorization())))
+            for name in ('n1.t1', 'n2.t1')]
+        self.assertIs(t3.cluster, t4.cluster)
+        self.assertIs(t3.ipaddrqry, t3.cluster.ipaddrqry)
+
+        with self.assertRaises(TypeError):
+            pickle.dumps(hcpsdk.Target(self.target.fqdn,
+                                       hcpsdk.DummyAuthorization(),
+                                       port=self.target.port,
+                                       sslcontext=hcpsdk.ssl.create_default_context()))
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs os.fork()')
+    def test_1_20_fork(self):
+        """
+        Make sure a child process doesn't use the sessions of its parent
+        """
+        print('test_1_20_fork:')
+        pool = hcpsdk.ConnectionPool(self.target, size=2)
+        with pool.connection() as con:
+            con.PUT('/rest/forked', b'parent')
+            con.read()
+        self.target.ipaddrqry._cLock.acquire()  # held by a thread, now
+        pid = os.fork()
+        if not pid:
+            status = 1
+            try:
+                with pool.connection(timeout=5) as con:
+                    con.GET('/rest/forked')
+                    if con.read() == b'parent':
+                        status = 0
+            finally:
+                os._exit(status)
+        self.target.ipaddrqry._cLock.release()
+        self.assertEqual(os.waitpid(pid, 0)[1], 0)
+        with pool.connection() as con:
+            con.GET('/rest/forked')
+            self.assertEqual(con.read(), b'parent')
+        pool.close()
+
+
+class TestHcpsdk_95_2_Transfer(unittest.TestCase):
+    def setUp(self):
+        self.emulator = Emulator(nodes=2, seed=0)
+        self.emulator.start()
+        self.target = self.emulator.target('n1.t1')
+        self.tmpdir = tempfile.mkdtemp()
+        self.src = os.path.join(self.tmpdir, 'src')
+        for i in range(20):
+            d = os.path.join(self.src, 'd{}'.format(i % 3))
+            os.makedirs(d, exist_ok=True)
+            with open(os.path.join(d, 'f{}'.format(i)), 'wb') as hdl:
+                hdl.write(os.urandom(1000 * (i + 1)))
+
+    def tearDown(self):
+        self.emulator.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def _roundtrip(self, processes):
+        transfer = Transfer(self.target, processes=processes, threads=2,
+                            interval=0.1)
+        progress = []
+        report = transfer.upload(walk(self.src, '/rest/up'),
+                                 progress=progress.append)
+        pprint(report)
+        self.assertEqual((report['files'], report['done'], report['failed'],
+                          report['bytes']), (20, 20, 0, 210000))
+        self.assertEqual(progress[-1].done, 20)
+
+        dst = os.path.join(self.tmpdir, 'dst')
+        jobs = [(url, os.path.join(dst, os.path.relpath(f, self.src)))
+                for f, url in walk(self.src, '/rest/up')]
+        jobs.append(('/rest/up/missing', os.path.join(dst, 'missing')))
+        report = transfer.download(jobs)
+        self.assertEqual((report['done'], report['failed'], report['lost']),
+                         (20, 1, 0))
+        self.assertEqual(report['failures'][0][0], '/rest/up/missing')
+        self.assertFalse(os.path.exists(os.path.join(dst, 'missing')))
+        for url, filename in jobs[:-1]:
+            with open(filename, 'rb') as a, \
+                    open(os.path.join(self.src, os.path.relpath(filename,
+                                                                dst)),
+                         'rb') as b:
+                self.assertEqual(a.read(), b.read())
+
+    def test_2_10_threads(self):
+        """
+        Make sure files get transferred by threads
+        """
+        print('test_2_10_threads:')
+        self._roundtrip(0)
+
+    def test_2_20_processes(self):
+        """
+        Make sure files get transferred by worker processes
+        """
+        print('test_2_20_processes:')
+        self._roundtrip(2)
+
+    def test_2_30_shard(self):
+        """
+        Make sure uploads get balanced by size
+        """
+        print('test_2_30_shard:')
+        transfer = Transfer(self.target, processes=2)
+        shards = transfer._shard(list('abcde'), [5, 4, 3, 2, 2], 2)
+        self.assertEqual(shards, [['a', 'd', 'e'], ['b', 'c']])
+
+
+if __name__ == '__main__':
+    unittest.main()